@@ -4,6 +4,7 @@ import pandas as pd
 import os
 import re
 from data_loader import DataLoader
+from evidence_table import flatten_evidence
 
 def clean_text(text):
     """
@@ -11,44 +12,25 @@ def clean_text(text):
     """
     if not isinstance(text, str):
         return ""
-    text = text.replace('\n', ' ')
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    return re.sub(r'\s+', ' ', text).strip()
 
-def extract_and_clean_evidence(df):
+def extract_and_clean_evidence(df, evidence=None):
     """
     Extracts nested text and metadata from the 'evidence' column and cleans the text.
+
+    Reads the shared evidence table (see evidence_table.py) and adds 'cleaned_text' and
+    'doc_name' from each row's first evidence item, 'all_evidence_text' with every item
+    joined, and 'doc_link'. Pass the shared table (DataLoader.load_evidence_table) to
+    reuse it instead of rebuilding it from `df`.
     """
-    # Create empty lists to store the extracted data
-    extracted_text = []
-    doc_names = []
-    doc_links = []
-    
-    for _, row in df.iterrows():
-        evidence_list = row['evidence']
-        
-        # Check if the evidence list is not empty
-        if evidence_list:
-            first_evidence = evidence_list[0]
-            
-            # Safely get the text and clean it
-            text = first_evidence.get('evidence_text', '')
-            clean_text_output = clean_text(text)
-            extracted_text.append(clean_text_output)
-            
-            # Safely get the doc_name and doc_link
-            doc_names.append(first_evidence.get('doc_name', ''))
-            doc_links.append(row.get('doc_link', '')) # 'doc_link' is a top-level column
-        else:
-            # Handle cases with no evidence
-            extracted_text.append("")
-            doc_names.append("")
-            doc_links.append("")
+    flat = flatten_evidence(df, evidence)
 
     # Add the new, cleaned columns to the DataFrame
-    df['cleaned_text'] = extracted_text
-    df['doc_name'] = doc_names
-    df['doc_link'] = doc_links
+    df['cleaned_text'] = flat['first_evidence_text']
+    df['doc_name'] = flat['first_evidence_doc_name']
+    df['all_evidence_text'] = flat['all_evidence_text']
+    # 'doc_link' is a top-level column, when present
+    df['doc_link'] = df['doc_link'].fillna('') if 'doc_link' in df else ''
     
     return df
 
@@ -61,7 +43,8 @@ def main():
 
     if open_source_df is not None:
         # Preprocess the DataFrame
-        processed_df = extract_and_clean_evidence(open_source_df)
+        evidence = loader.load_evidence_table("financebench_open_source.jsonl")
+        processed_df = extract_and_clean_evidence(open_source_df, evidence)
         
         print("\nProcessed DataFrame with new columns:")
         # Display the new columns to verify the result
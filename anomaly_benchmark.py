@@ -0,0 +1,198 @@
+# anomaly_benchmark.py
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detection import (
+    DETECTORS, calibrate_volume_anomalies, detect_anomalies_panel, detect_volume_anomalies, resolve_detectors,
+)
+
+
+def synthetic_panel(days=2520, tickers=1000, seed=0):
+    """
+    Builds a synthetic daily OHLCV panel: fat-tailed GBM closes, opens with overnight
+    gaps and log-normal volumes with occasional spikes.
+
+    Returns:
+        dict: 'Open', 'Close' and 'Volume' DataFrames with dates as rows and tickers as columns.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2015-01-01", periods=days, name="Date")
+    columns = [f"T{i:04d}" for i in range(tickers)]
+
+    returns = rng.standard_t(4, (days, tickers)) * rng.uniform(0.005, 0.02, tickers)
+    close = 100 * np.exp(np.cumsum(returns, axis=0))
+    open_ = np.empty_like(close)
+    open_[0] = close[0]
+    open_[1:] = close[:-1] * (1 + rng.standard_t(4, (days - 1, tickers)) * 0.003)
+
+    volume = rng.lognormal(14, 0.4, (days, tickers))
+    spikes = rng.random((days, tickers)) < 0.002
+    volume[spikes] *= rng.uniform(3, 10, spikes.sum())
+
+    frame = lambda values: pd.DataFrame(values, index=index, columns=columns)
+    return {"Open": frame(open_), "Close": frame(close), "Volume": frame(np.round(volume))}
+
+
+def flat_segment_volume(days=2520, tickers=1000, seed=0):
+    """
+    Builds a volume matrix that stresses the rolling statistics: large, volatile volumes
+    with a run of identical bars (a halted or padded feed) at a random point of every
+    ticker, at a level far above the rest of its history.
+
+    Returns:
+        pd.DataFrame: Volumes with dates as rows and tickers as columns.
+    """
+    rng = np.random.default_rng(seed)
+    volume = np.round(rng.lognormal(17, 0.8, (days, tickers)))
+    flat_bars = min(120, days // 4)
+    starts = rng.integers(0, days - flat_bars + 1, tickers)
+    rows = starts[:, None] + np.arange(flat_bars)
+    volume[rows, np.arange(tickers)[:, None]] = np.round(rng.uniform(1e8, 1e9, tickers))[:, None]
+    return pd.DataFrame(volume, index=pd.bdate_range("2015-01-01", periods=days, name="Date"),
+                        columns=[f"T{i:04d}" for i in range(tickers)])
+
+
+def pandas_detectors(data, detectors):
+    """
+    The per-ticker baseline: every detector as its own pandas pass over one ticker's frame.
+
+    Returns:
+        dict: name -> bool Series.
+    """
+    flags = {}
+    returns = data["Close"].pct_change()
+    for name, settings in detectors.items():
+        if name == "volume_zscore":
+            flags[name] = detect_volume_anomalies(data.copy(), settings["window"], settings["threshold"])["volume_anomaly"]
+        elif name == "return_zscore":
+            rolling = returns.rolling(settings["window"])
+            zscore = (returns - rolling.mean().shift()) / rolling.std().shift()
+            flags[name] = zscore.abs() > settings["threshold"]
+        elif name == "volume_mad":
+            rolling = data["Volume"].rolling(settings["window"])
+            median = rolling.median().shift()
+            mad = rolling.apply(lambda x: np.median(np.abs(x - np.median(x))), raw=True).shift()
+            flags[name] = (data["Volume"] - median) / (1.4826 * mad) > settings["threshold"]
+        else:
+            span = settings["span"]
+            sigma = np.sqrt((returns ** 2).ewm(span=span, adjust=False, min_periods=span).mean()).shift()
+            if name == "ewma_volatility":
+                flags[name] = returns.abs() > settings["band"] * sigma
+            else:
+                gap = data["Open"] / data["Close"].shift() - 1
+                flags[name] = gap.abs() > settings["threshold"] * sigma
+    return flags
+
+
+def _timed(func, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_sweep(volume, windows, factors, baseline_tickers):
+    """
+    Times calibrate_volume_anomalies against one detect_volume_anomalies call per
+    (ticker, window, factor), and checks the anomaly counts agree.
+
+    Returns:
+        dict: The timings and the number of (ticker, combination) count mismatches.
+    """
+    start = time.perf_counter()
+    sweep = calibrate_volume_anomalies(volume, windows, factors, per_ticker=True)
+    sweep_seconds = time.perf_counter() - start
+    counts = sweep.set_index(["ticker", "window", "std_dev_factor"])["anomalies"]
+
+    columns = volume.columns[:baseline_tickers]
+    mismatches = 0
+    start = time.perf_counter()
+    for ticker in columns:
+        for window in windows:
+            for factor in factors:
+                flags = detect_volume_anomalies(volume[ticker].to_frame("Volume"), window, factor)["volume_anomaly"]
+                mismatches += int(flags.sum() != counts[(ticker, window, factor)])
+    loop_seconds = (time.perf_counter() - start) * volume.shape[1] / len(columns)
+    return {
+        "combinations": len(windows) * len(factors),
+        "sweep_s": round(sweep_seconds, 3),
+        "per_call_s (scaled)": round(loop_seconds, 2),
+        "speedup": round(loop_seconds / sweep_seconds, 1),
+        "count_mismatches": mismatches,
+    }
+
+
+def main():
+    """
+    Times the single-pass anomaly engine against per-ticker pandas passes on a synthetic
+    panel, per detector and with every detector enabled, and checks the flags agree.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the multi-detector anomaly engine.")
+    parser.add_argument("--days", type=int, default=2520, help="Bars per ticker (2520 is about 10 years).")
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--baseline-tickers", type=int, default=20,
+                        help="Tickers run through the pandas baseline; its time is scaled up to --tickers.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported.")
+    parser.add_argument("--windows", default="10,20,30,45,60,90", help="Comma-separated windows for the calibration sweep.")
+    parser.add_argument("--factors", default="2,2.5,3,3.5,4", help="Comma-separated std_dev_factors for the calibration sweep.")
+    args = parser.parse_args()
+
+    print(f"🧪 Building a {args.days} x {args.tickers} synthetic OHLCV panel...")
+    panel = synthetic_panel(args.days, args.tickers)
+    baseline_columns = panel["Close"].columns[:args.baseline_tickers]
+    scale = args.tickers / len(baseline_columns)
+
+    rows = []
+    for selection in [[name] for name in DETECTORS] + [list(DETECTORS)]:
+        label = selection[0] if len(selection) == 1 else "all"
+        detectors = resolve_detectors(selection)
+
+        engine_seconds, result = _timed(lambda: detect_anomalies_panel(panel, selection), args.repeat)
+
+        def baseline():
+            return {
+                ticker: pandas_detectors(pd.DataFrame({field: panel[field][ticker] for field in panel}), detectors)
+                for ticker in baseline_columns
+            }
+        baseline_seconds, reference = _timed(baseline, 1)
+
+        mismatches = sum(
+            int((result["flags"][name][ticker].to_numpy() != flags.to_numpy()).sum())
+            for ticker, ticker_flags in reference.items()
+            for name, flags in ticker_flags.items()
+        )
+        rows.append({
+            "detectors": label,
+            "engine_s": round(engine_seconds, 3),
+            "pandas_s (scaled)": round(baseline_seconds * scale, 2),
+            "speedup": round(baseline_seconds * scale / engine_seconds, 1),
+            "anomalies": int(result["anomaly"].to_numpy().sum()),
+            "flag_mismatches": mismatches,
+        })
+        print(f"⏱️ {label}: {engine_seconds:.3f}s")
+
+    print(f"\n📊 Anomaly engine vs per-ticker pandas ({args.days} bars x {args.tickers} tickers, "
+          f"pandas measured on {len(baseline_columns)} tickers):")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+    windows = [int(w) for w in args.windows.split(",")]
+    factors = [float(f) for f in args.factors.split(",")]
+    print(f"\n📊 Calibration sweep ({len(windows)} windows x {len(factors)} factors) vs one call per combination:")
+    sweeps = {
+        "lognormal": panel["Volume"],
+        "flat segments": flat_segment_volume(args.days, args.tickers),
+    }
+    print(pd.DataFrame([
+        {"volume": label, **benchmark_sweep(volume, windows, factors, len(baseline_columns))}
+        for label, volume in sweeps.items()
+    ]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 # anomaly_detection.py
 
+import json
+import os
+
+import numpy as np
 import pandas as pd
 
 def detect_volume_anomalies(data, window=30, std_dev_factor=2.5):
@@ -34,21 +38,643 @@ def detect_volume_anomalies(data, window=30, std_dev_factor=2.5):
 
     # Identify anomalies
     data['volume_anomaly'] = data['Volume'] > anomaly_threshold
-    
-    # Provide a reason for the anomaly
-    def get_reason(row):
-        if row['volume_anomaly']:
-            mean_vol = rolling_mean[row.name]
-            return (
-                f"Volume of {row['Volume']:,} was "
-                f"{row['Volume'] / mean_vol:.1f}x higher than the {window}-day average."
-            )
-        return ""
-        
-    data['anomaly_reason'] = data.apply(get_reason, axis=1)
+    data['anomaly_reason'] = anomaly_reasons(data['Volume'], rolling_mean, data['volume_anomaly'], window)
+
+    return data
+
+def anomaly_reasons(volume, rolling_mean, is_anomaly, window):
+    """
+    Builds the 'anomaly_reason' text for flagged rows only; other rows get "".
+
+    Strings are assembled with Series operations over the anomalous rows, so the cost
+    grows with the number of anomalies rather than with the length of the history.
+
+    Args:
+        volume (pd.Series): Trading volume.
+        rolling_mean (pd.Series): Rolling mean volume, aligned with `volume`.
+        is_anomaly (pd.Series): Boolean flags, aligned with `volume`.
+        window (int): The rolling window size, quoted in the text.
+
+    Returns:
+        pd.Series: One reason per row of `volume`.
+    """
+    reasons = pd.Series("", index=volume.index, dtype=object)
+    is_anomaly = is_anomaly.fillna(False).astype(bool)
+    if is_anomaly.any():
+        flagged = volume[is_anomaly]
+        ratio = flagged / rolling_mean[is_anomaly]
+        reasons[is_anomaly] = (
+            "Volume of " + flagged.map("{:,}".format) + " was "
+            + ratio.map("{:.1f}".format) + f"x higher than the {window}-day average."
+        )
+    return reasons
+
+# Windows whose sum of squared deviations is below this fraction of the running sum of
+# squares are within the subtraction's rounding error and are recomputed from their values
+_CANCELLATION_RTOL = 1e-9
+# A window whose std is below this fraction of its mean only differs by rounding error
+_FLAT_RTOL = 1e-12
+# Windows x window length recomputed at a time, to bound memory
+_RECOMPUTE_BLOCK_ELEMENTS = 1 << 22
+
+class RollingSums:
+    """
+    Prefix sums of every column of a 2-D array, from which the rolling mean and sample
+    standard deviation of any window size follow in O(rows) without re-scanning the data.
+
+    Columns are centred before summing to keep the sum-of-squares subtraction accurate.
+    Windows with (almost) no spread left after the subtraction, such as a flat stretch
+    after a volatile, large-magnitude history, are recomputed directly from their values,
+    re-centred on their last bar, so they come out flat (mean equal to the bar, std 0)
+    as with pandas instead of as rounding noise.
+    """
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.values = values
+        self.shape = values.shape
+        missing = np.isnan(values)
+        with np.errstate(invalid="ignore"):
+            self._center = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(values.shape[1:])
+        centred = np.where(missing, 0.0, values - self._center)
+
+        def prefix(x):
+            # A leading zero row makes every window sum a single subtraction
+            cumulative = np.zeros((values.shape[0] + 1,) + values.shape[1:], dtype=x.dtype)
+            np.cumsum(x, axis=0, out=cumulative[1:])
+            return cumulative
+
+        self._sums = prefix(centred)
+        self._squares = prefix(centred * centred)
+        self._missing = prefix(missing.astype(np.int64))
+
+    def mean_std(self, window):
+        """
+        Returns the rolling (mean, std) arrays for one window size.
+
+        Windows containing a NaN, and the first `window - 1` rows, are NaN (like
+        pandas' rolling(window) with the default min_periods).
+        """
+        mean = np.full(self.shape, np.nan)
+        std = np.full(self.shape, np.nan)
+        if self.shape[0] < window:
+            return mean, std
+
+        sums = self._sums[window:] - self._sums[:-window]
+        squares = self._squares[window:] - self._squares[:-window]
+        complete = self._missing[window:] - self._missing[:-window] == 0
+
+        window_mean = sums / window
+        deviations = squares - sums * window_mean if window > 1 else np.zeros_like(sums)
+        variance = np.maximum(deviations, 0.0) / max(window - 1, 1)
+        mean[window - 1:] = np.where(complete, window_mean + self._center, np.nan)
+        std[window - 1:] = np.where(complete, np.sqrt(variance), np.nan)
+
+        noisy = complete & (deviations <= _CANCELLATION_RTOL * self._squares[window:])
+        self._recompute(window, *np.nonzero(noisy), mean, std)
+        return mean, std
+
+    def _recompute(self, window, starts, columns, mean, std):
+        """Computes the given windows (by first row and column) directly from their values."""
+        offsets = np.arange(window)
+        step = max(1, _RECOMPUTE_BLOCK_ELEMENTS // window)
+        for begin in range(0, len(starts), step):
+            rows, cols = starts[begin:begin + step], columns[begin:begin + step]
+            block = self.values[rows[:, None] + offsets, cols[:, None]]
+            reference = block[:, -1]
+            centred = block - reference[:, None]
+            centred_mean = centred.mean(axis=1)
+            spread = centred - centred_mean[:, None]
+            window_std = np.sqrt((spread * spread).sum(axis=1) / (window - 1)) if window > 1 else np.zeros(len(rows))
+            window_mean = reference + centred_mean
+            flat = window_std <= _FLAT_RTOL * np.abs(window_mean)
+            end = rows + window - 1
+            mean[end, cols] = np.where(flat, reference, window_mean)
+            std[end, cols] = np.where(flat, 0.0, window_std)
+
+def rolling_mean_std(values, window):
+    """
+    Computes the rolling mean and sample standard deviation of every column of a 2-D array
+    in one pass, from cumulative sums (see RollingSums).
+
+    Args:
+        values (np.ndarray): Shape (n_rows, n_columns).
+        window (int): The rolling window size.
+
+    Returns:
+        tuple: (mean, std) arrays with the shape of `values`.
+    """
+    return RollingSums(values).mean_std(window)
+
+def calibrate_volume_anomalies(volume, windows=(10, 20, 30, 60), std_dev_factors=(2.0, 2.5, 3.0, 3.5), per_ticker=False):
+    """
+    Sweeps the window and std_dev_factor of detect_volume_anomalies over a grid.
+
+    Prefix sums of the volume are built once; each window then costs one subtraction
+    pass and each factor one comparison, for every ticker at once, instead of a full
+    detect_volume_anomalies call per (ticker, window, factor).
+
+    Args:
+        volume (pd.DataFrame | pd.Series): Volume matrix with dates as rows and tickers
+                                           as columns, or a single ticker's volume.
+        windows (iterable): Rolling window sizes to try.
+        std_dev_factors (iterable): Factors to try.
+        per_ticker (bool): Report every ticker separately instead of the whole universe.
+
+    Returns:
+        pd.DataFrame: One row per combination (and ticker) with 'window', 'std_dev_factor',
+                      'anomalies', 'bars' (bars with a complete window) and 'anomaly_rate'.
+    """
+    if isinstance(volume, pd.Series):
+        volume = volume.to_frame()
+    values = volume.to_numpy(dtype=np.float64)
+    rolling = RollingSums(values)
+    tickers = np.asarray(volume.columns)
+
+    rows = []
+    with np.errstate(invalid="ignore"):
+        for window in windows:
+            mean, std = rolling.mean_std(window)
+            bars = (~np.isnan(std) & ~np.isnan(values)).sum(axis=0)
+            for factor in std_dev_factors:
+                anomalies = (values > mean + std * factor).sum(axis=0)
+                if per_ticker:
+                    rows.append(pd.DataFrame({
+                        "ticker": tickers, "window": window, "std_dev_factor": factor,
+                        "anomalies": anomalies, "bars": bars,
+                    }))
+                else:
+                    rows.append(pd.DataFrame({
+                        "window": [window], "std_dev_factor": [factor],
+                        "anomalies": [anomalies.sum()], "bars": [bars.sum()],
+                    }))
+
+    columns = (["ticker"] if per_ticker else []) + ["window", "std_dev_factor", "anomalies", "bars"]
+    sweep = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=columns)
+    sweep["anomaly_rate"] = sweep["anomalies"] / sweep["bars"].where(sweep["bars"] > 0)
+    return sweep
+
+def detect_volume_anomalies_panel(volume, window=30, std_dev_factor=2.5):
+    """
+    Detects volume anomalies for many tickers at once.
+
+    Rolling statistics and flags for every column are computed in one NumPy pass
+    (see rolling_mean_std), with the same rule as detect_volume_anomalies.
+
+    Args:
+        volume (pd.DataFrame): Volume matrix with dates as rows and tickers as columns.
+        window (int): The rolling window size to calculate the mean and standard deviation.
+        std_dev_factor (float): The number of standard deviations above the mean
+                                to be considered an anomaly.
+
+    Returns:
+        dict: 'volume_anomaly' (bool), 'rolling_mean' and 'rolling_std' DataFrames shaped
+              like `volume`, and 'events', a DataFrame with one row per anomaly
+              (date, ticker, volume, rolling_mean, ratio, anomaly_reason).
+    """
+    mean, std = rolling_mean_std(volume.to_numpy(dtype=np.float64), window)
+    with np.errstate(invalid="ignore"):
+        flags = volume.to_numpy(dtype=np.float64) > mean + std * std_dev_factor
+
+    rows, cols = np.nonzero(flags)
+    flagged = volume.to_numpy(dtype=np.float64)[rows, cols]
+    if np.array_equal(flagged, np.round(flagged)):
+        # Volumes are share counts; gaps elsewhere in the matrix only made them floats
+        flagged = flagged.astype(np.int64)
+    events = pd.DataFrame({
+        "date": volume.index[rows],
+        "ticker": volume.columns[cols],
+        "volume": flagged,
+        "rolling_mean": mean[rows, cols],
+    })
+    events["ratio"] = events["volume"] / events["rolling_mean"]
+    events["anomaly_reason"] = anomaly_reasons(
+        events["volume"], events["rolling_mean"], pd.Series(True, index=events.index), window
+    )
+
+    return {
+        "volume_anomaly": pd.DataFrame(flags, index=volume.index, columns=volume.columns),
+        "rolling_mean": pd.DataFrame(mean, index=volume.index, columns=volume.columns),
+        "rolling_std": pd.DataFrame(std, index=volume.index, columns=volume.columns),
+        "events": events,
+    }
+
+# Detectors of detect_anomalies and their default settings. Windows are in bars; the
+# return, MAD and gap detectors compare each bar with statistics of the bars before it.
+DETECTORS = {
+    # The rule of detect_volume_anomalies: volume above mean + threshold x std (window includes the bar)
+    "volume_zscore": {"window": 30, "threshold": 2.5},
+    # |return - mean| above threshold x std of the previous `window` returns
+    "return_zscore": {"window": 30, "threshold": 3.0},
+    # Volume more than threshold robust z-scores (1.4826 x MAD) above the previous `window` bars' median
+    "volume_mad": {"window": 30, "threshold": 5.0},
+    # |return| above `band` x the EWMA volatility estimated up to the previous bar
+    "ewma_volatility": {"span": 20, "band": 3.0},
+    # |open / previous close - 1| above threshold x the same EWMA volatility
+    "overnight_gap": {"span": 20, "threshold": 3.0},
+}
+
+_DETECTOR_FIELDS = {
+    "volume_zscore": ("Volume",),
+    "return_zscore": ("Close",),
+    "volume_mad": ("Volume",),
+    "ewma_volatility": ("Close",),
+    "overnight_gap": ("Open", "Close"),
+}
+
+# Rows of window views processed at a time by the MAD detector, to bound memory
+_MAD_BLOCK_ROWS = 256
+
+def resolve_detectors(detectors=None):
+    """
+    Turns a detector selection into {name: settings}.
+
+    Args:
+        detectors: None for every detector with default settings, a list of the names to
+                   run, or a dict of name -> settings overrides applied on top of every
+                   detector (False/None switches a detector off, True keeps its defaults).
+
+    Returns:
+        dict: Enabled detectors with their full settings.
+    """
+    if detectors is None:
+        detectors = {}
+    if isinstance(detectors, dict):
+        detectors = {**{name: True for name in DETECTORS}, **detectors}
+    else:
+        detectors = {name: True for name in detectors}
+
+    resolved = {}
+    for name, settings in detectors.items():
+        if name not in DETECTORS:
+            raise ValueError(f"Unknown detector: {name!r} (expected one of {sorted(DETECTORS)})")
+        if settings is False or settings is None:
+            continue
+        resolved[name] = {**DETECTORS[name], **(settings if isinstance(settings, dict) else {})}
+    return resolved
+
+def _shift_down(values):
+    """Shifts rows down by one (row t gets row t-1's values), so statistics exclude the current bar."""
+    shifted = np.full(values.shape, np.nan)
+    shifted[1:] = values[:-1]
+    return shifted
+
+def _rolling_median_mad(values, window):
+    """Rolling median and median absolute deviation of every column, NaN where a window is incomplete."""
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    median = np.full(values.shape, np.nan)
+    mad = np.full(values.shape, np.nan)
+    if values.shape[0] < window:
+        return median, mad
+    low, high = (window - 1) // 2, window // 2
+    windows = sliding_window_view(values, window, axis=0)  # (rows - window + 1, columns, window)
+    for start in range(0, windows.shape[0], _MAD_BLOCK_ROWS):
+        # Sorting the short windows is several times faster than np.median's partitioning
+        block = np.sort(windows[start:start + _MAD_BLOCK_ROWS], axis=-1)
+        block_median = (block[..., low] + block[..., high]) / 2
+        deviations = np.sort(np.abs(block - block_median[..., None]), axis=-1)
+        rows = slice(window - 1 + start, window - 1 + start + len(block))
+        median[rows] = block_median
+        mad[rows] = (deviations[..., low] + deviations[..., high]) / 2
+
+    # Sorting moves NaN to the end instead of propagating it; blank windows that hold any
+    missing = np.cumsum(np.isnan(values), axis=0)
+    has_nan = np.zeros(values.shape, dtype=bool)
+    has_nan[window - 1] = missing[window - 1] > 0
+    has_nan[window:] = missing[window:] - missing[:-window] > 0
+    median[has_nan] = np.nan
+    mad[has_nan] = np.nan
+    return median, mad
+
+def _ewma_volatility(returns, span):
+    """EWMA volatility of every column (RiskMetrics-style, on squared returns), up to and including each row."""
+    variance = pd.DataFrame(returns * returns).ewm(span=span, adjust=False, min_periods=span).mean()
+    return np.sqrt(variance.to_numpy())
+
+def _format_percent(values):
+    return values.map("{:+.2%}".format)
+
+def run_detectors(open_, close, volume, detectors=None):
+    """
+    Runs the enabled detectors over OHLCV matrices (rows are bars, columns are tickers).
+
+    Shared state is computed once and reused: returns feed the return z-score and the
+    EWMA volatility, and the EWMA volatility feeds both the volatility band and the gap
+    detector. Every statistic is computed for all columns at once.
+
+    Args:
+        open_, close, volume (np.ndarray): Arrays of shape (n_bars, n_tickers); a field may
+                                           be None if no enabled detector needs it.
+        detectors: Detector selection (see resolve_detectors).
+
+    Returns:
+        dict: name -> {'flags': bool array, plus the arrays its reason text needs}.
+    """
+    detectors = resolve_detectors(detectors)
+    fields = {"Open": open_, "Close": close, "Volume": volume}
+    for name in detectors:
+        missing = [field for field in _DETECTOR_FIELDS[name] if fields[field] is None]
+        if missing:
+            raise ValueError(f"Detector {name!r} needs the {', '.join(missing)} column(s)")
+
+    results = {}
+    returns, volatility = None, {}
+    if close is not None:
+        close = np.asarray(close, dtype=np.float64)
+        returns = np.full(close.shape, np.nan)
+        returns[1:] = close[1:] / close[:-1] - 1
+    if volume is not None:
+        volume = np.asarray(volume, dtype=np.float64)
+
+    def prior_volatility(span):
+        if span not in volatility:
+            volatility[span] = _shift_down(_ewma_volatility(returns, span))
+        return volatility[span]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if "volume_zscore" in detectors:
+            settings = detectors["volume_zscore"]
+            mean, std = rolling_mean_std(volume, settings["window"])
+            results["volume_zscore"] = {"flags": volume > mean + std * settings["threshold"], "mean": mean}
+
+        if "return_zscore" in detectors:
+            settings = detectors["return_zscore"]
+            mean, std = (_shift_down(stat) for stat in rolling_mean_std(returns, settings["window"]))
+            zscore = (returns - mean) / std
+            results["return_zscore"] = {"flags": np.abs(zscore) > settings["threshold"], "returns": returns, "zscore": zscore}
+
+        if "volume_mad" in detectors:
+            settings = detectors["volume_mad"]
+            median, mad = (_shift_down(stat) for stat in _rolling_median_mad(volume, settings["window"]))
+            robust_z = (volume - median) / (1.4826 * mad)
+            results["volume_mad"] = {"flags": robust_z > settings["threshold"], "robust_z": robust_z}
+
+        if "ewma_volatility" in detectors:
+            settings = detectors["ewma_volatility"]
+            sigma = prior_volatility(settings["span"])
+            results["ewma_volatility"] = {
+                "flags": np.abs(returns) > settings["band"] * sigma, "returns": returns, "sigma": sigma,
+            }
+
+        if "overnight_gap" in detectors:
+            settings = detectors["overnight_gap"]
+            open_ = np.asarray(open_, dtype=np.float64)
+            gap = np.full(open_.shape, np.nan)
+            gap[1:] = open_[1:] / close[:-1] - 1
+            sigma = prior_volatility(settings["span"])
+            results["overnight_gap"] = {"flags": np.abs(gap) > settings["threshold"] * sigma, "gap": gap, "sigma": sigma}
+
+    return results
+
+def _detector_reasons(name, settings, flagged):
+    """Builds the reason text of one detector from a DataFrame of its flagged rows."""
+    if name == "volume_zscore":
+        return anomaly_reasons(flagged["volume"], flagged["mean"], pd.Series(True, index=flagged.index), settings["window"])
+    if name == "return_zscore":
+        return (
+            "Return of " + _format_percent(flagged["returns"]) + " was "
+            + flagged["zscore"].abs().map("{:.1f}".format)
+            + f" standard deviations from its {settings['window']}-day mean."
+        )
+    if name == "volume_mad":
+        return (
+            "Volume of " + flagged["volume"].map("{:,}".format) + " was "
+            + flagged["robust_z"].map("{:.1f}".format) + f" MADs above its {settings['window']}-day median."
+        )
+    if name == "ewma_volatility":
+        return (
+            "Move of " + _format_percent(flagged["returns"]) + " exceeded "
+            + f"{settings['band']:g}x the EWMA volatility of " + flagged["sigma"].map("{:.2%}".format) + "."
+        )
+    return (
+        "Overnight gap of " + _format_percent(flagged["gap"]) + " was "
+        + (flagged["gap"].abs() / flagged["sigma"]).map("{:.1f}".format) + "x the EWMA volatility."
+    )
+
+def _anomaly_events(results, detectors, volume, index, columns):
+    """Collects one row per (bar, ticker, detector) anomaly with its reason text."""
+    frames = []
+    for name, result in results.items():
+        rows, cols = np.nonzero(result["flags"])
+        if len(rows) == 0:
+            continue
+        flagged = pd.DataFrame({
+            "date": index[rows],
+            "ticker": columns[cols],
+            "detector": name,
+        })
+        for key, values in result.items():
+            if key != "flags":
+                flagged[key] = values[rows, cols]
+        if volume is not None:
+            flagged_volume = volume[rows, cols]
+            if np.array_equal(flagged_volume, np.round(flagged_volume)):
+                flagged_volume = flagged_volume.astype(np.int64)
+            flagged["volume"] = flagged_volume
+        flagged["anomaly_reason"] = _detector_reasons(name, detectors[name], flagged).to_numpy()
+        frames.append(flagged[["date", "ticker", "detector", "anomaly_reason"]])
+    if not frames:
+        return pd.DataFrame(columns=["date", "ticker", "detector", "anomaly_reason"])
+    # A stable sort keeps the detectors of one bar in DETECTORS order
+    return pd.concat(frames, ignore_index=True).sort_values(["date", "ticker"], kind="stable", ignore_index=True)
+
+def detect_anomalies_panel(panel, detectors=None):
+    """
+    Runs several anomaly detectors over many tickers in one vectorized pass.
+
+    Args:
+        panel (dict): OHLCV matrices as DataFrames with dates as rows and tickers as
+                      columns, under the keys 'Open', 'Close' and 'Volume' (only the ones
+                      the enabled detectors need).
+        detectors: None for all of DETECTORS, a list of names, or a dict of settings
+                   overrides (see resolve_detectors).
+
+    Returns:
+        dict: 'flags' maps each detector to a bool DataFrame shaped like the inputs,
+              'anomaly' is True where any detector fired, and 'events' holds one row per
+              anomaly (date, ticker, detector, anomaly_reason).
+    """
+    reference = next(frame for frame in panel.values() if frame is not None)
+    matrix = lambda field: panel[field].to_numpy(dtype=np.float64) if panel.get(field) is not None else None
+    volume = matrix("Volume")
+    results = run_detectors(matrix("Open"), matrix("Close"), volume, detectors)
+
+    flags = {
+        name: pd.DataFrame(result["flags"], index=reference.index, columns=reference.columns)
+        for name, result in results.items()
+    }
+    anomaly = np.zeros(reference.shape, dtype=bool)
+    for result in results.values():
+        anomaly |= result["flags"]
+    return {
+        "flags": flags,
+        "anomaly": pd.DataFrame(anomaly, index=reference.index, columns=reference.columns),
+        "events": _anomaly_events(results, resolve_detectors(detectors), volume, reference.index, reference.columns),
+    }
+
+def detect_anomalies(data, detectors=None):
+    """
+    Runs several anomaly detectors over one ticker's OHLCV history (e.g. yf.Ticker.history).
+
+    Args:
+        data (pd.DataFrame): Bars with 'Open', 'Close' and 'Volume' columns (only the ones
+                             the enabled detectors need).
+        detectors: None for all of DETECTORS, a list of names, or a dict of settings
+                   overrides (see resolve_detectors).
+
+    Returns:
+        pd.DataFrame: The original DataFrame with a '<detector>_anomaly' column per enabled
+                      detector, 'anomaly' (any detector fired) and 'anomaly_reason' (the
+                      reasons of every detector that fired, joined by spaces).
+    """
+    panel = {field: data[[field]] if field in data else None for field in ("Open", "Close", "Volume")}
+    result = detect_anomalies_panel(panel, detectors)
 
+    for name, flags in result["flags"].items():
+        data[f"{name}_anomaly"] = flags.iloc[:, 0].to_numpy()
+    data['anomaly'] = result["anomaly"].iloc[:, 0].to_numpy()
+
+    reasons = pd.Series("", index=data.index, dtype=object)
+    events = result["events"]
+    if not events.empty:
+        joined = events.groupby("date", sort=False)["anomaly_reason"].agg(" ".join)
+        reasons[joined.index] = joined.to_numpy()
+    data['anomaly_reason'] = reasons.to_numpy()
     return data
 
+class OnlineVolumeDetector:
+    """
+    A streaming version of detect_volume_anomalies for live feeds.
+
+    Each symbol keeps its last `window` volumes in a ring buffer together with a running
+    mean and sum of squared deviations, updated in O(1) per bar (a sliding-window
+    Welford update), so the cost of an update does not depend on how much history has
+    been seen. A bar is flagged with the same rule as the batch function, its volume
+    counting towards its own window, and events carry the same reason text. Missing
+    volumes are skipped.
+
+    The full state is a plain dict (see state_dict/from_state), so a detector can be
+    checkpointed to JSON and resumed later.
+    """
+    # Recompute the running statistics from the buffer this often, to stop
+    # floating-point drift from building up over very long streams
+    RESYNC_EVERY = 100_000
+
+    def __init__(self, window=30, std_dev_factor=2.5):
+        self.window = window
+        self.std_dev_factor = std_dev_factor
+        self._symbols = {}
+
+    def _new_state(self):
+        return {"buffer": [0.0] * self.window, "pos": 0, "count": 0, "mean": 0.0, "m2": 0.0, "updates": 0}
+
+    def _resync(self, state):
+        values = np.asarray(state["buffer"][:state["count"]] if state["count"] < self.window else state["buffer"])
+        state["mean"] = float(values.mean())
+        state["m2"] = float(((values - state["mean"]) ** 2).sum())
+
+    def update(self, volume, timestamp=None, symbol=None):
+        """
+        Adds one bar and checks it.
+
+        Args:
+            volume (float): The bar's volume.
+            timestamp: Optional; copied into the event.
+            symbol (str): Optional; each symbol has its own window.
+
+        Returns:
+            dict: An anomaly event ('symbol', 'timestamp', 'volume', 'rolling_mean',
+                  'ratio', 'anomaly_reason'), or None if the bar is not anomalous.
+        """
+        if volume is None or volume != volume:
+            return None
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = self._symbols[symbol] = self._new_state()
+
+        x = float(volume)
+        buffer, window = state["buffer"], self.window
+        if state["count"] < window:
+            buffer[state["pos"]] = x
+            state["count"] += 1
+            delta = x - state["mean"]
+            state["mean"] += delta / state["count"]
+            state["m2"] += delta * (x - state["mean"])
+        else:
+            old = buffer[state["pos"]]
+            buffer[state["pos"]] = x
+            old_mean = state["mean"]
+            state["mean"] += (x - old) / window
+            state["m2"] += (x - old) * (x - state["mean"] + old - old_mean)
+        state["pos"] = (state["pos"] + 1) % window
+
+        state["updates"] += 1
+        if state["updates"] % self.RESYNC_EVERY == 0:
+            self._resync(state)
+
+        if state["count"] < window:
+            return None
+        std = (max(state["m2"], 0.0) / (window - 1)) ** 0.5 if window > 1 else 0.0
+        if not x > state["mean"] + std * self.std_dev_factor:
+            return None
+        ratio = volume / state["mean"]
+        return {
+            "symbol": symbol,
+            "timestamp": timestamp,
+            "volume": volume,
+            "rolling_mean": state["mean"],
+            "ratio": ratio,
+            "anomaly_reason": f"Volume of {volume:,} was {ratio:.1f}x higher than the {window}-day average.",
+        }
+
+    def update_many(self, volumes, symbol=None):
+        """
+        Adds a micro-batch of bars for one symbol, in order.
+
+        Args:
+            volumes (pd.Series): Volumes indexed by timestamp (or any iterable of volumes).
+            symbol (str): Optional; each symbol has its own window.
+
+        Returns:
+            list[dict]: The anomaly events of the batch.
+        """
+        items = volumes.items() if isinstance(volumes, pd.Series) else enumerate(volumes)
+        events = []
+        for timestamp, volume in items:
+            event = self.update(volume, timestamp, symbol)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def state_dict(self):
+        """Returns the detector's full state as a JSON-serialisable dict."""
+        return {
+            "window": self.window,
+            "std_dev_factor": self.std_dev_factor,
+            # JSON object keys must be strings, so symbols are stored as pairs
+            "symbols": [[symbol, dict(state, buffer=list(state["buffer"]))] for symbol, state in self._symbols.items()],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuilds a detector from state_dict() output."""
+        detector = cls(window=state["window"], std_dev_factor=state["std_dev_factor"])
+        detector._symbols = {symbol: dict(symbol_state) for symbol, symbol_state in state["symbols"]}
+        return detector
+
+    def save(self, path):
+        """Checkpoints the detector to a JSON file (written atomically)."""
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Restores a detector checkpointed with save()."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_state(json.load(f))
+
 def main():
     """
     Example usage of the anomaly detection function.
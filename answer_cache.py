@@ -0,0 +1,310 @@
+# answer_cache.py
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(_script_dir, "answer_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+
+# Cache hits whose last_access update is buffered before it is written to SQLite
+_TOUCH_FLUSH_SIZE = 32
+
+_NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+_CAPITALISED_PATTERN = re.compile(r"\b\w*[A-Z][\w&]*")
+# Capitalised words that start or pad a question rather than name what it is about
+_QUESTION_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "based", "by", "can", "could", "did", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "of", "on", "please", "the", "to", "was", "were", "what",
+    "when", "where", "which", "who", "why", "with",
+}
+
+
+def normalize_question(question):
+    """Lowercases a question, collapses whitespace and drops trailing punctuation."""
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?.! ")
+
+
+def _question_key(normalized):
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    A persistent cache of Q&A answers with exact and near-duplicate lookup.
+
+    Questions are matched exactly on their normalised form, or approximately when the
+    cosine similarity of their embeddings reaches `similarity_threshold`, both mention
+    the same numbers (so "FY2018" never answers "FY2019") and both are about the same
+    entities: the filters `question_filters` extracts (company, year, doc type), or
+    without it the same capitalised non-stopword words (so "3M" never answers
+    "Apple"). Entries expire
+    after `ttl_seconds`, the least recently used ones are evicted beyond `max_entries`,
+    and entries written for a different `version` (e.g. another vectorstore build)
+    are discarded when the cache is opened.
+
+    Entries live in SQLite and are mirrored in memory, with their embeddings stacked in
+    a matrix so a near-duplicate lookup is a single matrix-vector product. The matrix is
+    rebuilt lazily, on the first near-duplicate lookup after entries changed, and the
+    access times of cache hits are written to SQLite in batches (see flush).
+    """
+    def __init__(
+        self,
+        version,
+        embed_query=None,
+        path=DEFAULT_CACHE_PATH,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD,
+        question_filters=None,
+    ):
+        self.version = version
+        self.embed_query = embed_query
+        self.question_filters = question_filters
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+
+        self._lock = threading.Lock()
+        self._pending_touches = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                question TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                embedding BLOB,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                entities TEXT
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(answers)")}
+        if "entities" not in columns:
+            # Caches written before entities were recorded keep serving exact matches only
+            self._conn.execute("ALTER TABLE answers ADD COLUMN entities TEXT")
+        self._conn.execute("DELETE FROM answers WHERE version != ? OR created_at < ?", (version, self._cutoff()))
+        self._conn.commit()
+        self._load()
+
+    def _cutoff(self):
+        return time.time() - self.ttl_seconds
+
+    def _load(self):
+        self._entries = {}
+        rows = self._conn.execute(
+            "SELECT key, question, normalized, answer, sources, embedding, created_at, last_access, entities FROM answers"
+        )
+        for key, question, normalized, answer, sources, embedding, created_at, last_access, entities in rows:
+            self._entries[key] = {
+                "question": question,
+                "normalized": normalized,
+                "answer": answer,
+                "sources": json.loads(sources),
+                "embedding": np.frombuffer(embedding, dtype=np.float32) if embedding else None,
+                "created_at": created_at,
+                "last_access": last_access,
+                "entities": json.loads(entities) if entities else None,
+            }
+        self._rebuild_matrix()
+
+    def _rebuild_matrix(self):
+        keys = [key for key, entry in self._entries.items() if entry["embedding"] is not None]
+        self._matrix_keys = keys
+        self._matrix = np.vstack([self._entries[key]["embedding"] for key in keys]) if keys else None
+        self._matrix_stale = False
+
+    def _embed(self, question):
+        if self.embed_query is None:
+            return None
+        vector = np.asarray(self.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def _entities(self, question):
+        """The entities a near-duplicate has to share, as a JSON-serialisable dict."""
+        if self.question_filters is not None:
+            return {field: sorted(values) for field, values in self.question_filters(question).items()}
+        words = {word for word in _CAPITALISED_PATTERN.findall(question) if word.lower() not in _QUESTION_STOPWORDS}
+        return {"words": sorted(words)}
+
+    def _remove(self, keys):
+        for key in keys:
+            self._entries.pop(key, None)
+            self._pending_touches.pop(key, None)
+        self._conn.executemany("DELETE FROM answers WHERE key = ?", [(key,) for key in keys])
+        self._conn.commit()
+        self._matrix_stale = True
+
+    def _touch(self, key):
+        now = time.time()
+        self._entries[key]["last_access"] = now
+        self._pending_touches[key] = now
+        if len(self._pending_touches) >= _TOUCH_FLUSH_SIZE:
+            self._flush_touches()
+
+    def _flush_touches(self):
+        if self._pending_touches:
+            self._conn.executemany(
+                "UPDATE answers SET last_access = ? WHERE key = ?",
+                [(now, key) for key, now in self._pending_touches.items()],
+            )
+            self._conn.commit()
+            self._pending_touches = {}
+
+    def flush(self):
+        """
+        Writes the buffered access times of cache hits to SQLite. Unflushed times only
+        affect which entries are evicted first after a restart, never the answers.
+        """
+        with self._lock:
+            self._flush_touches()
+
+    def get(self, question):
+        """
+        Looks up a cached answer.
+
+        Returns:
+            dict: {'answer', 'sources', 'match'} where match is 'exact' or 'near',
+                  or None on a miss.
+        """
+        normalized = normalize_question(question)
+        key = _question_key(normalized)
+
+        # Embedding is a network call: make it before taking the lock, and only when a
+        # near-duplicate lookup can happen
+        vector = entities = None
+        if self.embed_query is not None:
+            with self._lock:
+                needs_vector = key not in self._entries and (self._matrix is not None or self._matrix_stale)
+            if needs_vector:
+                vector = self._embed(question)
+                entities = self._entities(question)
+
+        with self._lock:
+            expired = [k for k, entry in self._entries.items() if entry["created_at"] < self._cutoff()]
+            if expired:
+                self._remove(expired)
+            if self._matrix_stale:
+                self._rebuild_matrix()
+
+            match = None
+            if key in self._entries:
+                match = "exact"
+            elif self._matrix is not None:
+                if vector is not None:
+                    similarities = self._matrix @ vector
+                    numbers = set(_NUMBER_PATTERN.findall(normalized))
+                    for i in np.argsort(-similarities):
+                        if similarities[i] < self.similarity_threshold:
+                            break
+                        candidate = self._entries[self._matrix_keys[i]]
+                        if (set(_NUMBER_PATTERN.findall(candidate["normalized"])) == numbers
+                                and candidate["entities"] == entities):
+                            key, match = self._matrix_keys[i], "near"
+                            break
+
+            if match is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats[f"{match}_hits"] += 1
+            self._touch(key)
+            entry = self._entries[key]
+            return {"answer": entry["answer"], "sources": entry["sources"], "match": match}
+
+    def put(self, question, answer, sources=()):
+        """
+        Stores an answer.
+
+        Args:
+            question (str): The question as asked.
+            answer (str): The generated answer.
+            sources (list[dict]): JSON-serialisable source descriptions.
+        """
+        normalized = normalize_question(question)
+        key = _question_key(normalized)
+        embedding = self._embed(question)
+        entities = self._entities(question)
+        now = time.time()
+        sources = list(sources)
+        with self._lock:
+            self._entries[key] = {
+                "question": question,
+                "normalized": normalized,
+                "answer": answer,
+                "sources": sources,
+                "embedding": embedding,
+                "created_at": now,
+                "last_access": now,
+                "entities": entities,
+            }
+            self._pending_touches.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, self.version, question, normalized, answer, json.dumps(sources, default=str),
+                    embedding.astype(np.float32).tobytes() if embedding is not None else None, now, now,
+                    json.dumps(entities),
+                ),
+            )
+            # Buffered access times ride along with this commit
+            self._flush_touches()
+            self._conn.commit()
+            self._matrix_stale = True
+
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                by_access = sorted(self._entries, key=lambda k: self._entries[k]["last_access"])
+                self._remove(by_access[:overflow])
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._entries = {}
+            self._pending_touches = {}
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+            self._rebuild_matrix()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def open_answer_cache(version, embed_query=None, question_filters=None):
+    """
+    Opens the answer cache configured through environment variables.
+
+    ANSWER_CACHE=0 disables it; ANSWER_CACHE_PATH, ANSWER_CACHE_TTL (seconds),
+    ANSWER_CACHE_MAX_ENTRIES and ANSWER_CACHE_THRESHOLD override the defaults.
+
+    Returns:
+        AnswerCache: The cache, or None if it is disabled or cannot be opened.
+    """
+    if os.getenv("ANSWER_CACHE", "1") == "0":
+        return None
+    try:
+        return AnswerCache(
+            version,
+            embed_query=embed_query,
+            question_filters=question_filters,
+            path=os.getenv("ANSWER_CACHE_PATH", DEFAULT_CACHE_PATH),
+            ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            similarity_threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", DEFAULT_SIMILARITY_THRESHOLD)),
+        )
+    except (sqlite3.Error, ValueError) as e:
+        print(f"⚠️ Answer cache disabled: {e}")
+        return None
@@ -14,13 +14,9 @@ from typing import Dict, Any
 import pandas as pd
 import streamlit as st
 
-# Import modules
+# Import modules (analysis backends are imported on first use through the registry)
 from config import validate_api_key
-from qa_system import create_qa_chain
-from sentiment_analyzer import get_sentiment_pipeline
-from forecasting_model import fetch_stock_data, train_and_forecast
-from investment_strategy import generate_recommendation
-from anomaly_detection import detect_volume_anomalies
+from backend_registry import get_backend, preload_backend
 
 
 def _get_query_params() -> Dict[str, Any]:
@@ -203,6 +199,8 @@ with st.sidebar:
         forecast_button = st.button("Run Forecast")
 
     if analysis_mode == "Stock Analysis":
+        anomaly_detectors = list(get_backend("anomaly").DETECTORS)
+        selected_detectors = st.multiselect("Anomaly Detectors", anomaly_detectors, default=anomaly_detectors)
         analyze_button = st.button("Analyze Stock")
 
     if analysis_mode == "AI Q&A System":
@@ -210,6 +208,8 @@ with st.sidebar:
         qa_button = st.button("Get Answer")
 
     if analysis_mode == "Sentiment Analysis":
+        # Load and warm up the model while the user types
+        preload_backend("sentiment", "get_sentiment_pipeline")
         text_input = st.text_area("Enter financial text to analyze:")
         sentiment_button = st.button("Analyze Sentiment")
 
@@ -225,11 +225,12 @@ if analysis_mode == "Financial Forecasting" and 'forecast_button' in locals() an
         with st.spinner(f"Running forecast for {ticker}..."):
             start_date = "2020-01-01"
             end_date = date.today().strftime('%Y-%m-%d')
-            series = fetch_stock_data(ticker, start_date, end_date)
+            forecasting = get_backend("forecasting")
+            series = forecasting.fetch_stock_data(ticker, start_date, end_date)
             if series is None:
                 st.error(f"Could not fetch data for {ticker}.")
             else:
-                forecast = train_and_forecast(series, forecast_days)
+                forecast = forecasting.train_and_forecast(series, forecast_days, ticker=ticker)
                 if forecast is None:
                     st.error("Failed to generate forecast.")
                 else:
@@ -242,7 +243,7 @@ if analysis_mode == "Financial Forecasting" and 'forecast_button' in locals() an
                     st.line_chart(combined_df)
                     st.dataframe(forecast.to_frame(name="Forecasted Price"))
 
-                    rec, reason, metrics = generate_recommendation(series, forecast)
+                    rec, reason, metrics = get_backend("strategy").generate_recommendation(series, forecast)
                     st.subheader("🧭 Strategy Suggestion")
                     st.write(f"**Recommendation:** {rec}")
                     st.info(reason)
@@ -257,10 +258,12 @@ elif analysis_mode == "Stock Analysis" and 'analyze_button' in locals() and anal
             unsafe_allow_html=True,
         )
         with st.spinner("Analyzing stock data..."):
-            import yfinance as yf
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            hist = stock.history(period="1y")
+            import market_data
+            hist = market_data.get_history(ticker, period="1y")
+            info = {}
+            if not market_data.is_offline() and not hist.empty:
+                import yfinance as yf
+                info = yf.Ticker(ticker).info
 
             if hist.empty:
                 st.error("No data found for this ticker.")
@@ -280,16 +283,16 @@ elif analysis_mode == "Stock Analysis" and 'analyze_button' in locals() and anal
                 st.subheader("📈 Price Chart")
                 st.line_chart(hist["Close"])
 
-                st.subheader("🚨 Volume Anomaly Detection")
-                hist_with_anomalies = detect_volume_anomalies(hist.copy())
-                anomalies = hist_with_anomalies[hist_with_anomalies["volume_anomaly"]]
+                st.subheader("🚨 Anomaly Detection")
+                hist_with_anomalies = get_backend("anomaly").detect_anomalies(hist.copy(), selected_detectors)
+                anomalies = hist_with_anomalies[hist_with_anomalies["anomaly"]]
                 if not anomalies.empty:
                     st.warning(
-                        f"Found {len(anomalies)} potential volume anomalies in the last year."
+                        f"Found {len(anomalies)} potential anomalies in the last year."
                     )
-                    st.dataframe(anomalies[["Volume", "anomaly_reason"]].tail(10))
+                    st.dataframe(anomalies[["Close", "Volume", "anomaly_reason"]].tail(10))
                 else:
-                    st.success("No significant volume anomalies detected in the last year.")
+                    st.success("No significant anomalies detected in the last year.")
 
 elif analysis_mode == "AI Q&A System" and 'qa_button' in locals() and qa_button:
     if not has_api_key:
@@ -298,17 +301,33 @@ elif analysis_mode == "AI Q&A System" and 'qa_button' in locals() and qa_button:
         st.warning("Please enter a question.")
     else:
         st.markdown("<div class='feature-card'><h3>🧠 AI Q&A Response</h3></div>", unsafe_allow_html=True)
-        with st.spinner("AI is analyzing your question..."):
-            try:
-                qa_chain = create_qa_chain()
-                if not qa_chain:
-                    st.error("Failed to initialize Q&A system.")
-                else:
-                    response = qa_chain.invoke({"query": question})
-                    st.write(f"**Question:** {question}")
-                    st.success(f"**Answer:** {response['result']}")
-            except Exception as e:
-                st.error(f"Error: {str(e)}")
+        try:
+            with st.spinner("Retrieving relevant documents..."):
+                streamed = get_backend("qa").stream_question(question)
+            if not streamed:
+                st.error("Failed to initialize Q&A system.")
+            else:
+                sources, tokens, cached = streamed
+                st.write(f"**Question:** {question}")
+
+                # Sources are known before generation starts, so show them first
+                with st.expander(f"📚 Sources ({len(sources)})"):
+                    for doc in sources:
+                        page = doc.metadata.get("page_num")
+                        location = f", page {page + 1}" if isinstance(page, int) else ""
+                        st.markdown(f"- **{doc.metadata.get('doc_name', 'Unknown')}**{location}")
+
+                # Render tokens as the LLM produces them
+                answer_placeholder = st.empty()
+                answer = ""
+                for token in tokens:
+                    answer += token
+                    answer_placeholder.success(f"**Answer:** {answer}▌")
+                answer_placeholder.success(f"**Answer:** {answer}")
+                if cached:
+                    st.caption("⚡ Served from the answer cache")
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
 
 elif analysis_mode == "Sentiment Analysis" and 'sentiment_button' in locals() and sentiment_button:
     if not text_input or not text_input.strip():
@@ -316,13 +335,11 @@ elif analysis_mode == "Sentiment Analysis" and 'sentiment_button' in locals() an
     else:
         st.markdown("<div class='feature-card'><h3>📈 Sentiment Analysis Results</h3></div>", unsafe_allow_html=True)
         with st.spinner("Analyzing sentiment..."):
-            pipeline = get_sentiment_pipeline()
-            if not pipeline:
+            result = get_backend("sentiment").analyze_text(text_input)
+            if not result:
                 st.error("Failed to load sentiment model.")
             else:
-                result = pipeline(text_input)
-                label = result[0]['label']
-                score = result[0]['score']
+                label, score = result
                 col1, col2 = st.columns(2)
                 with col1:
                     st.metric("Sentiment", label)
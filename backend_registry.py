@@ -0,0 +1,74 @@
+# backend_registry.py
+
+import importlib
+import threading
+import time
+
+# Analysis backends by name. Each one is only imported the first time a mode needs it,
+# so viewing a stock chart never pays for langchain, transformers or statsmodels.
+BACKENDS = {
+    "qa": "qa_system",
+    "sentiment": "sentiment_analyzer",
+    "forecasting": "forecasting_model",
+    "strategy": "investment_strategy",
+    "anomaly": "anomaly_detection",
+}
+
+_lock = threading.Lock()
+_load_seconds = {}
+_preloads = set()
+
+
+def get_backend(name):
+    """
+    Imports a backend module on first use and returns it.
+
+    Python caches imported modules, so later calls (including Streamlit reruns) are
+    dictionary lookups. The time of the first import is recorded in load_times().
+
+    Args:
+        name (str): A key of BACKENDS.
+
+    Returns:
+        module: The backend module.
+    """
+    if name not in BACKENDS:
+        raise KeyError(f"Unknown backend: {name!r} (expected one of {sorted(BACKENDS)})")
+    with _lock:
+        if name not in _load_seconds:
+            start = time.perf_counter()
+            module = importlib.import_module(BACKENDS[name])
+            _load_seconds[name] = time.perf_counter() - start
+            return module
+    return importlib.import_module(BACKENDS[name])
+
+
+def load_times():
+    """Returns the first-import time in seconds of every backend loaded so far."""
+    return dict(_load_seconds)
+
+
+def preload_backend(name, loader_name):
+    """
+    Imports a backend and calls one of its loaders in a background thread, once per process.
+
+    Used to load and warm up a model as soon as its mode is opened, so the first request
+    does not wait for it. Callers that need the model before the preload finishes simply
+    block on the same load (see model_registry.get_model).
+
+    Args:
+        name (str): A key of BACKENDS.
+        loader_name (str): Name of a no-argument function in the backend module.
+    """
+    with _lock:
+        if (name, loader_name) in _preloads:
+            return
+        _preloads.add((name, loader_name))
+
+    def run():
+        try:
+            getattr(get_backend(name), loader_name)()
+        except Exception as e:
+            print(f"⚠️ Preloading {name}.{loader_name} failed: {e}")
+
+    threading.Thread(target=run, name=f"preload-{name}", daemon=True).start()
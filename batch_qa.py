@@ -0,0 +1,197 @@
+# batch_qa.py
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from config import validate_api_key
+from data_loader import DataLoader
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT_DIR = os.path.join(_script_dir, "batch_results")
+EVAL_MODE = "hybridStore"
+
+
+def load_completed_ids(output_path):
+    """
+    Reads an existing results file and returns the ids answered without error,
+    so an interrupted run can resume where it stopped.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A torn final line from an interrupted run
+            if not record.get("error"):
+                completed.add(record["financebench_id"])
+    return completed
+
+
+def compact_results(output_path):
+    """
+    Rewrites a results file with one line per question, keeping its latest record, so
+    a question that errored and then succeeded on resume is not listed twice.
+
+    Returns:
+        int: The number of records kept.
+    """
+    latest = {}
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            latest[record["financebench_id"]] = line if line.endswith("\n") else line + "\n"
+
+    tmp_path = f"{output_path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(latest.values())
+    os.replace(tmp_path, output_path)
+    return len(latest)
+
+
+def answer_one(row, answer_fn, model_name, temperature):
+    """
+    Answers one FinanceBench question and returns its results record.
+
+    Errors are recorded in the 'error' field instead of being raised, so one failing
+    question does not stop the batch and is retried on resume.
+    """
+    start = time.perf_counter()
+    model_answer, error, cached = "", None, None
+    try:
+        response = answer_fn(row["question"])
+        model_answer = response["result"]
+        cached = response.get("cached")
+    except Exception as e:
+        error = str(e)
+
+    # Same leading fields as data/financebench-main/results/*.jsonl
+    return {
+        "financebench_id": row["financebench_id"],
+        "model_name": model_name,
+        "eval_mode": EVAL_MODE,
+        "temp": temperature,
+        "question": row["question"],
+        "gold_answer": row["answer"],
+        "model_answer": model_answer,
+        "latency_seconds": round(time.perf_counter() - start, 4),
+        "cached": cached,
+        "error": error,
+    }
+
+
+def run_batch(questions_df, answer_fn, output_path, model_name, temperature, max_workers=4, limit=None):
+    """
+    Runs every question with bounded concurrency, appending each result to a JSONL file
+    as soon as it completes. Once the run finishes the file is compacted to the latest
+    record per question (see compact_results).
+
+    Args:
+        questions_df (pd.DataFrame): FinanceBench questions (financebench_open_source.jsonl).
+        answer_fn (callable): Maps a question to a dict with a 'result' key.
+        output_path (str): JSONL file to append to; questions already in it are skipped.
+        model_name (str): Stored in each record's 'model_name'.
+        temperature (float): Stored in each record's 'temp'.
+        max_workers (int): Questions in flight at once.
+        limit (int): Only run the first `limit` pending questions.
+
+    Returns:
+        dict: Counts, wall time, throughput and latency percentiles of this run.
+    """
+    completed = load_completed_ids(output_path)
+    rows = [row for row in questions_df.to_dict("records") if row["financebench_id"] not in completed]
+    if limit is not None:
+        rows = rows[:limit]
+    print(f"📋 {len(questions_df)} questions, {len(completed)} already answered, running {len(rows)}...")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    write_lock = threading.Lock()
+    latencies, errors = [], 0
+    start = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(answer_one, row, answer_fn, model_name, temperature) for row in rows]
+        for done, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            with write_lock:
+                out.write(json.dumps(record, default=str) + "\n")
+                out.flush()
+            if record["error"]:
+                errors += 1
+                print(f"❌ {record['financebench_id']}: {record['error']}")
+            else:
+                latencies.append(record["latency_seconds"])
+            if done % 10 == 0:
+                print(f"  Processed {done}/{len(rows)} questions...")
+
+    wall_seconds = time.perf_counter() - start
+    compact_results(output_path)
+    summary = {
+        "answered": len(latencies),
+        "errors": errors,
+        "wall_seconds": round(wall_seconds, 2),
+        "questions_per_second": round(len(rows) / wall_seconds, 3) if rows else 0.0,
+    }
+    if latencies:
+        for q in (50, 95, 99):
+            summary[f"p{q}_latency_seconds"] = round(float(np.percentile(latencies, q)), 3)
+    return summary
+
+
+def main():
+    """
+    Command-line entry point: answers every FinanceBench question and writes a
+    results-compatible JSONL file.
+    """
+    parser = argparse.ArgumentParser(description="Run the Q&A system over all FinanceBench questions.")
+    parser.add_argument("--output", default=None, help="Results JSONL path (resumed if it exists).")
+    parser.add_argument("--workers", type=int, default=4, help="Questions answered concurrently.")
+    parser.add_argument("--limit", type=int, default=None, help="Only answer this many pending questions.")
+    parser.add_argument("--use-answer-cache", action="store_true",
+                        help="Serve repeats from the answer cache (off by default so latencies are real).")
+    args = parser.parse_args()
+
+    if not validate_api_key():
+        print("Error: GOOGLE_API_KEY not found or invalid. Please check your .env file.")
+        return
+
+    # Imported here so run_batch can be reused without the LLM stack installed
+    import qa_system
+
+    qa_chain = qa_system.create_qa_chain()
+    if not qa_chain:
+        print("❌ Failed to create Q&A chain")
+        return
+
+    if args.use_answer_cache:
+        answer_fn = qa_system.query_qa_system
+    else:
+        def answer_fn(question):
+            return qa_chain.invoke({"query": question})
+
+    questions_df = DataLoader().load_jsonl_file("financebench_open_source.jsonl")
+    if questions_df is None:
+        return
+
+    output_path = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"{qa_system.LLM_MODEL}_{EVAL_MODE}.jsonl")
+    summary = run_batch(
+        questions_df, answer_fn, output_path, qa_system.LLM_MODEL, qa_system.LLM_TEMPERATURE,
+        max_workers=args.workers, limit=args.limit,
+    )
+    print(f"\n✅ Results written to {output_path}")
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
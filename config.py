@@ -4,10 +4,20 @@ Handles loading environment variables and API keys
 """
 
 import os
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+_env_loaded = False
+
+def load_environment():
+    """
+    Load environment variables from the .env file, once per process.
+
+    Deferred until a setting is first needed so that importing this module stays cheap.
+    """
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
 
 def get_google_api_key():
     """
@@ -19,6 +29,7 @@ def get_google_api_key():
     Raises:
         ValueError: If API key is not found
     """
+    load_environment()
     api_key = os.getenv('GOOGLE_API_KEY')
     if not api_key:
         raise ValueError(
@@ -40,10 +51,14 @@ def validate_api_key():
     except ValueError:
         return False
 
-# Make API key available at module level for easy import
-try:
-    GOOGLE_API_KEY = get_google_api_key()
-    print("✅ Google API key loaded successfully")
-except ValueError as e:
-    GOOGLE_API_KEY = None
-    print(f"❌ Error loading API key: {e}")
+def __getattr__(name):
+    """
+    Make the API key available at module level for easy import (`from config import GOOGLE_API_KEY`),
+    resolved on first access rather than at import time.
+    """
+    if name == "GOOGLE_API_KEY":
+        try:
+            return get_google_api_key()
+        except ValueError:
+            return None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,152 @@
+# corpus.py
+
+import threading
+from collections import namedtuple
+
+from data_loader import DataLoader
+from pdf_ingestion import DEFAULT_PDF_DIR, list_pdfs
+
+DOCUMENT_INFO_FILE = "financebench_document_information.jsonl"
+QUESTIONS_FILE = "financebench_open_source.jsonl"
+
+# One filing. Metadata fields are None for PDFs missing from the document information file,
+# and pdf_path is None for filings whose PDF is not on disk.
+DocumentEntry = namedtuple(
+    "DocumentEntry",
+    ["doc_name", "company", "gics_sector", "doc_type", "doc_period", "doc_link", "pdf_path", "question_ids"],
+)
+
+_corpus = None
+_lock = threading.Lock()
+
+
+class Corpus:
+    """
+    A catalog of the FinanceBench filings, joining the document information file, the
+    question file and the PDFs on disk.
+
+    Entries are held in a dict by doc_name, with hash indexes by company, GICS sector,
+    period and document type, so every lookup is a dictionary access rather than a
+    DataFrame scan. Document types are lowercase ("10k", "10q", "8k", "earnings").
+    """
+    def __init__(self, loader=None, pdf_dir=DEFAULT_PDF_DIR):
+        loader = loader or DataLoader()
+        doc_info_df = loader.load_jsonl_file(DOCUMENT_INFO_FILE)
+        questions_df = loader.load_jsonl_file(QUESTIONS_FILE)
+        pdfs = list_pdfs(pdf_dir)
+
+        question_ids = {}
+        if questions_df is not None:
+            for doc_name, financebench_id in zip(questions_df["doc_name"], questions_df["financebench_id"]):
+                question_ids.setdefault(doc_name, []).append(financebench_id)
+
+        self.entries = {}
+        if doc_info_df is not None:
+            for row in doc_info_df.to_dict("records"):
+                doc_name = row["doc_name"]
+                self.entries[doc_name] = DocumentEntry(
+                    doc_name=doc_name,
+                    company=row["company"],
+                    gics_sector=row["gics_sector"],
+                    doc_type=str(row["doc_type"]).lower(),
+                    doc_period=int(row["doc_period"]),
+                    doc_link=row["doc_link"],
+                    pdf_path=pdfs.get(doc_name),
+                    question_ids=tuple(question_ids.get(doc_name, ())),
+                )
+        for doc_name, pdf_path in pdfs.items():
+            if doc_name not in self.entries:
+                self.entries[doc_name] = DocumentEntry(
+                    doc_name, None, None, None, None, None, pdf_path, tuple(question_ids.get(doc_name, ()))
+                )
+
+        self._indexes = {field: {} for field in ("company", "gics_sector", "doc_period", "doc_type")}
+        for entry in self.entries.values():
+            for field, index in self._indexes.items():
+                value = getattr(entry, field)
+                if value is not None:
+                    index.setdefault(value, []).append(entry.doc_name)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, doc_name):
+        return doc_name in self.entries
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def get(self, doc_name):
+        """Returns the DocumentEntry of a filing, or None if it is unknown."""
+        return self.entries.get(doc_name)
+
+    def pdf_path(self, doc_name):
+        """Returns the path of a filing's PDF, or None if it is unknown or not on disk."""
+        entry = self.entries.get(doc_name)
+        return entry.pdf_path if entry else None
+
+    def find(self, company=None, gics_sector=None, doc_period=None, doc_type=None):
+        """
+        Returns the filings matching every given field, sorted by doc_name.
+
+        Fields left as None are not filtered on. With no fields at all, every filing is returned.
+
+        Returns:
+            list[DocumentEntry]: The matching filings.
+        """
+        filters = {"company": company, "gics_sector": gics_sector, "doc_period": doc_period, "doc_type": doc_type}
+        if doc_type is not None:
+            filters["doc_type"] = doc_type.lower()
+        if doc_period is not None:
+            filters["doc_period"] = int(doc_period)
+
+        matches = None
+        # Start from the smallest posting list so the intersection stays small
+        postings = sorted(
+            (self._indexes[field].get(value, []) for field, value in filters.items() if value is not None),
+            key=len,
+        )
+        for posting in postings:
+            matches = set(posting) if matches is None else matches.intersection(posting)
+            if not matches:
+                return []
+        names = sorted(self.entries) if matches is None else sorted(matches)
+        return [self.entries[name] for name in names]
+
+    def values(self, field):
+        """
+        Returns the distinct values of an indexed field, sorted (e.g. for a dropdown).
+
+        Args:
+            field (str): One of 'company', 'gics_sector', 'doc_period' or 'doc_type'.
+        """
+        return sorted(self._indexes[field])
+
+    def metadata(self, doc_name):
+        """
+        Returns the retrieval metadata of a filing.
+
+        Returns:
+            dict: {'company', 'doc_period', 'doc_type', 'gics_sector'}, or {} for
+                  filings missing from the document information file.
+        """
+        entry = self.entries.get(doc_name)
+        if entry is None or entry.company is None:
+            return {}
+        return {
+            "company": entry.company,
+            "doc_period": entry.doc_period,
+            "doc_type": entry.doc_type,
+            "gics_sector": entry.gics_sector,
+        }
+
+
+def get_corpus():
+    """
+    Returns the process-wide Corpus, building it on first use.
+    """
+    global _corpus
+    with _lock:
+        if _corpus is None:
+            _corpus = Corpus()
+        return _corpus
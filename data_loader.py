@@ -1,45 +1,248 @@
 # data_loader.py
 
-import pandas as pd
+import json
 import os
+import pandas as pd
+
+from evidence_table import EVIDENCE_DTYPES, build_evidence_table
+
+# Explicit column types of the FinanceBench files. Columns not listed (such as the
+# nested 'evidence' lists) keep the types pandas infers.
+FILE_DTYPES = {
+    "financebench_open_source.jsonl": {
+        "financebench_id": "string",
+        "company": "string",
+        "doc_name": "string",
+        "question_type": "string",
+        "question_reasoning": "string",
+        "domain_question_num": "string",
+        "question": "string",
+        "answer": "string",
+        "justification": "string",
+        "dataset_subset_label": "string",
+    },
+    "financebench_document_information.jsonl": {
+        "doc_name": "string",
+        "company": "string",
+        "gics_sector": "string",
+        "doc_type": "string",
+        "doc_period": "int64",
+        "doc_link": "string",
+    },
+}
+
+# Bump this when the cached representation changes so existing caches are rebuilt
+CACHE_VERSION = 1
+_CACHE_METADATA_KEY = b"findocgpt.source"
+
+# Files already loaded in this process, keyed by path; reused while size and mtime match
+_frames = {}
+# Evidence tables already built in this process, keyed like _frames
+_evidence_tables = {}
 
 class DataLoader:
     """
     A robust class for loading and managing the FinanceBench dataset files.
     This approach is cleaner and more reusable for a large project.
+
+    Parsed files are cached as Parquet under `cache_dir`. A cache is used only while
+    the source file's size and modification time match the ones recorded in it, and
+    it is read memory-mapped, so loading a large file skips JSON parsing entirely.
     """
-    def __init__(self, base_dir="data"):
+    def __init__(self, base_dir="data", cache_dir=None, use_cache=True):
         """
         Initializes the DataLoader with the base directory for data files.
         """
         # Finds the absolute path of the data directory to avoid FileNotFoundError
         script_dir = os.path.dirname(os.path.abspath(__file__))
         self.data_dir = os.path.join(script_dir, base_dir, "financebench-main", "data")
+        self.cache_dir = cache_dir or os.path.join(script_dir, "data_cache")
+        self.use_cache = use_cache
+
+    def _source_signature(self, file_path):
+        stat = os.stat(file_path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "cache_version": CACHE_VERSION}
+
+    def cache_path(self, filename, kind=None):
+        """Returns the path of a file's Parquet cache, or of a table derived from it (e.g. kind="evidence")."""
+        stem = os.path.splitext(filename)[0]
+        return os.path.join(self.cache_dir, f"{stem}.{kind}.parquet" if kind else f"{stem}.parquet")
+
+    def _apply_dtypes(self, filename, df):
+        dtypes = {col: dtype for col, dtype in FILE_DTYPES.get(filename, {}).items() if col in df}
+        return df.astype(dtypes) if dtypes else df
+
+    def _read_cache(self, filename, signature, kind=None):
+        """Returns the cached table memory-mapped if it matches `signature`, else None."""
+        import pyarrow.parquet as pq
+
+        path = self.cache_path(filename, kind)
+        if not os.path.exists(path):
+            return None
+        try:
+            metadata = pq.read_schema(path).metadata or {}
+            if json.loads(metadata.get(_CACHE_METADATA_KEY, b"null")) != signature:
+                return None
+            return pq.read_table(path, memory_map=True)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable cache for {filename}: {e}")
+            return None
+
+    def _write_cache(self, filename, df, signature, kind=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[_CACHE_METADATA_KEY] = json.dumps(signature).encode("utf-8")
+            table = table.replace_schema_metadata(metadata)
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.cache_path(filename, kind)
+            tmp_path = f"{path}.tmp.{os.getpid()}"
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️ Could not cache {filename}: {e}")
+
+    def _table_to_frame(self, table):
+        import pyarrow as pa
+
+        df = table.to_pandas()
+        # Arrow hands nested lists back as numpy arrays; restore plain lists like read_json gives
+        for field in table.schema:
+            if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+                df[field.name] = df[field.name].map(lambda value: list(value) if value is not None else value)
+        return df
+
+    def load_table(self, filename):
+        """
+        Loads a JSONL file as a memory-mapped pyarrow Table, building its Parquet cache if needed.
+
+        Returns:
+            pyarrow.Table: The table, or None if the file is missing or cannot be read.
+        """
+        file_path = os.path.join(self.data_dir, filename)
+        if not os.path.exists(file_path):
+            print(f"Error: File not found at path: {os.path.abspath(file_path)}")
+            return None
+
+        signature = self._source_signature(file_path)
+        table = self._read_cache(filename, signature)
+        if table is None:
+            df = self.load_jsonl_file(filename)
+            if df is None:
+                return None
+            table = self._read_cache(filename, signature)
+        return table
 
     def load_jsonl_file(self, filename):
         """
         Loads a single JSONL file into a pandas DataFrame.
-        
+
+        Files are parsed once: later calls in the same process reuse the parsed frame, and
+        later processes read the Parquet cache, as long as the file has not changed.
+
         Args:
             filename (str): The name of the file to load (e.g., "financebench_document_information.jsonl").
-            
+
         Returns:
             pd.DataFrame: The loaded DataFrame, or None if an error occurs.
         """
         file_path = os.path.join(self.data_dir, filename)
-        
+
         if not os.path.exists(file_path):
             print(f"Error: File not found at path: {os.path.abspath(file_path)}")
             return None
-        
+
+        signature = self._source_signature(file_path)
+        cached = _frames.get(file_path)
+        if cached is not None and cached[0] == signature:
+            # Callers add columns to the frame they get, so each one gets its own copy
+            return cached[1].copy()
+
+        source = "JSONL"
         try:
-            df = pd.read_json(file_path, lines=True)
-            print(f"Successfully loaded {filename} with {len(df)} entries.")
-            return df
+            table = self._read_cache(filename, signature) if self.use_cache else None
+            if table is not None:
+                df, source = self._table_to_frame(table), "Parquet cache"
+            else:
+                df = self._apply_dtypes(filename, pd.read_json(file_path, lines=True))
+                if self.use_cache:
+                    self._write_cache(filename, df, signature)
+        except ImportError:
+            # pyarrow is not installed; parse the JSONL every time
+            df = self._apply_dtypes(filename, pd.read_json(file_path, lines=True))
         except Exception as e:
             print(f"Error reading {filename}: {e}")
             return None
 
+        _frames[file_path] = (signature, df)
+        print(f"Successfully loaded {filename} with {len(df)} entries (from {source}).")
+        return df.copy()
+
+    def load_evidence_table(self, filename="financebench_open_source.jsonl"):
+        """
+        Returns the evidence table of a questions file (see evidence_table.build_evidence_table).
+
+        The table is built once and shared: later calls in the same process reuse it, and
+        later processes read it from a Parquet cache next to the file's own, as long as the
+        file has not changed. Its question_index is the row position in load_jsonl_file(filename).
+
+        Returns:
+            pd.DataFrame: The evidence table, or None if the file cannot be loaded.
+        """
+        file_path = os.path.join(self.data_dir, filename)
+        if not os.path.exists(file_path):
+            print(f"Error: File not found at path: {os.path.abspath(file_path)}")
+            return None
+
+        signature = self._source_signature(file_path)
+        cached = _evidence_tables.get(file_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1].copy()
+
+        try:
+            table = self._read_cache(filename, signature, "evidence") if self.use_cache else None
+        except ImportError:
+            table = None
+        if table is not None:
+            evidence = table.to_pandas().astype(EVIDENCE_DTYPES)
+        else:
+            df = self.load_jsonl_file(filename)
+            if df is None:
+                return None
+            evidence = build_evidence_table(df)
+            if self.use_cache:
+                try:
+                    self._write_cache(filename, evidence, signature, "evidence")
+                except ImportError:
+                    pass
+
+        _evidence_tables[file_path] = (signature, evidence)
+        return evidence.copy()
+
+    def iter_jsonl_chunks(self, filename, chunksize=10000):
+        """
+        Reads a JSONL file in chunks, for files too large to load at once.
+
+        Args:
+            filename (str): The name of the file to read.
+            chunksize (int): Rows per chunk.
+
+        Yields:
+            pd.DataFrame: Consecutive chunks, with the same column types as load_jsonl_file.
+        """
+        file_path = os.path.join(self.data_dir, filename)
+        if not os.path.exists(file_path):
+            print(f"Error: File not found at path: {os.path.abspath(file_path)}")
+            return
+
+        with pd.read_json(file_path, lines=True, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield self._apply_dtypes(filename, chunk)
+
 # --- Example Usage (for demonstration purposes) ---
 if __name__ == "__main__":
     # Create an instance of the DataLoader class
@@ -52,11 +255,11 @@ if __name__ == "__main__":
         print("\nDocument Information DataFrame:")
         print(doc_info_df.head())
         print("\n---")
-        
+
     # Now, let's load the other file to show reusability
     open_source_df = loader.load_jsonl_file("financebench_open_source.jsonl")
 
     if open_source_df is not None:
         print("\nOpen Source DataFrame:")
         print(open_source_df.head())
-        print("\n---")
\ No newline at end of file
+        print("\n---")
@@ -0,0 +1,303 @@
+# embedding_backend.py
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import load_environment
+from embedding_cache import CachedEmbeddings, DEFAULT_CACHE_DIR, DEFAULT_QUERY_CACHE_SIZE
+
+GOOGLE_EMBEDDING_MODEL = "models/embedding-001"
+
+# Defaults, overridable through environment variables (see get_embeddings)
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_MINUTE = 0  # 0 disables rate limiting
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_HASHING_SIZE = 768
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9$%.]+")
+
+
+@lru_cache(maxsize=200_000)
+def _hashing_bucket(seed, size, token):
+    """Signed bucket of one token, shared by every HashingEmbeddings with the same seed and size."""
+    digest = hashlib.blake2b(f"{seed}:{token}".encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % size, 1.0 if (value >> 63) else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    A deterministic, offline embedder based on the hashing trick.
+
+    Each lowercase token and token bigram is hashed to a signed bucket, which amounts to a
+    sparse random projection of the bag-of-words vector. Vectors are L2-normalised, so
+    inner product and cosine similarity agree. It needs no network or model weights,
+    which makes it suitable for benchmarking index builds and for tests.
+    """
+    def __init__(self, size=DEFAULT_HASHING_SIZE, seed=0):
+        self.size = size
+        self.seed = seed
+        self.model_name = f"hashing-{size}-seed{seed}"
+
+    def _bucket(self, token):
+        return _hashing_bucket(self.seed, self.size, token)
+
+    def embed_array(self, texts):
+        """
+        Embeds texts into a float32 matrix of shape (len(texts), size).
+        """
+        matrix = np.zeros((len(texts), self.size), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN_PATTERN.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                index, sign = self._bucket(feature)
+                matrix[row, index] += sign
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_array([text])[0].tolist()
+
+
+class _RateLimiter:
+    """
+    Spaces out requests evenly to stay under a requests-per-minute budget.
+
+    Uses a threading lock so one limiter can be shared by every event loop and thread
+    that embeds through the same backend.
+    """
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Reserves the next request slot and returns how long to wait for it."""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return slot - now
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain embeddings with batching, bounded concurrency, rate limiting
+    and retry with exponential backoff.
+
+    Documents are split into batches of `batch_size` and sent to the wrapped embedder
+    with at most `max_concurrency` batches in flight. Failed batches are retried up to
+    `max_retries` times. Throughput counters are kept in `stats`.
+    """
+    def __init__(
+        self,
+        inner,
+        model_name,
+        batch_size=DEFAULT_BATCH_SIZE,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff_base=1.0,
+        backoff_max=60.0,
+    ):
+        self.inner = inner
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._rate_limiter = _RateLimiter(requests_per_minute)
+        self.stats = {"texts": 0, "batches": 0, "retries": 0, "seconds": 0.0}
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _embed_batch_sync(self, texts):
+        """Embeds one batch on the calling thread, honouring the rate limit and retries."""
+        for attempt in range(self.max_retries + 1):
+            wait = self._rate_limiter.reserve()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return self.inner.embed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                self.stats["retries"] += 1
+                print(f"⚠️ Embedding batch failed ({e}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+    async def _embed_batch(self, texts, semaphore):
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                wait = self._rate_limiter.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                try:
+                    return await asyncio.to_thread(self.inner.embed_documents, texts)
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    self.stats["retries"] += 1
+                    print(f"⚠️ Embedding batch failed ({e}), retrying in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+
+    async def aembed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(self._embed_batch(batch, semaphore) for batch in batches))
+
+        self.stats["texts"] += len(texts)
+        self.stats["batches"] += len(batches)
+        self.stats["seconds"] += time.perf_counter() - start
+        return [vector for batch in results for vector in batch]
+
+    def embed_documents(self, texts):
+        coro = self.aembed_documents(texts)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # Already inside an event loop (e.g. called from async code): run on a helper thread
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
+
+    def embed_query(self, text):
+        return self._embed_batch_sync([text])[0]
+
+    async def aembed_query(self, text):
+        return (await asyncio.to_thread(self._embed_batch_sync, [text]))[0]
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    try:
+        return int(value) if value else default
+    except ValueError:
+        print(f"⚠️ Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+
+def get_embeddings(backend=None, cache=None):
+    """
+    Builds the configured embedding backend.
+
+    Args:
+        backend (str): "google" (Gemini embeddings, needs GOOGLE_API_KEY) or "hashing"
+                       (offline). Defaults to the EMBEDDING_BACKEND environment variable,
+                       then "google".
+        cache (bool): Whether to wrap the backend in the persistent embedding cache
+                      (see embedding_cache.py). Defaults to EMBEDDING_CACHE, which is on
+                      unless set to "0".
+
+    Batching is configured through EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_CONCURRENCY,
+    EMBEDDING_REQUESTS_PER_MINUTE and EMBEDDING_MAX_RETRIES.
+
+    Returns:
+        Embeddings: The embedder; its `model_name` identifies the vector space.
+    """
+    load_environment()
+    backend = (backend or os.getenv("EMBEDDING_BACKEND", "google")).lower()
+
+    if backend == "google":
+        # Imported lazily so the offline backend works without the Google packages
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        from config import get_google_api_key
+
+        inner = GoogleGenerativeAIEmbeddings(model=GOOGLE_EMBEDDING_MODEL, google_api_key=get_google_api_key())
+        model_name = GOOGLE_EMBEDDING_MODEL
+    elif backend == "hashing":
+        inner = HashingEmbeddings(size=_env_int("EMBEDDING_HASHING_SIZE", DEFAULT_HASHING_SIZE))
+        model_name = inner.model_name
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend!r} (expected 'google' or 'hashing')")
+
+    embeddings = BatchedEmbeddings(
+        inner,
+        model_name,
+        batch_size=_env_int("EMBEDDING_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+        max_concurrency=_env_int("EMBEDDING_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY),
+        requests_per_minute=_env_int("EMBEDDING_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE),
+        max_retries=_env_int("EMBEDDING_MAX_RETRIES", DEFAULT_MAX_RETRIES),
+    )
+
+    if cache is None:
+        cache = os.getenv("EMBEDDING_CACHE", "1") != "0"
+    if cache:
+        embeddings = CachedEmbeddings(
+            embeddings,
+            cache_dir=os.getenv("EMBEDDING_CACHE_DIR", DEFAULT_CACHE_DIR),
+            query_cache_size=_env_int("EMBEDDING_QUERY_CACHE_SIZE", DEFAULT_QUERY_CACHE_SIZE),
+        )
+    return embeddings
+
+
+def main():
+    """
+    Benchmarks embedding throughput on the chunked FinanceBench evidence.
+    """
+    from data_loader import DataLoader
+    from analysis import extract_and_clean_evidence
+    from vectorstore_index import get_text_splitter
+
+    parser = argparse.ArgumentParser(description="Benchmark an embedding backend on FinanceBench chunks.")
+    parser.add_argument("--backend", default="hashing", help="'hashing' (offline) or 'google'.")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--cache", action="store_true", help="Go through the persistent embedding cache.")
+    args = parser.parse_args()
+
+    loader = DataLoader()
+    df = loader.load_jsonl_file("financebench_open_source.jsonl")
+    if df is None:
+        return
+    evidence = loader.load_evidence_table("financebench_open_source.jsonl")
+    texts = get_text_splitter().split_text("\n\n".join(extract_and_clean_evidence(df, evidence)['cleaned_text']))
+
+    embeddings = get_embeddings(args.backend, cache=args.cache)
+    batched = embeddings.inner if args.cache else embeddings
+    if args.batch_size:
+        batched.batch_size = args.batch_size
+    if args.concurrency:
+        batched.max_concurrency = args.concurrency
+
+    print(f"🔢 Embedding {len(texts)} chunks with {embeddings.model_name} "
+          f"(batch size {batched.batch_size}, concurrency {batched.max_concurrency})...")
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    seconds = time.perf_counter() - start
+    print(f"✅ {len(vectors)} vectors of dim {len(vectors[0]) if vectors else 0} in {seconds:.2f}s "
+          f"({len(texts) / max(seconds, 1e-9):,.0f} texts/sec, {batched.stats['retries']} retries)")
+    if args.cache:
+        print(f"💾 Cache hits: {embeddings.stats['hits']}, misses: {embeddings.stats['misses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# embedding_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(_script_dir, "embedding_cache")
+DEFAULT_QUERY_CACHE_SIZE = 1024
+
+
+def text_hash(text):
+    """Returns the SHA-256 hex digest of a text, used as its cache key."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    A persistent, append-only store of embedding vectors for one model.
+
+    Layout (under <cache_dir>/<model slug>/):
+        meta.json     {"model_name": ..., "dim": ...}
+        vectors.f32   raw float32 rows, appended in order
+        index.jsonl   one {"h": text hash, "row": n} line per stored vector
+
+    The vector file is memory-mapped on load, so opening a large cache costs only the
+    index parse. Vectors are written before their index lines, so a crash can at worst
+    leave unreferenced rows, never index entries pointing at missing data; a torn
+    partial row is cut off on load so later rows stay aligned.
+    """
+    def __init__(self, model_name, cache_dir=DEFAULT_CACHE_DIR):
+        self.model_name = model_name
+        self.path = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.index_path = os.path.join(self.path, "index.jsonl")
+        self.meta_path = os.path.join(self.path, "meta.json")
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.dim = None
+        self.rows = {}
+        self._matrix = None
+        self._num_rows = 0
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            return
+
+        size = os.path.getsize(self.vectors_path)
+        self._num_rows = size // (4 * self.dim)
+        if size != self._num_rows * 4 * self.dim:
+            # Drop the partial row of an interrupted append before anything is appended after it
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(self._num_rows * 4 * self.dim)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A torn final line from an interrupted write
+                    if entry["row"] < self._num_rows:
+                        self.rows[entry["h"]] = entry["row"]
+        self._remap()
+
+    def _remap(self):
+        if self._num_rows:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._num_rows, self.dim))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get_many(self, hashes):
+        """
+        Looks up vectors by text hash.
+
+        Returns:
+            list: One float32 array (a view into the memory map) or None per hash.
+        """
+        return [self._matrix[self.rows[h]] if h in self.rows else None for h in hashes]
+
+    def put_many(self, hashes, vectors):
+        """
+        Appends vectors for text hashes not yet in the store.
+        """
+        with self._lock:
+            new = {}
+            for h, vector in zip(hashes, vectors):
+                if h not in self.rows and h not in new:
+                    new[h] = vector
+            if not new:
+                return
+
+            matrix = np.asarray(list(new.values()), dtype=np.float32)
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                with open(self.meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model_name": self.model_name, "dim": self.dim}, f)
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match cache dimension {self.dim}")
+
+            with open(self.vectors_path, "ab") as f:
+                f.write(matrix.tobytes())
+            first_row = self._num_rows
+            self._num_rows += len(new)
+            # get_many reads without the lock, so the new rows are mapped before they are published
+            self._remap()
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                for offset, h in enumerate(new):
+                    f.write(json.dumps({"h": h, "row": first_row + offset}) + "\n")
+                    self.rows[h] = first_row + offset
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedder with a persistent document-vector cache and an in-memory LRU
+    cache for queries.
+
+    Documents are looked up by (model, text hash) in an EmbeddingStore and only the
+    misses are sent to the wrapped embedder. Queries are kept separately because some
+    models (including Gemini's) embed queries and documents differently.
+    """
+    def __init__(self, inner, cache_dir=DEFAULT_CACHE_DIR, query_cache_size=DEFAULT_QUERY_CACHE_SIZE):
+        self.inner = inner
+        self.model_name = inner.model_name
+        self.store = EmbeddingStore(self.model_name, cache_dir)
+        self.query_cache_size = query_cache_size
+        self._query_cache = OrderedDict()
+        self._query_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "query_hits": 0, "query_misses": 0}
+
+    def _split(self, texts):
+        hashes = [text_hash(text) for text in texts]
+        cached = self.store.get_many(hashes)
+        missing = {}
+        for text, h, vector in zip(texts, hashes, cached):
+            if vector is None:
+                missing.setdefault(h, text)
+        self.stats["hits"] += len(texts) - sum(vector is None for vector in cached)
+        self.stats["misses"] += len(missing)
+        return hashes, cached, missing
+
+    def _merge(self, hashes, cached, missing, new_vectors):
+        fresh = dict(zip(missing, new_vectors))
+        self.store.put_many(list(fresh), list(fresh.values()))
+        return [
+            vector.tolist() if vector is not None else list(fresh[h])
+            for h, vector in zip(hashes, cached)
+        ]
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        hashes, cached, missing = self._split(texts)
+        new_vectors = self.inner.embed_documents(list(missing.values())) if missing else []
+        return self._merge(hashes, cached, missing, new_vectors)
+
+    async def aembed_documents(self, texts):
+        texts = list(texts)
+        hashes, cached, missing = self._split(texts)
+        new_vectors = await self.inner.aembed_documents(list(missing.values())) if missing else []
+        return self._merge(hashes, cached, missing, new_vectors)
+
+    def _query_lookup(self, h):
+        with self._query_lock:
+            vector = self._query_cache.get(h)
+            if vector is not None:
+                self._query_cache.move_to_end(h)
+                self.stats["query_hits"] += 1
+            else:
+                self.stats["query_misses"] += 1
+            return vector
+
+    def _query_store(self, h, vector):
+        with self._query_lock:
+            self._query_cache[h] = vector
+            self._query_cache.move_to_end(h)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def embed_query(self, text):
+        h = text_hash(text)
+        vector = self._query_lookup(h)
+        if vector is None:
+            vector = self.inner.embed_query(text)
+            self._query_store(h, vector)
+        return vector
+
+    async def aembed_query(self, text):
+        h = text_hash(text)
+        vector = self._query_lookup(h)
+        if vector is None:
+            vector = await self.inner.aembed_query(text)
+            self._query_store(h, vector)
+        return vector
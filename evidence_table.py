@@ -0,0 +1,95 @@
+# evidence_table.py
+
+import pandas as pd
+
+# One row per evidence item of a FinanceBench question
+EVIDENCE_DTYPES = {
+    "question_index": "int64",
+    "financebench_id": "string",
+    "evidence_index": "int32",
+    "doc_name": "string",
+    "evidence_page_num": "Int32",
+    "evidence_text": "string",
+}
+
+
+def clean_text_series(texts):
+    """
+    Collapses runs of whitespace (including newlines) into single spaces and strips the ends,
+    for a whole Series at once. Missing values become empty strings.
+    """
+    return texts.astype("string").fillna("").str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def build_evidence_table(df):
+    """
+    Explodes the 'evidence' lists of a FinanceBench DataFrame into a typed table.
+
+    Evidence items may be dicts (with 'evidence_text', 'doc_name', 'evidence_page_num')
+    or plain strings; a plain string 'evidence' value counts as a single item. Questions
+    without evidence have no rows.
+
+    Args:
+        df (pd.DataFrame): Rows with an 'evidence' column (and optionally
+                           'financebench_id' and 'doc_name').
+
+    Returns:
+        pd.DataFrame: Columns and dtypes as in EVIDENCE_DTYPES, where question_index is
+                      the position of the question row in `df` and evidence_text is cleaned.
+    """
+    items = df["evidence"].reset_index(drop=True).explode()
+    items = items[items.notna()]
+
+    is_text = items.map(type).eq(str)
+    text = items.str.get("evidence_text").where(~is_text, items)
+    position = items.index.to_numpy()
+
+    table = pd.DataFrame({
+        "question_index": position,
+        "financebench_id": (
+            df["financebench_id"].to_numpy()[position] if "financebench_id" in df else pd.NA
+        ),
+        "doc_name": items.str.get("doc_name").to_numpy(),
+        "evidence_page_num": pd.to_numeric(items.str.get("evidence_page_num"), errors="coerce").to_numpy(),
+        "evidence_text": clean_text_series(pd.Series(text.to_numpy())),
+    })
+    if "doc_name" in df:
+        # Plain-string evidence belongs to the question's own filing
+        table["doc_name"] = table["doc_name"].fillna(pd.Series(df["doc_name"].to_numpy()[position]))
+    table = table[table["evidence_text"] != ""]
+    table.insert(2, "evidence_index", table.groupby("question_index").cumcount())
+    return table.reset_index(drop=True).astype(EVIDENCE_DTYPES)
+
+
+def flatten_evidence(df, evidence_table=None):
+    """
+    Summarises the evidence table per question, aligned with `df`.
+
+    Returns:
+        pd.DataFrame: Indexed like `df`, with 'first_evidence_text', 'first_evidence_doc_name'
+                      and 'all_evidence_text' (all items joined by spaces); empty strings
+                      for questions without evidence.
+    """
+    if evidence_table is None:
+        evidence_table = build_evidence_table(df)
+
+    positions = pd.RangeIndex(len(df))
+    by_position = {
+        k: items.set_index("question_index").reindex(positions)
+        for k, items in evidence_table.groupby("evidence_index")
+    }
+    first = by_position.get(0, pd.DataFrame({"evidence_text": pd.NA, "doc_name": pd.NA}, index=positions))
+
+    # Questions have only a few evidence items, so join column-wise: one vectorized
+    # concatenation per item position instead of one Python join per question
+    joined = first["evidence_text"].astype("string").fillna("")
+    for k in sorted(by_position)[1:]:
+        joined = joined + (" " + by_position[k]["evidence_text"]).fillna("")
+
+    flat = pd.DataFrame({
+        "first_evidence_text": first["evidence_text"],
+        "first_evidence_doc_name": first["doc_name"],
+        "all_evidence_text": joined,
+    }).astype("string").fillna("")
+    flat.index = df.index
+    return flat
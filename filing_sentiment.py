@@ -0,0 +1,347 @@
+# filing_sentiment.py
+
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from corpus import get_corpus
+from pdf_ingestion import DEFAULT_PDF_DIR, DEFAULT_STORE_DIR, PageStore, _write_json_atomic, ingest_pdfs
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT_DIR = os.path.join(_script_dir, "filing_sentiment")
+
+# Windows of 510 tokens (512 with [CLS]/[SEP]) that overlap by 128 tokens, so no
+# sentence is only ever seen cut in half at a window edge
+WINDOW_TOKENS = 510
+WINDOW_STRIDE = 382
+
+# Bump this when windowing, sectioning or aggregation changes so stored results are recomputed
+JOB_VERSION = 1
+
+# "Item 7. Management's Discussion...", "ITEM 1A - RISK FACTORS", "Item 2.02 Results of Operations"
+# The title must be empty or capitalised, so cross-references that wrap onto a new line
+# ("Item 1A, “Risk Factors,” of this document") do not start a section
+_SECTION_PATTERN = re.compile(r"^\s*(?i:item)\s+(\d{1,2}[A-Ca-c]?(?:\.\d{2})?)\b\s*[.:\-–—]?\s*([A-Z].*)?$")
+PREAMBLE_SECTION = "Preamble"
+
+# Set in each worker process by _init_worker
+_worker_pipeline = None
+
+
+def split_sections(pages):
+    """
+    Splits a filing's pages into sections at "Item N." headings.
+
+    Text before the first heading belongs to the "Preamble" section. A heading that
+    appears several times (e.g. in the table of contents and in the body) maps to the
+    same section, so its text is aggregated together.
+
+    Args:
+        pages (list[str]): Page texts in order.
+
+    Returns:
+        list[dict]: Segments in document order, each with 'section', 'title', 'page' and 'text'.
+    """
+    segments = []
+    section, title = PREAMBLE_SECTION, ""
+    for page_num, page_text in enumerate(pages):
+        lines = []
+        for line in (page_text or "").splitlines():
+            match = _SECTION_PATTERN.match(line)
+            if match:
+                if lines:
+                    segments.append({"section": section, "title": title, "page": page_num, "text": "\n".join(lines)})
+                    lines = []
+                section, title = f"Item {match.group(1).upper()}", (match.group(2) or "").strip()[:80]
+            lines.append(line)
+        if lines:
+            segments.append({"section": section, "title": title, "page": page_num, "text": "\n".join(lines)})
+    return segments
+
+
+def token_windows(token_ids, window=WINDOW_TOKENS, stride=WINDOW_STRIDE):
+    """
+    Cuts a token sequence into overlapping windows, the last one ending at the final token.
+
+    Returns:
+        list[list[int]]: The windows (a single one for sequences shorter than `window`).
+    """
+    if len(token_ids) <= window:
+        return [token_ids] if token_ids else []
+    starts = list(range(0, len(token_ids) - window + 1, stride))
+    if starts[-1] + window < len(token_ids):
+        starts.append(len(token_ids) - window)
+    return [token_ids[start:start + window] for start in starts]
+
+
+def tone(label, score):
+    """
+    Converts a (label, score) prediction into a signed tone in [-1, 1]: P(positive) - P(negative).
+    """
+    label = str(label).upper()
+    if label.startswith("POS"):
+        return 2 * score - 1
+    if label.startswith("NEG"):
+        return 1 - 2 * score
+    return 0.0
+
+
+def aggregate_windows(windows):
+    """
+    Aggregates scored windows into one token-weighted sentiment summary.
+
+    Args:
+        windows (list[dict]): Each with 'tone' and 'tokens'.
+
+    Returns:
+        dict: 'windows', 'tokens', 'tone', 'positive_share', 'min_tone', 'max_tone' and 'label'.
+    """
+    tokens = sum(w["tokens"] for w in windows)
+    mean_tone = sum(w["tone"] * w["tokens"] for w in windows) / tokens if tokens else 0.0
+    return {
+        "windows": len(windows),
+        "tokens": tokens,
+        "tone": round(mean_tone, 4),
+        "positive_share": round(sum(w["tone"] > 0 for w in windows) / len(windows), 4) if windows else None,
+        "min_tone": round(min(w["tone"] for w in windows), 4) if windows else None,
+        "max_tone": round(max(w["tone"] for w in windows), 4) if windows else None,
+        "label": "POSITIVE" if mean_tone > 0 else "NEGATIVE" if mean_tone < 0 else "NEUTRAL",
+    }
+
+
+def _init_worker(model_name, backend, threads):
+    """Loads the sentiment pipeline once per worker process, with a share of the CPU threads."""
+    global _worker_pipeline
+    import torch
+    from sentiment_analyzer import get_sentiment_pipeline
+
+    torch.set_num_threads(threads)
+    os.environ.setdefault("ONNX_THREADS", str(threads))
+    _worker_pipeline = get_sentiment_pipeline(model_name, backend)
+
+
+def _score_document(doc_name, page_file, batch_size):
+    """
+    Worker entry point: scores every window of one filing and aggregates per section and document.
+
+    Returns:
+        dict: {'document': {...}, 'sections': [...], 'errors': int}.
+    """
+    from sentiment_analyzer import score_encodings
+
+    if _worker_pipeline is None:
+        raise RuntimeError("Sentiment pipeline failed to load in worker")
+    tokenizer = _worker_pipeline.tokenizer
+
+    with open(page_file, "r", encoding="utf-8") as f:
+        pages = json.load(f)["pages"]
+
+    encodings, windows = [], []
+    for segment in split_sections(pages):
+        token_ids = tokenizer(segment["text"], add_special_tokens=False, verbose=False)["input_ids"]
+        for window in token_windows(token_ids):
+            encodings.append(tokenizer.build_inputs_with_special_tokens(window))
+            windows.append({"section": segment["section"], "title": segment["title"],
+                            "page": segment["page"], "tokens": len(window)})
+
+    results, _, failed = score_encodings(encodings, _worker_pipeline, batch_size)
+    for window, (label, score) in zip(windows, results):
+        window["tone"] = tone(label, score)
+
+    sections = {}
+    for window in windows:
+        sections.setdefault(window["section"], []).append(window)
+    section_rows = []
+    for section, section_windows in sections.items():
+        row = {
+            "doc_name": doc_name,
+            "section": section,
+            "title": max((w["title"] for w in section_windows), key=len),
+            "first_page": min(w["page"] for w in section_windows),
+            "last_page": max(w["page"] for w in section_windows),
+        }
+        row.update(aggregate_windows(section_windows))
+        section_rows.append(row)
+
+    document = {"doc_name": doc_name, "pages": len(pages), "sections": len(section_rows)}
+    document.update(aggregate_windows(windows))
+    return {"document": document, "sections": section_rows, "errors": len(failed)}
+
+
+def _result_path(output_dir, doc_name):
+    return os.path.join(output_dir, "docs", f"{doc_name}.json")
+
+
+def _job_config(model_name, backend):
+    return {"model": model_name, "backend": backend, "window": WINDOW_TOKENS, "stride": WINDOW_STRIDE, "version": JOB_VERSION}
+
+
+def is_done(output_dir, doc_name, sha256, config):
+    """Returns True if a stored result exists for this exact filing content and job configuration."""
+    path = _result_path(output_dir, doc_name)
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return False  # A torn file from an interrupted run
+    return result.get("sha256") == sha256 and result.get("config") == config
+
+
+def combine_results(output_dir, doc_names=None):
+    """
+    Collects the stored per-filing results into document and section tables.
+
+    Documents are joined with their company, period, type and sector from the corpus
+    catalog. Writes documents.csv and sections.csv to `output_dir`.
+
+    Returns:
+        tuple: (documents_df, sections_df)
+    """
+    documents, sections = [], []
+    for path in sorted(glob.glob(os.path.join(output_dir, "docs", "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        if doc_names is not None and result["document"]["doc_name"] not in doc_names:
+            continue
+        documents.append(result["document"])
+        sections.extend(result["sections"])
+
+    documents_df, sections_df = pd.DataFrame(documents), pd.DataFrame(sections)
+    if not documents_df.empty:
+        corpus = get_corpus()
+        metadata = pd.DataFrame([{"doc_name": name, **corpus.metadata(name)} for name in documents_df["doc_name"]])
+        documents_df = metadata.merge(documents_df, on="doc_name")
+    documents_df.to_csv(os.path.join(output_dir, "documents.csv"), index=False)
+    sections_df.to_csv(os.path.join(output_dir, "sections.csv"), index=False)
+    return documents_df, sections_df
+
+
+def run_filing_sentiment(store_dir=DEFAULT_STORE_DIR, output_dir=DEFAULT_OUTPUT_DIR, model_name=None,
+                         backend=None, max_workers=None, batch_size=None, num_shards=1, shard_index=0, limit=None):
+    """
+    Scores every filing in the page store with overlapping token windows on a process pool.
+
+    Each finished filing is written to <output_dir>/docs/<doc_name>.json right away and
+    keyed by the PDF's content hash and the job configuration, so an interrupted run
+    resumes with the filings it had not finished. With `num_shards` > 1 only every
+    `num_shards`-th filing (offset `shard_index`) is scored, so several machines can
+    split the corpus over a shared output directory.
+
+    Args:
+        store_dir (str): Page store directory (see pdf_ingestion).
+        output_dir (str): Where results are written.
+        model_name (str): Sentiment model (defaults to sentiment_analyzer.SENTIMENT_MODEL).
+        backend (str): Inference backend (defaults to sentiment_analyzer.DEFAULT_BACKEND).
+        max_workers (int): Worker processes (defaults to the CPU count).
+        batch_size (int): Windows per forward pass.
+        num_shards (int): Number of shards the corpus is split into.
+        shard_index (int): The shard this run scores.
+        limit (int): Only score the first `limit` pending filings.
+
+    Returns:
+        dict: Counts of 'scored', 'skipped' and 'failed' filings, scored 'windows' and 'seconds'.
+    """
+    from sentiment_analyzer import DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, SENTIMENT_MODEL
+
+    start = time.perf_counter()
+    model_name = model_name or SENTIMENT_MODEL
+    backend = backend or DEFAULT_BACKEND
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    max_workers = max_workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // max_workers)
+    config = _job_config(model_name, backend)
+    os.makedirs(os.path.join(output_dir, "docs"), exist_ok=True)
+
+    store = PageStore(store_dir)
+    shard = [name for i, name in enumerate(store.doc_names()) if i % num_shards == shard_index]
+    pending = [name for name in shard if not is_done(output_dir, name, store.get_record(name)["sha256"], config)]
+    if limit:
+        pending = pending[:limit]
+    summary = {"scored": 0, "skipped": len(shard) - len(pending), "failed": 0, "windows": 0}
+    print(f"📄 Shard {shard_index + 1}/{num_shards}: {len(shard)} filings, "
+          f"{summary['skipped']} already scored, scoring {len(pending)} on {max_workers} workers...")
+
+    if pending and backend.startswith("onnx"):
+        # Export once here rather than racing to export in every worker
+        from onnx_sentiment import export_onnx
+        export_onnx(model_name, quantize=backend == "onnx-int8")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(model_name, backend, threads)) as executor:
+            futures = {}
+            for doc_name in pending:
+                page_file = os.path.join(store.pages_dir, f"{store.get_record(doc_name)['sha256']}.json")
+                futures[executor.submit(_score_document, doc_name, page_file, batch_size)] = doc_name
+            for done, future in enumerate(as_completed(futures), start=1):
+                doc_name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ Error scoring {doc_name}: {e}")
+                    summary["failed"] += 1
+                    continue
+                result.update({"sha256": store.get_record(doc_name)["sha256"], "config": config})
+                _write_json_atomic(_result_path(output_dir, doc_name), result)
+                summary["scored"] += 1
+                summary["windows"] += result["document"]["windows"]
+                if done % 10 == 0:
+                    print(f"  Processed {done}/{len(pending)} filings...")
+
+    summary["seconds"] = time.perf_counter() - start
+    print(
+        f"✅ Filing sentiment complete in {summary['seconds']:.1f}s: {summary['scored']} scored "
+        f"({summary['windows']:,} windows), {summary['skipped']} skipped, {summary['failed']} failed."
+    )
+    return summary
+
+
+def main():
+    """
+    Command-line entry point: ingests the FinanceBench PDFs and scores the tone of every filing.
+    """
+    parser = argparse.ArgumentParser(description="Score the sentiment of every FinanceBench filing.")
+    parser.add_argument("--pdf-dir", default=DEFAULT_PDF_DIR, help="Directory containing the PDFs.")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="Directory of the page store.")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Where results are written.")
+    parser.add_argument("--model", default=None, help="Sentiment model name.")
+    parser.add_argument("--backend", default=None, help="Inference backend: torch, onnx or onnx-int8.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--batch-size", type=int, default=None, help="Windows per forward pass.")
+    parser.add_argument("--num-shards", type=int, default=1, help="Split the corpus into this many shards.")
+    parser.add_argument("--shard-index", type=int, default=0, help="The shard to score (0-based).")
+    parser.add_argument("--limit", type=int, default=None, help="Only score this many pending filings.")
+    parser.add_argument("--skip-ingest", action="store_true", help="Use the page store as is.")
+    parser.add_argument("--combine-only", action="store_true",
+                        help="Only rebuild documents.csv and sections.csv from stored results.")
+    args = parser.parse_args()
+
+    if not 0 <= args.shard_index < args.num_shards:
+        parser.error("--shard-index must be between 0 and --num-shards - 1")
+
+    if not args.combine_only:
+        if not args.skip_ingest:
+            ingest_pdfs(args.pdf_dir, args.store_dir)
+        run_filing_sentiment(
+            args.store_dir, args.output_dir, model_name=args.model, backend=args.backend,
+            max_workers=args.workers,
+            batch_size=args.batch_size, num_shards=args.num_shards, shard_index=args.shard_index,
+            limit=args.limit,
+        )
+
+    documents_df, sections_df = combine_results(args.output_dir, set(PageStore(args.store_dir).doc_names()))
+    print(f"\n📊 {len(documents_df)} filings and {len(sections_df)} sections written to {args.output_dir}")
+    if not documents_df.empty:
+        print(documents_df.sort_values("tone")[["doc_name", "tone", "windows", "label"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,146 @@
 # forecasting_model.py
 
+import os
+import threading
 import warnings
-import yfinance as yf
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 from statsmodels.tsa.arima.model import ARIMA
 from datetime import date
 
+from market_data import get_history
+
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore")
 
+DEFAULT_ORDER = (5, 1, 0)
+
+# Fitted models by (ticker, order), most recently used last. New bars are appended to a
+# cached model with its parameters kept; after FORECAST_REFIT_EVERY appended bars the
+# parameters are re-estimated, starting from the cached ones.
+_fitted_models = OrderedDict()
+_fitted_lock = threading.Lock()
+_key_locks = {}
+MAX_CACHED_MODELS = 64
+DEFAULT_REFIT_EVERY = 20
+
 def fetch_stock_data(ticker, start_date, end_date):
     """
-    Fetches historical stock data from Yahoo Finance.
+    Fetches historical closing prices, from the local market data store where possible
+    (see market_data.get_history); only bars the store lacks are downloaded.
     """
     try:
-        data = yf.download(ticker, start=start_date, end=end_date, progress=False)
+        data = get_history(ticker, start=start_date, end=end_date)
         if data.empty:
             print(f"❌ No data found for ticker: {ticker}")
             return None
         print(f"✅ Successfully fetched historical data for {ticker}.")
-        return data['Close']
+        # Daily bars come with the exchange time zone; forecasting works on plain dates
+        return data['Close'].tz_localize(None)
     except Exception as e:
         print(f"❌ Error fetching stock data: {e}")
         return None
 
-def train_and_forecast(data, forecast_days=30):
+def _fit(history, order, start_params=None):
+    """Fits an ARIMA model on a 1-D array, optionally starting from known parameters."""
+    return ARIMA(history, order=order).fit(start_params=start_params)
+
+def _forecast_index(index, steps):
+    """Business days after the last observation, or positions after it for non-date indexes."""
+    if isinstance(index, pd.DatetimeIndex) and len(index):
+        return pd.bdate_range(index[-1] + pd.offsets.BDay(1), periods=steps, tz=index.tz)
+    return pd.RangeIndex(len(index), len(index) + steps)
+
+def _key_lock(key):
+    with _fitted_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def fit_model(history, ticker=None, order=DEFAULT_ORDER):
+    """
+    Returns a fitted ARIMA model for a price history, reusing cached fits for the ticker.
+
+    Fits are cached by (ticker, order) together with the history they cover:
+    - the same history (same last observation) reuses the fitted model as is;
+    - a history that extends the cached one has the new observations appended to the
+      state-space model, keeping the fitted parameters, unless more than
+      FORECAST_REFIT_EVERY observations have been appended since the last fit;
+    - otherwise (or at that point) the model is refitted, starting from the cached
+      parameters so the optimizer converges in fewer iterations.
+    Without a ticker, a fresh model is fitted and not cached.
+
+    Args:
+        history (pd.Series): Historical closing prices, oldest first.
+        ticker (str): The ticker the prices belong to.
+        order (tuple): The ARIMA (p, d, q) order.
+
+    Returns:
+        ARIMAResults: The fitted model; its observations are `history`'s values.
+    """
+    values = history.astype(float).to_numpy()
+    if ticker is None:
+        print("🧠 Training forecasting model...")
+        return _fit(values, order)
+
+    key = (ticker.upper(), tuple(order))
+    refit_every = int(os.getenv("FORECAST_REFIT_EVERY", DEFAULT_REFIT_EVERY))
+    with _key_lock(key):
+        with _fitted_lock:
+            cached = _fitted_models.get(key)
+        start_params, result, appended = None, None, 0
+
+        if cached is not None:
+            known = len(cached["values"])
+            extends = len(values) >= known and np.allclose(values[:known], cached["values"], rtol=1e-9, atol=0)
+            new = len(values) - known
+            if extends and new == 0 and history.index[-1] == cached["last_date"]:
+                print(f"♻️ Reusing the fitted model for {ticker} (last observation {cached['last_date']}).")
+                result, appended = cached["result"], cached["appended"]
+            elif extends and cached["appended"] + new <= refit_every:
+                print(f"➕ Appending {new} new observations to the model for {ticker}.")
+                result, appended = cached["result"].append(values[known:], refit=False), cached["appended"] + new
+            else:
+                start_params = cached["result"].params
+
+        if result is None:
+            print("🧠 Training forecasting model..." + (" (warm start)" if start_params is not None else ""))
+            result = _fit(values, order, start_params)
+
+        with _fitted_lock:
+            _fitted_models[key] = {"result": result, "values": values, "last_date": history.index[-1], "appended": appended}
+            _fitted_models.move_to_end(key)
+            while len(_fitted_models) > MAX_CACHED_MODELS:
+                _fitted_models.popitem(last=False)
+        return result
+
+def train_and_forecast(data, forecast_days=30, ticker=None, order=DEFAULT_ORDER):
     """
     Trains an ARIMA model and forecasts future stock prices.
+
+    With a ticker, fitted models are cached (see fit_model), so changing the horizon or
+    adding a few new bars does not refit the model from scratch.
     
     Args:
         data (pd.Series): A pandas Series of historical closing prices.
         forecast_days (int): The number of days to forecast into the future.
+        ticker (str): The ticker the prices belong to, used as the cache key.
+        order (tuple): The ARIMA (p, d, q) order.
         
     Returns:
-        pd.Series: A pandas Series containing the forecasted prices.
+        pd.Series: A pandas Series containing the forecasted prices, indexed by the
+                   business days following the history.
     """
     if data is None or data.empty:
         return None
-        
-    print("🧠 Training forecasting model...")
-    
+
     # We use the entire history to train the model for the best possible forecast
-    history = data.astype(float)
-    
-    # Define and fit the ARIMA model
     # A common starting point for ARIMA order is (5,1,0)
     # p=5: Use 5 previous observations for autoregression
     # d=1: Use first-order differencing to make the series stationary
     # q=0: Do not use a moving average model
-    model = ARIMA(history, order=(5, 1, 0))
     try:
-        model_fit = model.fit()
+        model_fit = fit_model(data, ticker=ticker, order=order)
         print("✅ Model training complete.")
     except Exception as e:
         print(f"❌ Error fitting ARIMA model: {e}")
@@ -58,7 +148,9 @@ def train_and_forecast(data, forecast_days=30):
 
     # Make a forecast for the specified number of days
     print(f"🔮 Generating forecast for the next {forecast_days} days...")
-    forecast = model_fit.forecast(steps=forecast_days)
+    forecast = pd.Series(
+        model_fit.forecast(steps=forecast_days), index=_forecast_index(data.index, forecast_days), name="predicted_mean"
+    )
     
     print("✅ Forecast generated successfully.")
     return forecast
@@ -76,7 +168,7 @@ def main():
     
     if stock_data is not None:
         # Get the forecast
-        forecast = train_and_forecast(stock_data, forecast_days=30)
+        forecast = train_and_forecast(stock_data, forecast_days=30, ticker=ticker)
         
         if forecast is not None:
             print(f"\n--- Forecast for {ticker} ---")
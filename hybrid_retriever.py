@@ -0,0 +1,275 @@
+# hybrid_retriever.py
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, List
+
+import faiss
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_YEAR_PATTERN = re.compile(r"\b(?:fy\s?)?((?:19|20)\d{2})\b")
+_SHORT_FY_PATTERN = re.compile(r"\bfy\s?'?(\d{2})\b")
+_ANNUAL_REPORT_PATTERN = re.compile(r"\b10-?k\b|\bannual report\b")
+# Glossy annual reports wrap the year's 10-K, so either phrase selects both doc types
+_DOC_TYPE_PATTERNS = {
+    "10k": _ANNUAL_REPORT_PATTERN,
+    "10k_annualreport": _ANNUAL_REPORT_PATTERN,
+    "10q": re.compile(r"\b10-?q\b|\bquarterly report\b"),
+    "8k": re.compile(r"\b8-?k\b"),
+    "earnings": re.compile(r"\bearnings (?:call|release|report)\b"),
+}
+_CORPORATE_SUFFIXES = {"corporation", "corp", "inc", "company", "co", "plc"}
+# Companies whose bare name is an ordinary word ("a block of shares"): they are only
+# recognised as "Block, Inc." / "Block Inc" or by their upper-case ticker
+_AMBIGUOUS_COMPANY_TICKERS = {"Block": "SQ"}
+
+# Metadata fields the retriever can filter on, in the order they are relaxed when
+# a filter combination leaves too few candidates (the last one is dropped first)
+FILTER_FIELDS = ("company", "doc_period", "doc_type")
+
+
+def tokenize(text):
+    """Lowercases and splits text into alphanumeric tokens."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _normalize_name(text):
+    return re.sub(r"[^a-z0-9& ]+", " ", text.lower().replace("\u2019", "'").replace("'", "")).split()
+
+
+def build_company_aliases(companies):
+    """
+    Maps each company to the normalised phrases that identify it in a question,
+    e.g. "McDonald's" and "mcdonalds" for "McDonalds", or "Johnson and Johnson".
+    Ambiguous names such as "Block" only get their "block inc" form.
+    """
+    aliases = {}
+    for company in companies:
+        words = _normalize_name(company)
+        if company in _AMBIGUOUS_COMPANY_TICKERS:
+            aliases[company] = {" ".join(words + ["inc"])}
+            continue
+        variants = {" ".join(words), " ".join(words).replace("&", "and")}
+        if len(words) > 1 and words[-1] in _CORPORATE_SUFFIXES:
+            variants.add(" ".join(words[:-1]))
+        aliases[company] = {v for v in variants if v}
+    return aliases
+
+
+def parse_question_filters(question, company_aliases):
+    """
+    Extracts metadata filters from a question.
+
+    Args:
+        question (str): The user question.
+        company_aliases (dict): Output of build_company_aliases.
+
+    Returns:
+        dict: Maps 'company', 'doc_period' and 'doc_type' to the set of values mentioned
+              in the question; fields that are not mentioned are left out.
+    """
+    # Match both "McDonald's" -> "mcdonalds" and "Johnson's" -> "johnson"
+    without_possessives = re.sub(r"['\u2019]s\b", "", question, flags=re.IGNORECASE)
+    normalized = f" {' '.join(_normalize_name(question))} | {' '.join(_normalize_name(without_possessives))} "
+    lowered = question.lower()
+    filters = {}
+
+    companies = {
+        company for company, variants in company_aliases.items()
+        if any(f" {variant} " in normalized for variant in variants)
+    }
+    companies |= {
+        company for company, ticker in _AMBIGUOUS_COMPANY_TICKERS.items()
+        if company in company_aliases and re.search(rf"\b{ticker}\b", question)
+    }
+    if companies:
+        filters["company"] = companies
+
+    years = {int(year) for year in _YEAR_PATTERN.findall(lowered)}
+    years |= {2000 + int(year) for year in _SHORT_FY_PATTERN.findall(lowered)}
+    if years:
+        filters["doc_period"] = years
+
+    doc_types = {doc_type for doc_type, pattern in _DOC_TYPE_PATTERNS.items() if pattern.search(lowered)}
+    if doc_types:
+        filters["doc_type"] = doc_types
+
+    return filters
+
+
+class BM25Index:
+    """
+    An Okapi BM25 index over a fixed list of texts, stored as per-term posting arrays
+    so a query only touches the postings of its own terms.
+    """
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.num_docs = len(texts)
+
+        postings = defaultdict(lambda: ([], []))
+        lengths = np.zeros(self.num_docs, dtype=np.float32)
+        for doc_idx, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[doc_idx] = sum(counts.values())
+            for term, tf in counts.items():
+                doc_ids, tfs = postings[term]
+                doc_ids.append(doc_idx)
+                tfs.append(tf)
+
+        avg_length = float(lengths.mean()) if self.num_docs else 0.0
+        self._length_norm = k1 * (1 - b + b * lengths / max(avg_length, 1e-9))
+        self.postings = {
+            term: (np.asarray(doc_ids, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+            for term, (doc_ids, tfs) in postings.items()
+        }
+
+    def scores(self, query):
+        """Returns the BM25 score of every document for a query, as a dense array."""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            doc_ids, tfs = self.postings[term]
+            idf = math.log(1 + (self.num_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + self._length_norm[doc_ids])
+        return scores
+
+
+def search_parameters(index, selector):
+    """
+    Builds FAISS search parameters that restrict a search to `selector`, keeping the
+    index's own nprobe / efSearch settings for IVF and HNSW indexes.
+    """
+    base = index.index if isinstance(index, faiss.IndexPreTransform) else index
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+class HybridSearcher:
+    """
+    Metadata-prefiltered hybrid search over a LangChain FAISS vectorstore.
+
+    Candidates are first narrowed with hash indexes on company, fiscal year and
+    document type parsed from the question; the dense FAISS search and the sparse BM25
+    scoring then run only over those candidates, and the two rankings are merged with
+    weighted reciprocal rank fusion.
+    """
+    def __init__(self, vectorstore, k=8, fetch_k=50, dense_weight=0.5, rrf_k=60):
+        self.vectorstore = vectorstore
+        self.k = k
+        self.fetch_k = fetch_k
+        self.dense_weight = dense_weight
+        self.rrf_k = rrf_k
+
+        # FAISS positions map to docstore ids; keep the documents in position order
+        self.documents = [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[pos])
+            for pos in range(len(vectorstore.index_to_docstore_id))
+        ]
+        self.bm25 = BM25Index([doc.page_content for doc in self.documents])
+
+        self.metadata_index = {field: defaultdict(list) for field in FILTER_FIELDS}
+        for pos, doc in enumerate(self.documents):
+            for field in FILTER_FIELDS:
+                value = doc.metadata.get(field)
+                if value is not None and value != "":
+                    self.metadata_index[field][value].append(pos)
+        self.metadata_index = {
+            field: {value: np.asarray(positions, dtype=np.int64) for value, positions in values.items()}
+            for field, values in self.metadata_index.items()
+        }
+        self.company_aliases = build_company_aliases(
+            company for company in self.metadata_index["company"] if company != "Unknown"
+        )
+
+    def candidates(self, filters):
+        """
+        Resolves parsed filters to candidate FAISS positions.
+
+        Filters are relaxed from the least to the most specific field until at least
+        `k` candidates remain. Returns None when no filter applies (search everything).
+        """
+        fields = [field for field in FILTER_FIELDS if field in filters]
+        while fields:
+            positions = None
+            for field in fields:
+                matches = [self.metadata_index[field].get(value) for value in filters[field]]
+                matches = [m for m in matches if m is not None]
+                field_positions = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.int64)
+                positions = field_positions if positions is None else np.intersect1d(positions, field_positions)
+            if len(positions) >= self.k:
+                return positions
+            fields.pop()
+        return None
+
+    def _dense_ranking(self, query, candidates, limit):
+        vector = np.asarray([self.vectorstore.embeddings.embed_query(query)], dtype=np.float32)
+        if getattr(self.vectorstore, "_normalize_L2", False):
+            faiss.normalize_L2(vector)
+        index = self.vectorstore.index
+        if candidates is None:
+            _, positions = index.search(vector, limit)
+        else:
+            params = search_parameters(index, faiss.IDSelectorBatch(candidates))
+            _, positions = index.search(vector, limit, params=params)
+        return [int(pos) for pos in positions[0] if pos >= 0]
+
+    def _sparse_ranking(self, query, candidates, limit):
+        scores = self.bm25.scores(query)
+        pool = np.arange(self.bm25.num_docs) if candidates is None else candidates
+        pool_scores = scores[pool]
+        keep = pool_scores > 0
+        pool, pool_scores = pool[keep], pool_scores[keep]
+        if len(pool) > limit:
+            top = np.argpartition(-pool_scores, limit)[:limit]
+            pool, pool_scores = pool[top], pool_scores[top]
+        return [int(pos) for pos in pool[np.argsort(-pool_scores, kind="stable")]]
+
+    def search(self, query, k=None):
+        """
+        Returns the top-k documents for a query.
+
+        Each document's metadata gains a 'retrieval_score' with its fused score.
+        """
+        k = k or self.k
+        if not self.documents:
+            return []
+        filters = parse_question_filters(query, self.company_aliases)
+        candidates = self.candidates(filters)
+        limit = max(k, self.fetch_k)
+        if candidates is not None:
+            limit = min(limit, len(candidates))
+
+        fused = defaultdict(float)
+        for weight, ranking in (
+            (self.dense_weight, self._dense_ranking(query, candidates, limit)),
+            (1 - self.dense_weight, self._sparse_ranking(query, candidates, limit)),
+        ):
+            for rank, pos in enumerate(ranking):
+                fused[pos] += weight / (self.rrf_k + rank + 1)
+
+        top = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+        results = []
+        for pos, score in top:
+            doc = self.documents[pos]
+            results.append(Document(page_content=doc.page_content, metadata={**doc.metadata, "retrieval_score": score}))
+        return results
+
+
+class HybridRetriever(BaseRetriever):
+    """LangChain retriever adapter for HybridSearcher."""
+    searcher: Any
+    k: int = 8
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.searcher.search(query, k=self.k)
@@ -0,0 +1,150 @@
+# index_benchmark.py
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+import pandas as pd
+
+from data_loader import DataLoader
+from embedding_backend import get_embeddings
+from qa_sources import build_source_units
+from vectorstore_index import INDEX_FACTORIES, build_faiss_index, configure_search, index_factory_string, sync_vectorstore
+
+
+def relevant_positions(vectorstore, questions_df):
+    """
+    Finds, for every FinanceBench question, the index positions of chunks that hold its evidence.
+
+    A chunk counts as relevant if it comes from the question's own evidence row, or from
+    a filing page cited in its evidence (when filings have been ingested).
+
+    Returns:
+        list[set]: One set of positions per question row.
+    """
+    by_question, by_page = {}, {}
+    for pos in range(len(vectorstore.index_to_docstore_id)):
+        metadata = vectorstore.docstore.search(vectorstore.index_to_docstore_id[pos]).metadata
+        if metadata.get("financebench_id"):
+            by_question.setdefault(metadata["financebench_id"], set()).add(pos)
+        if metadata.get("source") == "pdf":
+            by_page.setdefault((metadata["doc_name"], metadata["page_num"]), set()).add(pos)
+
+    relevant = []
+    for row in questions_df.to_dict("records"):
+        positions = set(by_question.get(row["financebench_id"], set()))
+        for evidence in row["evidence"] or []:
+            positions |= by_page.get((evidence.get("doc_name"), evidence.get("evidence_page_num")), set())
+        relevant.append(positions)
+    return relevant
+
+
+def percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q) * 1000)
+
+
+def benchmark_index(index_type, vectors, queries, exact_ids, relevant, k, metric, nprobe, ef_search):
+    """
+    Builds one index type and measures build time, size, latency and recall.
+
+    Returns:
+        dict: One row of the benchmark report.
+    """
+    start = time.perf_counter()
+    index = build_faiss_index(vectors, index_type, metric)
+    build_seconds = time.perf_counter() - start
+    configure_search(index, nprobe=nprobe, ef_search=ef_search)
+
+    # One query at a time, as in the Q&A path
+    latencies = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, ids = index.search(queries[i:i + 1], k)
+        latencies.append(time.perf_counter() - start)
+        found[i] = ids[0]
+
+    ann_recall = np.mean([
+        len(set(found[i]) & set(exact_ids[i])) / k for i in range(len(queries))
+    ])
+    scored = [i for i, positions in enumerate(relevant) if positions]
+    evidence_recall = np.mean([bool(set(found[i]) & relevant[i]) for i in scored]) if scored else float("nan")
+
+    return {
+        "index": index_type,
+        "factory": index_factory_string(index_type, *vectors.shape),
+        "build_s": round(build_seconds, 3),
+        "ram_mb": round(len(faiss.serialize_index(index)) / 1e6, 2),
+        "p50_ms": round(percentile_ms(latencies, 50), 3),
+        "p99_ms": round(percentile_ms(latencies, 99), 3),
+        f"recall@{k}_vs_flat": round(float(ann_recall), 4),
+        f"evidence_recall@{k}": round(float(evidence_recall), 4),
+    }
+
+
+def main():
+    """
+    Compares FAISS index types on the FinanceBench questions: recall@k against the
+    evidence and against exact search, p50/p99 single-query latency, and index RAM.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types for the Q&A vectorstore.")
+    parser.add_argument("--backend", default="hashing", help="Embedding backend: 'hashing' (offline) or 'google'.")
+    parser.add_argument("--path", default="vectorstore_benchmark", help="Where to keep the benchmark vectorstore.")
+    parser.add_argument("--index-types", default=",".join(INDEX_FACTORIES), help="Comma-separated index types.")
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Add this many random distractor vectors to simulate a larger corpus.")
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    embeddings = get_embeddings(args.backend)
+    vectorstore = None
+    try:
+        from langchain_community.vectorstores import FAISS
+        vectorstore = FAISS.load_local(args.path, embeddings, allow_dangerous_deserialization=True)
+    except Exception:
+        pass
+    vectorstore, _ = sync_vectorstore(vectorstore, build_source_units(), embeddings, embeddings.model_name, args.path)
+    if vectorstore is None:
+        print("❌ Nothing to benchmark.")
+        return
+
+    questions_df = DataLoader().load_jsonl_file("financebench_open_source.jsonl")
+    if questions_df is None:
+        return
+
+    vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        noise = rng.normal(size=(args.synthetic, vectors.shape[1])).astype(np.float32)
+        noise *= np.linalg.norm(vectors, axis=1).mean() / np.linalg.norm(noise, axis=1, keepdims=True)
+        vectors = np.vstack([vectors, noise])
+
+    queries = np.asarray([embeddings.embed_query(q) for q in questions_df["question"]], dtype=np.float32)
+    if vectorstore._normalize_L2:
+        faiss.normalize_L2(queries)
+
+    metric = vectorstore.index.metric_type
+    exact = faiss.IndexFlat(vectors.shape[1], metric)
+    exact.add(vectors)
+    _, exact_ids = exact.search(queries, args.k)
+    relevant = relevant_positions(vectorstore, questions_df)
+
+    print(f"📏 Benchmarking {len(queries)} queries over {len(vectors):,} vectors (dim {vectors.shape[1]}, k={args.k})...")
+    rows = []
+    for index_type in [t.strip() for t in args.index_types.split(",") if t.strip()]:
+        try:
+            rows.append(benchmark_index(
+                index_type, vectors, queries, exact_ids, relevant, args.k, metric, args.nprobe, args.ef_search
+            ))
+        except Exception as e:
+            print(f"❌ Error benchmarking {index_type}: {e}")
+
+    print("\n📊 Index comparison:")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
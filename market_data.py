@@ -0,0 +1,487 @@
+# market_data.py
+
+import argparse
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_DIR = os.path.join(_script_dir, "market_data")
+DEFAULT_FIXTURES_DIR = os.path.join(_script_dir, "market_data_fixtures")
+
+# Seconds during which a stored range counts as up to date without asking the provider again
+DEFAULT_MAX_AGE = 900
+
+# Bulk fetching defaults, overridable through MARKET_DATA_MAX_WORKERS and MARKET_DATA_TIMEOUT
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 20.0
+
+# Bump this when the stored representation changes so existing stores are refetched
+STORE_VERSION = 1
+_STORE_METADATA_KEY = b"findocgpt.coverage"
+
+# Start date used for period="max"
+_EARLIEST = pd.Timestamp("1950-01-01")
+
+_locks = {}
+_locks_guard = threading.Lock()
+_providers = {}
+
+
+def is_offline():
+    """True when MARKET_DATA_MODE=offline: bars come only from the store or fixture files."""
+    return os.getenv("MARKET_DATA_MODE", "online").lower() == "offline"
+
+
+def _store_dir():
+    return os.getenv("MARKET_DATA_DIR", DEFAULT_STORE_DIR)
+
+
+def _fixtures_dir():
+    return os.getenv("MARKET_DATA_FIXTURES", DEFAULT_FIXTURES_DIR)
+
+
+def _file_name(ticker, interval):
+    return f"{ticker.upper().replace('/', '_')}_{interval}"
+
+
+def store_path(ticker, interval="1d"):
+    """Returns the Parquet file holding a ticker's bars for one interval."""
+    return os.path.join(_store_dir(), interval, f"{_file_name(ticker, interval)}.parquet")
+
+
+def _lock_for(ticker, interval):
+    key = (ticker.upper(), interval)
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def resolve_range(period=None, start=None, end=None):
+    """
+    Turns a yfinance-style period ("5d", "6mo", "1y", "ytd", "max") or start/end dates
+    into a [start, end) pair of naive day timestamps. `end` defaults to tomorrow, so
+    today's bar is included.
+    """
+    end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+    if start is not None:
+        return pd.Timestamp(start).normalize(), end
+    period = (period or "1y").lower()
+    today = end - pd.Timedelta(days=1)
+    if period == "max":
+        return _EARLIEST, end
+    if period == "ytd":
+        return pd.Timestamp(year=today.year, month=1, day=1), end
+    for suffix, unit in (("mo", "months"), ("wk", "weeks"), ("d", "days"), ("y", "years")):
+        if period.endswith(suffix):
+            return today - pd.DateOffset(**{unit: int(period[:-len(suffix)])}), end
+    raise ValueError(f"Unsupported period: {period!r}")
+
+
+def _naive(index):
+    """Bar timestamps as naive exchange-local times, for comparing with naive dates."""
+    return index.tz_localize(None) if getattr(index, "tz", None) is not None else index
+
+
+def _slice(bars, start, end):
+    if bars is None or bars.empty:
+        return pd.DataFrame()
+    local = _naive(bars.index)
+    return bars[(local >= start) & (local < end)]
+
+
+def _read_store(ticker, interval):
+    """Returns (bars, coverage) from the store, or (None, None) if nothing usable is stored."""
+    import pyarrow.parquet as pq
+
+    path = store_path(ticker, interval)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        table = pq.read_table(path)
+        coverage = json.loads((table.schema.metadata or {}).get(_STORE_METADATA_KEY, b"null"))
+        if not coverage or coverage.get("store_version") != STORE_VERSION:
+            return None, None
+        return table.to_pandas(), coverage
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable market data for {ticker} ({interval}): {e}")
+        return None, None
+
+
+def _write_store(ticker, interval, bars, coverage):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        table = pa.Table.from_pandas(bars, preserve_index=True)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_STORE_METADATA_KEY] = json.dumps({**coverage, "store_version": STORE_VERSION}).encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+
+        path = store_path(ticker, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️ Could not store market data for {ticker} ({interval}): {e}")
+
+
+def read_fixture(ticker, interval="1d"):
+    """
+    Loads a ticker's bars from the fixtures directory (MARKET_DATA_FIXTURES), as
+    <TICKER>_<interval>.parquet or .csv with the dates in the first column.
+
+    Returns:
+        pd.DataFrame: The bars, or None if there is no fixture.
+    """
+    base = os.path.join(_fixtures_dir(), _file_name(ticker, interval))
+    if os.path.exists(f"{base}.parquet"):
+        return pd.read_parquet(f"{base}.parquet")
+    if os.path.exists(f"{base}.csv"):
+        bars = pd.read_csv(f"{base}.csv", index_col=0)
+        bars.index = pd.to_datetime(bars.index, utc=True).tz_convert("America/New_York")
+        return bars
+    return None
+
+
+class YahooFinanceProvider:
+    """Downloads bars from Yahoo Finance through yfinance."""
+    name = "yahoo"
+
+    def history(self, ticker, start, end, interval, timeout=None):
+        """
+        Fetches the bars of [start, end).
+
+        Returns:
+            pd.DataFrame: Bars shaped like yf.Ticker.history; empty if there are none.
+        """
+        import yfinance as yf
+
+        return yf.Ticker(ticker).history(
+            start=start.strftime("%Y-%m-%d"), end=end.strftime("%Y-%m-%d"), interval=interval,
+            timeout=timeout or DEFAULT_TIMEOUT,
+        )
+
+
+class LocalProvider:
+    """
+    An offline stand-in for YahooFinanceProvider.
+
+    Serves fixture files (see read_fixture) and, for tickers without one, deterministic
+    synthetic daily bars seeded by the ticker symbol, so the same ticker and date always
+    get the same prices. `latency` adds a delay per request to mimic a network round
+    trip, which makes it suitable for benchmarking bulk fetches without a network.
+    """
+    name = "local"
+    _FREQUENCIES = {"1d": None, "1wk": pd.offsets.Week(weekday=4), "1mo": pd.offsets.MonthEnd()}
+    _ORIGIN = pd.Timestamp("1990-01-01")
+
+    def __init__(self, latency=0.0, synthetic=True):
+        self.latency = latency
+        self.synthetic = synthetic
+
+    def _synthetic(self, ticker, end, interval):
+        days = pd.date_range(self._ORIGIN, end - pd.Timedelta(days=1), freq="D")
+        days = days[days.dayofweek < 5]  # much faster than bdate_range over decades
+        # One stream per field, so a bar's values do not depend on how many bars are drawn
+        seed = zlib.crc32(ticker.encode("utf-8"))
+        returns, gaps, highs, lows, volumes = (np.random.default_rng([seed, k]) for k in range(5))
+        close = 20 * np.exp(np.cumsum(returns.normal(0.0003, 0.015, len(days))))
+        open_ = close * (1 + gaps.normal(0, 0.003, len(days)))
+        bars = pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + highs.uniform(0, 0.01, len(days))),
+            "Low": np.minimum(open_, close) * (1 - lows.uniform(0, 0.01, len(days))),
+            "Close": close,
+            "Volume": np.round(volumes.lognormal(14, 0.4, len(days))).astype(np.int64),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        }, index=days.tz_localize("America/New_York").rename("Date"))
+        frequency = self._FREQUENCIES[interval]
+        if frequency:
+            bars = bars.resample(frequency).agg({
+                "Open": "first", "High": "max", "Low": "min", "Close": "last",
+                "Volume": "sum", "Dividends": "sum", "Stock Splits": "sum",
+            }).dropna(subset=["Close"])
+        return bars
+
+    def history(self, ticker, start, end, interval, timeout=None):
+        if self.latency:
+            time.sleep(self.latency)
+        bars = read_fixture(ticker, interval)
+        if bars is None and self.synthetic and interval in self._FREQUENCIES:
+            bars = self._synthetic(ticker, end, interval)
+        return _slice(bars, start, end)
+
+
+def get_provider(name=None):
+    """
+    Returns the market data provider.
+
+    Args:
+        name (str): "yahoo" or "local" (see LocalProvider). Defaults to the
+                    MARKET_DATA_PROVIDER environment variable, then "yahoo".
+                    MARKET_DATA_LOCAL_LATENCY sets the local provider's delay in seconds.
+    """
+    name = (name or os.getenv("MARKET_DATA_PROVIDER", "yahoo")).lower()
+    with _locks_guard:
+        if name not in _providers:
+            if name == "yahoo":
+                _providers[name] = YahooFinanceProvider()
+            elif name == "local":
+                _providers[name] = LocalProvider(latency=float(os.getenv("MARKET_DATA_LOCAL_LATENCY", "0")))
+            else:
+                raise ValueError(f"Unknown market data provider: {name!r} (expected 'yahoo' or 'local')")
+        return _providers[name]
+
+
+def _merge(stored, fetched):
+    """Combines stored and fetched bars; fetched bars win where both have the same timestamp."""
+    if stored is None or stored.empty:
+        return fetched.sort_index()
+    if fetched is None or fetched.empty:
+        return stored
+    combined = pd.concat([stored, fetched])
+    return combined[~combined.index.duplicated(keep="last")].sort_index()
+
+
+def _adjustment_changed(stored, fetched, timestamp):
+    """
+    True if the bar at `timestamp` differs between the store and a fresh fetch.
+
+    Prices are split- and dividend-adjusted, so a new corporate action rewrites earlier
+    bars; the stored history then has to be fetched again rather than topped up.
+    """
+    if timestamp not in stored.index or timestamp not in fetched.index:
+        return False
+    old, new = stored.at[timestamp, "Close"], fetched.at[timestamp, "Close"]
+    return abs(new - old) > 1e-6 * max(abs(old), 1.0)
+
+
+def get_history(ticker, period=None, start=None, end=None, interval="1d", timeout=None):
+    """
+    Returns a ticker's OHLCV bars like yf.Ticker(ticker).history, from the local store.
+
+    Missing bars come from the provider configured through MARKET_DATA_PROVIDER (see
+    get_provider).
+
+    Bars are kept per (ticker, interval) in Parquet. Only the part of the requested range
+    the store does not cover yet is downloaded: earlier history when the range starts
+    before the stored one, and later bars when the range ends after the stored one. Today's
+    still-forming bar is refreshed at most every MARKET_DATA_MAX_AGE seconds. If an
+    overlapping bar comes back re-adjusted (a
+    split or dividend happened), the whole stored range is fetched again.
+
+    With MARKET_DATA_MODE=offline nothing is downloaded; bars come from the store, or
+    from the fixtures directory when the store has none in the requested range.
+
+    Args:
+        ticker (str): The ticker symbol.
+        period (str): A yfinance-style period ("6mo", "1y", "max", ...); used when
+                      `start` is not given, defaulting to "1y".
+        start, end: Dates bounding the bars, `end` exclusive (default: through today).
+        interval (str): The bar interval ("1d", "1wk", "1mo", ...).
+        timeout (float): Seconds each provider request may take.
+
+    Returns:
+        pd.DataFrame: The bars in [start, end); empty if none could be found.
+
+    Raises:
+        Exception: Whatever the provider raised, when nothing is stored to fall back on.
+    """
+    ticker = ticker.upper()
+    start, end = resolve_range(period, start, end)
+
+    if is_offline():
+        stored, _ = _read_store(ticker, interval)
+        bars = _slice(stored, start, end)
+        return bars if not bars.empty else _slice(read_fixture(ticker, interval), start, end)
+
+    max_age = float(os.getenv("MARKET_DATA_MAX_AGE", DEFAULT_MAX_AGE))
+    with _lock_for(ticker, interval):
+        stored, coverage = _read_store(ticker, interval)
+        if stored is None:
+            coverage = {"start": start.isoformat(), "end": start.isoformat(), "fetched_at": 0}
+        covered_start, covered_end = pd.Timestamp(coverage["start"]), pd.Timestamp(coverage["end"])
+        now = pd.Timestamp.now()
+
+        ranges = []
+        # Once the coverage reaches into today, the only bar missing is the one still
+        # forming, which is refreshed at most every max_age seconds. Any earlier gap is
+        # always fetched.
+        reaches_today = covered_end > now.normalize()
+        if end > covered_end and (not reaches_today or time.time() - coverage["fetched_at"] > max_age):
+            # Refetch from the second-to-last bar: the last one may have been incomplete,
+            # and the one before it shows whether earlier prices were re-adjusted
+            tail_start = covered_end
+            if stored is not None and len(stored) >= 2:
+                tail_start = min(tail_start, _naive(stored.index)[-2].normalize())
+            ranges.append((tail_start, end))
+        if start < covered_start:
+            ranges.append((start, covered_start))
+        if not ranges:
+            return _slice(stored, start, end)
+
+        provider = get_provider()
+        bars = stored
+        new_start, new_end = covered_start, covered_end
+        try:
+            for range_start, range_end in ranges:
+                fetched = provider.history(ticker, range_start, range_end, interval, timeout)
+                if bars is not None and len(bars) >= 2 and _adjustment_changed(bars, fetched, bars.index[-2]):
+                    print(f"🔄 {ticker} prices were re-adjusted; fetching its stored history again.")
+                    # Through the whole stored range, so no stored bar is dropped
+                    range_start, range_end = min(covered_start, start), max(end, covered_end.ceil("D"))
+                    refetched = provider.history(ticker, range_start, range_end, interval, timeout)
+                    if refetched is None or refetched.empty:
+                        print(f"⚠️ {ticker} ({interval}) came back empty from {provider.name}, serving stored bars.")
+                        break
+                    bars = refetched
+                    new_start, new_end = range_start, min(range_end, now)
+                    break
+                bars = _merge(bars, fetched)
+                new_start, new_end = min(new_start, range_start), max(new_end, min(range_end, now))
+        except Exception as e:
+            if stored is None:
+                raise
+            print(f"⚠️ Could not fetch {ticker} ({interval}) from {provider.name}, serving stored bars: {e}")
+
+        if bars is not None and not bars.empty and (new_start, new_end) != (covered_start, covered_end):
+            coverage = {"start": new_start.isoformat(), "end": new_end.isoformat(), "fetched_at": time.time()}
+            _write_store(ticker, interval, bars, coverage)
+        return _slice(bars, start, end)
+
+
+def fetch_prices(tickers, period=None, start=None, end=None, interval="1d", field="Close",
+                 max_workers=None, timeout=None):
+    """
+    Fetches one field of many tickers concurrently into an aligned price matrix.
+
+    Tickers are fetched through get_history (so the store is used and topped up) on a
+    bounded thread pool. A ticker still running `timeout` seconds after it started is
+    reported as timed out and left behind, so one slow symbol cannot hold up the rest.
+
+    Args:
+        tickers (iterable): Ticker symbols; duplicates are fetched once.
+        period, start, end, interval: As in get_history.
+        field (str): The bar column to collect.
+        max_workers (int): Concurrent fetches (default MARKET_DATA_MAX_WORKERS, then 8).
+        timeout (float): Seconds per ticker (default MARKET_DATA_TIMEOUT, then 20).
+
+    Returns:
+        tuple: (prices, errors) where prices is a DataFrame with one column per ticker
+               that returned data, in the order given, on the union of their timestamps
+               (calendar dates for daily and longer intervals), and errors maps every
+               other ticker to the reason it is missing.
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    max_workers = max_workers or int(os.getenv("MARKET_DATA_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+    timeout = timeout or float(os.getenv("MARKET_DATA_TIMEOUT", DEFAULT_TIMEOUT))
+    started = {}
+
+    def fetch(ticker):
+        started[ticker] = time.monotonic()
+        return get_history(ticker, period=period, start=start, end=end, interval=interval, timeout=timeout)
+
+    columns, errors = {}, {}
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers) or 1)))
+    try:
+        pending = {executor.submit(fetch, ticker): ticker for ticker in tickers}
+        while pending:
+            done, _ = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker = pending.pop(future)
+                try:
+                    bars = future.result()
+                except Exception as e:
+                    errors[ticker] = f"{type(e).__name__}: {e}"
+                    continue
+                if bars.empty or field not in bars:
+                    errors[ticker] = "no data"
+                    continue
+                series = bars[field]
+                if not interval.endswith(("m", "h")):
+                    # Align daily and longer bars by calendar date across exchanges
+                    series = series.tz_localize(None) if series.index.tz is not None else series
+                elif series.index.tz is not None:
+                    series = series.tz_convert("UTC")
+                columns[ticker] = series
+
+            now = time.monotonic()
+            for future, ticker in list(pending.items()):
+                if ticker in started and now - started[ticker] > timeout:
+                    errors[ticker] = f"timed out after {timeout:g}s"
+                    del pending[future]
+    finally:
+        # Do not wait for abandoned fetches; queued ones are cancelled
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    ordered = [t for t in tickers if t in columns]
+    prices = pd.concat([columns[t].rename(t) for t in ordered], axis=1).sort_index() if ordered else pd.DataFrame()
+    return prices, {t: errors[t] for t in tickers if t in errors}
+
+
+def export_fixtures(tickers, interval="1d", fixtures_dir=None):
+    """
+    Copies stored bars to the fixtures directory, so offline runs (and benchmarks) can
+    replay them without the store or the network.
+    """
+    fixtures_dir = fixtures_dir or _fixtures_dir()
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for ticker in tickers:
+        bars, _ = _read_store(ticker.upper(), interval)
+        if bars is None or bars.empty:
+            print(f"⚠️ No stored bars for {ticker} ({interval}).")
+            continue
+        path = os.path.join(fixtures_dir, f"{_file_name(ticker, interval)}.parquet")
+        bars.to_parquet(path)
+        print(f"💾 Wrote {len(bars)} bars to {path}")
+
+
+def main():
+    """
+    Fills the local market data store for some tickers, optionally exporting them as
+    fixtures, or benchmarks sequential against concurrent bulk fetching.
+    """
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Download OHLCV bars into the local market data store.")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--period", default="5y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent fetches (default MARKET_DATA_MAX_WORKERS).")
+    parser.add_argument("--export-fixtures", action="store_true", help="Also copy the bars to the fixtures directory.")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Time one worker against --workers, each into an empty temporary store.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        rows = []
+        for workers in (1, args.workers or DEFAULT_MAX_WORKERS):
+            with tempfile.TemporaryDirectory() as store_dir:
+                os.environ["MARKET_DATA_DIR"] = store_dir
+                start = time.perf_counter()
+                prices, errors = fetch_prices(args.tickers, period=args.period, interval=args.interval, max_workers=workers)
+                rows.append({"workers": workers, "seconds": round(time.perf_counter() - start, 2),
+                             "tickers": prices.shape[1], "bars": prices.shape[0], "errors": len(errors)})
+        print(f"\n📊 Bulk fetch of {len(args.tickers)} tickers via {get_provider().name}:")
+        print(pd.DataFrame(rows).to_string(index=False))
+        return
+
+    start = time.perf_counter()
+    prices, errors = fetch_prices(args.tickers, period=args.period, interval=args.interval, max_workers=args.workers)
+    print(f"✅ {prices.shape[1]} tickers x {prices.shape[0]} bars in {time.perf_counter() - start:.2f}s")
+    for ticker, reason in errors.items():
+        print(f"❌ {ticker}: {reason}")
+    if args.export_fixtures:
+        export_fixtures(args.tickers, args.interval)
+
+
+if __name__ == "__main__":
+    main()
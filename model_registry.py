@@ -0,0 +1,99 @@
+# model_registry.py
+
+import threading
+import time
+
+# Loaded models by key. Module globals live for the whole process, so every Streamlit
+# session and rerun shares one copy of each model.
+_models = {}
+_lock = threading.Lock()
+_loading_locks = {}
+
+
+def model_memory_bytes(model):
+    """
+    Returns the size of a model's weights and buffers in bytes.
+
+    Accepts a torch module, or anything with a `.model` torch module (such as a
+    transformers pipeline). Models that know their own size can provide a
+    memory_bytes() method instead. Returns None when the size is unknown.
+    """
+    module = getattr(model, "model", model)
+    if hasattr(module, "memory_bytes"):
+        return module.memory_bytes()
+    if not hasattr(module, "parameters"):
+        return None
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return None
+
+
+def get_model(key, loader, warmup=None):
+    """
+    Returns the model registered under `key`, loading it on first use.
+
+    Loading is serialised per key: concurrent callers wait for the first load instead
+    of loading their own copy, while models under other keys load in parallel. A model
+    is only published after its warmup inference, so no caller pays for first-call
+    initialisation.
+
+    Args:
+        key (str): Identifies the model (e.g. model name plus backend).
+        loader (callable): Takes no arguments and returns the model.
+        warmup (callable): Optional; called with the loaded model once before it is shared.
+
+    Returns:
+        The loaded model.
+    """
+    with _lock:
+        if key in _models:
+            return _models[key]["model"]
+        key_lock = _loading_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        with _lock:
+            if key in _models:
+                return _models[key]["model"]
+
+        start = time.perf_counter()
+        model = loader()
+        load_seconds = time.perf_counter() - start
+
+        warmup_seconds = None
+        if warmup is not None:
+            start = time.perf_counter()
+            warmup(model)
+            warmup_seconds = time.perf_counter() - start
+
+        memory_bytes = model_memory_bytes(model)
+        memory = f"{memory_bytes / 1e6:,.0f} MB" if memory_bytes is not None else "size unknown"
+        print(f"✅ Loaded model {key} in {load_seconds:.2f}s ({memory})")
+        with _lock:
+            _models[key] = {
+                "model": model,
+                "load_seconds": load_seconds,
+                "warmup_seconds": warmup_seconds,
+                "memory_mb": memory_bytes / 1e6 if memory_bytes is not None else None,
+                "loaded_at": time.time(),
+            }
+        return model
+
+
+def model_info(key=None):
+    """
+    Returns load time, warmup time and memory footprint of loaded models.
+
+    Returns:
+        dict: Stats for `key` (None if it is not loaded), or {key: stats} for every loaded model.
+    """
+    with _lock:
+        info = {k: {name: v for name, v in entry.items() if name != "model"} for k, entry in _models.items()}
+    return info.get(key) if key is not None else info
+
+
+def unload_model(key):
+    """Drops a model from the registry so the next get_model() call reloads it."""
+    with _lock:
+        _models.pop(key, None)
@@ -0,0 +1,165 @@
+# onnx_sentiment.py
+
+import os
+import re
+import types
+
+import numpy as np
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ONNX_DIR = os.path.join(_script_dir, "onnx_models")
+ONNX_OPSET = 14
+
+_WARMUP_TEXT = "Revenue increased compared to the prior year."
+
+
+def _model_dir(model_name, onnx_dir):
+    return os.path.join(onnx_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+
+
+def export_onnx(model_name, onnx_dir=DEFAULT_ONNX_DIR, quantize=True):
+    """
+    Exports a transformers sequence-classification model to ONNX, once.
+
+    The fp32 graph is saved as model.onnx next to the tokenizer and config, and with
+    `quantize` a dynamically int8-quantized copy (weights in int8, activations quantized
+    at run time) is saved as model.int8.onnx. Existing files are reused.
+
+    Args:
+        model_name (str): A Hugging Face model name.
+        onnx_dir (str): Root directory of exported models.
+        quantize (bool): Whether to also produce the int8 model.
+
+    Returns:
+        str: Path of the ONNX file to run (the int8 one when `quantize` is set).
+    """
+    model_dir = _model_dir(model_name, onnx_dir)
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model.int8.onnx")
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        print(f"📦 Exporting {model_name} to ONNX...")
+        os.makedirs(model_dir, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+        dummy = tokenizer([_WARMUP_TEXT], return_tensors="pt")
+        tmp_path = f"{fp32_path}.tmp.{os.getpid()}"
+        with torch.inference_mode():
+            torch.onnx.export(
+                model,
+                (dummy["input_ids"], dummy["attention_mask"]),
+                tmp_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch"},
+                },
+                opset_version=ONNX_OPSET,
+            )
+        tokenizer.save_pretrained(model_dir)
+        model.config.save_pretrained(model_dir)
+        os.replace(tmp_path, fp32_path)
+
+    if not quantize:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print(f"📦 Quantizing {model_name} to int8...")
+        tmp_path = f"{int8_path}.tmp.{os.getpid()}"
+        quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+    return int8_path
+
+
+class OnnxSequenceClassifier:
+    """
+    Runs an exported classifier on onnxruntime's CPU provider.
+
+    Mirrors the part of a transformers model that the sentiment code uses: calling it
+    with token tensors returns an object with `.logits`, and it has `.config` and
+    `.device`, so sentiment_analyzer.score_encodings works with either backend.
+    """
+    def __init__(self, onnx_path, config, threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.onnx_path = onnx_path
+        self.config = config
+        self.device = "cpu"
+
+    def run(self, **inputs):
+        """Returns the logits for numpy (or torch) token arrays as a numpy array."""
+        feed = {
+            name: np.asarray(value.cpu().numpy() if hasattr(value, "cpu") else value, dtype=np.int64)
+            for name, value in inputs.items()
+            if name in self.input_names
+        }
+        return self.session.run(["logits"], feed)[0]
+
+    def __call__(self, **inputs):
+        import torch
+
+        return types.SimpleNamespace(logits=torch.from_numpy(self.run(**inputs)))
+
+    def memory_bytes(self):
+        """Size of the ONNX graph and weights on disk, which is what the session holds."""
+        return os.path.getsize(self.onnx_path)
+
+
+class OnnxSentimentPipeline:
+    """
+    A drop-in replacement for the transformers "sentiment-analysis" pipeline on onnxruntime.
+
+    Calling it with a string or a list of strings returns [{'label', 'score'}, ...],
+    and it exposes `.tokenizer` and `.model` like a transformers pipeline.
+    """
+    def __init__(self, tokenizer, model, max_length=512):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.max_length = max_length
+
+    def __call__(self, texts):
+        if isinstance(texts, str):
+            texts = [texts]
+        inputs = self.tokenizer(texts, truncation=True, max_length=self.max_length, padding=True, return_tensors="np")
+        logits = self.model.run(**inputs)
+        probabilities = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probabilities /= probabilities.sum(axis=-1, keepdims=True)
+        return [
+            {"label": self.model.config.id2label[int(row.argmax())], "score": float(row.max())}
+            for row in probabilities
+        ]
+
+
+def load_onnx_pipeline(model_name, quantize=True, onnx_dir=DEFAULT_ONNX_DIR, threads=None):
+    """
+    Exports the model if needed and returns an OnnxSentimentPipeline for it.
+
+    Args:
+        model_name (str): A Hugging Face model name.
+        quantize (bool): Run the dynamically int8-quantized model instead of fp32.
+        onnx_dir (str): Root directory of exported models.
+        threads (int): onnxruntime intra-op threads (defaults to ONNX_THREADS or all cores).
+
+    Returns:
+        OnnxSentimentPipeline: The pipeline.
+    """
+    from transformers import AutoConfig, AutoTokenizer
+
+    onnx_path = export_onnx(model_name, onnx_dir, quantize=quantize)
+    model_dir = os.path.dirname(onnx_path)
+    threads = threads or int(os.getenv("ONNX_THREADS", 0)) or None
+    model = OnnxSequenceClassifier(onnx_path, AutoConfig.from_pretrained(model_dir), threads=threads)
+    return OnnxSentimentPipeline(AutoTokenizer.from_pretrained(model_dir), model)
@@ -30,27 +30,22 @@ with col[4]:
     run = st.button("Compare")
 
 if run:
-    import yfinance as yf
+    from market_data import fetch_prices
     tickers = [t.strip() for t in tickers_input.split(",") if t.strip()]
     if len(tickers) < 2:
         st.warning("Enter at least 2 tickers.")
         st.stop()
 
     with st.spinner("Fetching data..."):
-        dfs = {}
-        for t in tickers + [bench]:
-            try:
-                hist = yf.Ticker(t).history(period=period, interval=interval)
-                if not hist.empty:
-                    dfs[t] = hist["Close"].rename(t)
-            except Exception:
-                pass
+        prices, errors = fetch_prices(tickers + [bench], period=period, interval=interval)
 
-    if not dfs:
+    if errors:
+        st.warning("Could not fetch: " + "; ".join(f"{t} ({reason})" for t, reason in errors.items()))
+    if prices.empty:
         st.error("No data fetched.")
         st.stop()
 
-    prices = pd.concat(dfs.values(), axis=1).dropna()
+    prices = prices.dropna()
     returns = prices.pct_change().dropna()
     cum_returns = (1 + returns).cumprod() - 1
 
@@ -28,11 +28,11 @@ with col[2]:
 st.info("This is a lightweight demo using synthetic sentiment from headlines to illustrate influence.")
 
 if run:
-    import yfinance as yf
     import numpy as np
+    from market_data import get_history
 
     with st.spinner("Fetching data & estimating influence..."):
-        hist = yf.Ticker(ticker).history(period=period)
+        hist = get_history(ticker, period=period)
         if hist.empty:
             st.error("No data found.")
             st.stop()
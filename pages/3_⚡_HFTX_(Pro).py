@@ -1,4 +1,5 @@
 import streamlit as st
+import pandas as pd
 from pro_utils import require_pro, inject_premium_style
 
 
@@ -18,3 +19,60 @@ if not require_pro():
 st.info("Coming soon: HFT simulators, latency dashboards, and market microstructure analytics.")
 
 
+
+st.subheader("🚨 Live Volume Anomalies")
+st.caption("Feeds 1-minute bars through a streaming detector. Each scan only processes bars newer than the last one.")
+
+col = st.columns([2,1,1,1])
+with col[0]:
+    ticker = st.text_input("Ticker", value="AAPL").upper().strip()
+with col[1]:
+    window = st.number_input("Window (bars)", min_value=5, max_value=500, value=30)
+with col[2]:
+    factor = st.number_input("Std dev factor", min_value=1.0, max_value=10.0, value=2.5, step=0.5)
+with col[3]:
+    scan = st.button("Scan latest bars")
+
+if scan and ticker:
+    import yfinance as yf
+    from anomaly_detection import OnlineVolumeDetector
+
+    # Detector state lives in the session, so each scan continues where the last one stopped
+    key = f"hftx_monitor:{ticker}:{int(window)}:{factor}"
+    if key not in st.session_state:
+        st.session_state[key] = {
+            "detector": OnlineVolumeDetector(window=int(window), std_dev_factor=factor),
+            "last_seen": None,
+            "bars": 0,
+            "events": [],
+        }
+    monitor = st.session_state[key]
+
+    with st.spinner("Fetching bars..."):
+        try:
+            bars = yf.Ticker(ticker).history(period="5d", interval="1m")
+        except Exception as e:
+            st.error(f"Could not fetch bars: {e}")
+            st.stop()
+
+    if bars.empty:
+        st.warning("No intraday bars available.")
+        st.stop()
+
+    new_bars = bars if monitor["last_seen"] is None else bars[bars.index > monitor["last_seen"]]
+    new_events = monitor["detector"].update_many(new_bars["Volume"], symbol=ticker)
+    monitor["events"].extend(new_events)
+    monitor["bars"] += len(new_bars)
+    if not new_bars.empty:
+        monitor["last_seen"] = new_bars.index[-1]
+
+    m = st.columns(3)
+    m[0].metric("Bars processed", f"{monitor['bars']:,}")
+    m[1].metric("New bars", f"{len(new_bars):,}")
+    m[2].metric("Anomalies", len(monitor["events"]), delta=len(new_events) or None)
+
+    if monitor["events"]:
+        events = pd.DataFrame(monitor["events"])[["timestamp", "volume", "ratio", "anomaly_reason"]]
+        st.dataframe(events.tail(20).iloc[::-1], use_container_width=True)
+    else:
+        st.success("No volume anomalies so far.")
@@ -0,0 +1,288 @@
+# pdf_ingestion.py
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Default locations, resolved relative to this file like DataLoader does
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PDF_DIR = os.path.join(_script_dir, "data", "financebench-main", "pdfs")
+DEFAULT_STORE_DIR = os.path.join(_script_dir, "page_store")
+
+# Bump this when the extraction logic changes so stored pages get re-extracted
+EXTRACTOR_VERSION = 1
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_sha256(path):
+    """
+    Computes the SHA-256 hex digest of a file, reading it in 1 MB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path, payload):
+    """Writes JSON to a temporary file and swaps it in, so readers never see a partial file."""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _extract_pdf(pdf_path, pages_dir):
+    """
+    Worker entry point: hashes one PDF and extracts its page text into the store.
+
+    Runs inside a worker process, so it only takes and returns plain picklable values.
+    Extraction is skipped when a page file for the same content hash was already written
+    by the current EXTRACTOR_VERSION (for example when a filing was renamed or touched
+    without changing).
+
+    Returns:
+        dict: The manifest record for the PDF.
+    """
+    # Imported here so that the parent process does not need pypdf just to check the manifest
+    from pypdf import PdfReader
+
+    start = time.perf_counter()
+    stat = os.stat(pdf_path)
+    content_hash = file_sha256(pdf_path)
+    page_file = os.path.join(pages_dir, f"{content_hash}.json")
+
+    stored = None
+    if os.path.exists(page_file):
+        try:
+            with open(page_file, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = None
+
+    if stored is not None and stored.get("extractor_version") == EXTRACTOR_VERSION:
+        num_pages = len(stored["pages"])
+        extracted = False
+    else:
+        reader = PdfReader(pdf_path)
+        pages = []
+        for page in reader.pages:
+            try:
+                pages.append(page.extract_text() or "")
+            except Exception:
+                # A single malformed page should not drop the whole filing
+                pages.append("")
+        _write_json_atomic(page_file, {"extractor_version": EXTRACTOR_VERSION, "pages": pages})
+        num_pages = len(pages)
+        extracted = True
+
+    return {
+        "sha256": content_hash,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "num_pages": num_pages,
+        "extractor_version": EXTRACTOR_VERSION,
+        "extracted": extracted,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+class PageStore:
+    """
+    An on-disk store of extracted PDF page text, keyed by the content hash of each PDF.
+
+    Layout:
+        <store_dir>/manifest.json      maps doc_name -> {sha256, size, mtime, num_pages, ...}
+        <store_dir>/pages/<sha256>.json holds {"pages": [text of page 0, page 1, ...]}
+
+    Page numbers are 0-based, matching pypdf's page order.
+    """
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        self.pages_dir = os.path.join(store_dir, "pages")
+        self.manifest_path = os.path.join(store_dir, "manifest.json")
+        os.makedirs(self.pages_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read page store manifest, starting fresh: {e}")
+            return {}
+
+    def save_manifest(self):
+        """Persists the manifest to disk."""
+        _write_json_atomic(self.manifest_path, self.manifest)
+
+    def doc_names(self):
+        """Returns the sorted list of document names held in the store."""
+        return sorted(self.manifest)
+
+    def get_record(self, doc_name):
+        """Returns the manifest record for a document, or None if it is not stored."""
+        return self.manifest.get(doc_name)
+
+    def get_pages(self, doc_name):
+        """
+        Loads the page texts of a stored document.
+
+        Returns:
+            list[str]: One string per page, or None if the document is not in the store.
+        """
+        record = self.manifest.get(doc_name)
+        if record is None:
+            return None
+        with open(os.path.join(self.pages_dir, f"{record['sha256']}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)["pages"]
+
+    def iter_pages(self, doc_names=None):
+        """
+        Yields (doc_name, page_num, text) for every page of the given (or all) documents.
+        """
+        for doc_name in doc_names if doc_names is not None else self.doc_names():
+            pages = self.get_pages(doc_name)
+            if pages is None:
+                continue
+            for page_num, text in enumerate(pages):
+                yield doc_name, page_num, text
+
+    def is_current(self, doc_name, pdf_path):
+        """
+        Returns True if the stored record still matches the PDF on disk.
+
+        Size and modification time are checked first so unchanged files are never rehashed.
+        """
+        record = self.manifest.get(doc_name)
+        if record is None or record.get("extractor_version") != EXTRACTOR_VERSION:
+            return False
+        stat = os.stat(pdf_path)
+        return record["size"] == stat.st_size and record["mtime"] == stat.st_mtime
+
+    def prune_orphans(self):
+        """
+        Deletes page files no longer referenced by the manifest.
+
+        Returns:
+            int: The number of files removed.
+        """
+        referenced = {record["sha256"] for record in self.manifest.values()}
+        removed = 0
+        for name in os.listdir(self.pages_dir):
+            content_hash, ext = os.path.splitext(name)
+            if ext == ".json" and content_hash not in referenced:
+                os.remove(os.path.join(self.pages_dir, name))
+                removed += 1
+        return removed
+
+
+def list_pdfs(pdf_dir=DEFAULT_PDF_DIR):
+    """
+    Lists the PDFs in a directory.
+
+    Returns:
+        dict: Maps doc_name (the file name without '.pdf') to its absolute path.
+    """
+    if not os.path.isdir(pdf_dir):
+        print(f"Error: PDF directory not found at path: {os.path.abspath(pdf_dir)}")
+        return {}
+    return {
+        os.path.splitext(name)[0]: os.path.join(pdf_dir, name)
+        for name in sorted(os.listdir(pdf_dir))
+        if name.lower().endswith(".pdf")
+    }
+
+
+def ingest_pdfs(pdf_dir=DEFAULT_PDF_DIR, store_dir=DEFAULT_STORE_DIR, max_workers=None, prune=True):
+    """
+    Extracts page text from every new or changed PDF into the page store on a process pool.
+
+    Args:
+        pdf_dir (str): Directory holding the filings.
+        store_dir (str): Directory of the page store.
+        max_workers (int): Worker processes to use (defaults to the CPU count).
+        prune (bool): Whether to drop documents whose PDF was removed, and unreferenced page files.
+
+    Returns:
+        dict: Counts of 'extracted', 'reused', 'unchanged', 'removed' and 'failed' documents,
+              plus the wall time in 'seconds'.
+    """
+    start = time.perf_counter()
+    store = PageStore(store_dir)
+    pdfs = list_pdfs(pdf_dir)
+
+    pending = {doc_name: path for doc_name, path in pdfs.items() if not store.is_current(doc_name, path)}
+    summary = {
+        "extracted": 0,
+        "reused": 0,
+        "unchanged": len(pdfs) - len(pending),
+        "removed": 0,
+        "failed": 0,
+    }
+    print(f"📄 {len(pdfs)} PDFs found, {len(pending)} new or changed.")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_extract_pdf, path, store.pages_dir): doc_name
+                for doc_name, path in pending.items()
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                doc_name = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    print(f"❌ Error extracting {doc_name}: {e}")
+                    summary["failed"] += 1
+                    continue
+                summary["extracted" if record.pop("extracted") else "reused"] += 1
+                record.pop("seconds")
+                store.manifest[doc_name] = record
+
+                # Checkpoint the manifest so an interrupted run keeps its progress
+                if done % 25 == 0:
+                    store.save_manifest()
+                    print(f"  Processed {done}/{len(pending)} PDFs...")
+
+    if prune:
+        for doc_name in set(store.manifest) - set(pdfs):
+            del store.manifest[doc_name]
+            summary["removed"] += 1
+
+    store.save_manifest()
+    if prune:
+        store.prune_orphans()
+
+    summary["seconds"] = time.perf_counter() - start
+    print(
+        f"✅ Ingestion complete in {summary['seconds']:.1f}s: {summary['extracted']} extracted, "
+        f"{summary['reused']} reused, {summary['unchanged']} unchanged, "
+        f"{summary['removed']} removed, {summary['failed']} failed."
+    )
+    return summary
+
+
+def main():
+    """
+    Command-line entry point for ingesting the FinanceBench filings.
+    """
+    parser = argparse.ArgumentParser(description="Extract page text from FinanceBench PDFs into the page store.")
+    parser.add_argument("--pdf-dir", default=DEFAULT_PDF_DIR, help="Directory containing the PDFs.")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="Directory of the page store.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--no-prune", action="store_true", help="Keep documents whose PDF was removed.")
+    args = parser.parse_args()
+
+    ingest_pdfs(args.pdf_dir, args.store_dir, max_workers=args.workers, prune=not args.no_prune)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# qa_sources.py
+
+import os
+
+from langchain.docstore.document import Document
+
+from data_loader import DataLoader
+from analysis import extract_and_clean_evidence
+from corpus import get_corpus
+from pdf_ingestion import PageStore, DEFAULT_STORE_DIR, EXTRACTOR_VERSION
+from vectorstore_index import SourceUnit, hash_documents
+
+# The documents that go into the Q&A vectorstore. Kept apart from qa_system so building
+# or benchmarking the index does not need the LLM client.
+
+def prepare_data_for_qa():
+    """Loads and preprocesses data, returning a list of LangChain Document objects."""
+    print("Loading and preprocessing data...")
+    
+    # Create an instance of our DataLoader to load the data
+    loader = DataLoader()
+    open_source_df = loader.load_jsonl_file("financebench_open_source.jsonl")
+
+    if open_source_df is None:
+        return []
+
+    # Use the preprocessing function we already created
+    processed_df = extract_and_clean_evidence(
+        open_source_df, loader.load_evidence_table("financebench_open_source.jsonl")
+    )
+    
+    corpus = get_corpus()
+
+    # For financial questions, also include the correct answer in the context
+    # This helps the model learn the expected answer format
+    question = processed_df['question'].astype("string").fillna("")
+    answer = processed_df['answer'].astype("string").fillna("")
+    content = processed_df['all_evidence_text']
+    enriched_content = (
+        "\nQuestion: " + question + "\nAnswer: " + answer + "\n\nSupporting Evidence:\n" + content + "\n"
+    ).where(
+        content != "",
+        # Fallback if no evidence, use question and answer
+        "Question: " + question + "\nAnswer: " + answer,
+    )
+
+    # LangChain needs data in a specific Document format
+    docs = []
+    for row, page_content in zip(processed_df.to_dict('records'), enriched_content):
+        if page_content:
+            docs.append(Document(
+                page_content=page_content,
+                metadata={
+                    **corpus.metadata(row.get('doc_name')),
+                    "financebench_id": row.get('financebench_id', ''),
+                    "doc_name": row.get('doc_name', 'Unknown'),
+                    "question": row.get('question', ''),
+                    "answer": row.get('answer', ''),
+                    "company": row.get('company', 'Unknown')
+                }
+            ))
+    print(f"Prepared {len(docs)} documents for the Q&A system.")
+    return docs
+
+def load_filing_units(store_dir=DEFAULT_STORE_DIR):
+    """
+    Returns one SourceUnit per filing in the PDF page store (see pdf_ingestion.py).
+
+    Filings are tracked by their content hash, so their pages are only read when a
+    filing is new or changed. Returns an empty list if nothing has been ingested yet.
+    """
+    if not os.path.exists(os.path.join(store_dir, "manifest.json")):
+        return []
+
+    store = PageStore(store_dir)
+    corpus = get_corpus()
+
+    def loader_for(doc_name):
+        def load_documents():
+            return [
+                Document(
+                    page_content=text,
+                    metadata={
+                        "company": 'Unknown',
+                        **corpus.metadata(doc_name),
+                        "doc_name": doc_name,
+                        "page_num": page_num,
+                        "source": "pdf",
+                    }
+                )
+                for _, page_num, text in store.iter_pages([doc_name])
+                if text.strip()
+            ]
+        return load_documents
+
+    return [
+        SourceUnit(
+            unit_id=f"pdf:{doc_name}",
+            content_hash=f"{store.get_record(doc_name)['sha256']}:{EXTRACTOR_VERSION}",
+            load_documents=loader_for(doc_name),
+        )
+        for doc_name in store.doc_names()
+    ]
+
+def build_source_units():
+    """
+    Collects everything that belongs in the vectorstore as manifest-tracked units:
+    the FinanceBench Q&A evidence rows plus any filings in the PDF page store.
+    """
+    units = []
+    for i, doc in enumerate(prepare_data_for_qa()):
+        unit_id = f"qa:{doc.metadata.get('financebench_id') or i}"
+        units.append(SourceUnit(unit_id, hash_documents([doc]), lambda doc=doc: [doc]))
+    units.extend(load_filing_units())
+    return units
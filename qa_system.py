@@ -1,34 +1,41 @@
 # qa_system.py
 
+import asyncio
 import os
-import pickle
 from pathlib import Path
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains import RetrievalQA
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.prompts import format_document
 
 # Import the config module to load API key
-from config import get_google_api_key, validate_api_key
+from config import get_google_api_key, load_environment, validate_api_key
 
 # Import our existing data loading and preprocessing functions from their respective files
-from data_loader import DataLoader
-from analysis import extract_and_clean_evidence
+from qa_sources import build_source_units
+from vectorstore_index import index_fingerprint, sync_vectorstore, with_search_index
+from embedding_backend import get_embeddings
+from hybrid_retriever import HybridRetriever, HybridSearcher, parse_question_filters
+from answer_cache import open_answer_cache
+
+# Settings below and in the embedding/answer-cache modules may come from .env
+load_environment()
 
 # Global cache for the QA chain to avoid reloading
 _qa_chain_cache = None
-_vectorstore_path = "vectorstore_cache"
+_answer_cache = None
+LLM_MODEL = "gemini-1.5-flash"
+LLM_TEMPERATURE = 0.1
+_vectorstore_path = os.getenv("VECTORSTORE_PATH", "vectorstore_cache")
 
-def load_cached_vectorstore():
+def load_cached_vectorstore(embeddings=None):
     """Load cached vectorstore if it exists, otherwise return None."""
     if Path(_vectorstore_path).exists():
         try:
             print("📁 Loading cached vectorstore...")
-            embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=get_google_api_key()
-            )
+            if embeddings is None:
+                embeddings = get_embeddings()
             vectorstore = FAISS.load_local(_vectorstore_path, embeddings, allow_dangerous_deserialization=True)
             print("✅ Cached vectorstore loaded successfully!")
             return vectorstore
@@ -37,82 +44,11 @@ def load_cached_vectorstore():
             return None
     return None
 
-def save_vectorstore(vectorstore):
-    """Save vectorstore to cache for faster future loading."""
-    try:
-        vectorstore.save_local(_vectorstore_path)
-        print("💾 Vectorstore cached for faster future loading!")
-    except Exception as e:
-        print(f"⚠️ Failed to cache vectorstore: {e}")
-
-def prepare_data_for_qa():
-    """Loads and preprocesses data, returning a list of LangChain Document objects."""
-    print("Loading and preprocessing data...")
-    
-    # Create an instance of our DataLoader to load the data
-    loader = DataLoader()
-    open_source_df = loader.load_jsonl_file("financebench_open_source.jsonl")
-
-    if open_source_df is None:
-        return []
-
-    # Use the preprocessing function we already created
-    processed_df = extract_and_clean_evidence(open_source_df)
-    
-    # LangChain needs data in a specific Document format
-    docs = []
-    for _, row in processed_df.iterrows():
-        # Handle the evidence field which might be a list
-        content = ""
-        evidence = row.get('evidence', '')
-        
-        if isinstance(evidence, list) and evidence:
-            # If evidence is a list, join the text from all evidence items
-            evidence_texts = []
-            for item in evidence:
-                if isinstance(item, dict) and 'evidence_text' in item:
-                    evidence_texts.append(item['evidence_text'])
-                elif isinstance(item, str):
-                    evidence_texts.append(item)
-            content = ' '.join(evidence_texts)
-        elif isinstance(evidence, str):
-            content = evidence
-        
-        # For financial questions, also include the correct answer in the context
-        # This helps the model learn the expected answer format
-        if content and 'question' in row and 'answer' in row:
-            # Create enriched content that includes question context and evidence
-            enriched_content = f"""
-Question: {row['question']}
-Answer: {row['answer']}
-
-Supporting Evidence:
-{content}
-"""
-        elif not content and 'question' in row and 'answer' in row:
-            # Fallback if no evidence, use question and answer
-            enriched_content = f"Question: {row['question']}\nAnswer: {row['answer']}"
-        else:
-            enriched_content = content
-        
-        if enriched_content and isinstance(enriched_content, str):
-            docs.append(Document(
-                page_content=enriched_content,
-                metadata={
-                    "doc_name": row.get('doc_name', 'Unknown'),
-                    "question": row.get('question', ''),
-                    "answer": row.get('answer', ''),
-                    "company": row.get('company', 'Unknown')
-                }
-            ))
-    print(f"Prepared {len(docs)} documents for the Q&A system.")
-    return docs
-
 def create_qa_chain():
     """
     Creates and returns a LangChain RetrievalQA chain using Gemini Pro with caching for speed.
     """
-    global _qa_chain_cache
+    global _qa_chain_cache, _answer_cache
     
     # Return cached chain if available
     if _qa_chain_cache is not None:
@@ -121,72 +57,195 @@ def create_qa_chain():
     
     print("⚡ Initializing Q&A system...")
     
-    # Try to load cached vectorstore first
-    vectorstore = load_cached_vectorstore()
-    
+    os.environ['GOOGLE_API_KEY'] = get_google_api_key()
+    embeddings = get_embeddings()
+
+    # Load the cached vectorstore, then embed only new or changed documents
+    vectorstore = load_cached_vectorstore(embeddings)
+    vectorstore, _ = sync_vectorstore(
+        vectorstore, build_source_units(), embeddings, embeddings.model_name, _vectorstore_path
+    )
+
     if vectorstore is None:
-        # No cache available, create from scratch
-        print("📄 Processing documents for first-time setup...")
-        
-        # Text splitter - optimized for financial data
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=800,  # Smaller chunks for better retrieval of specific numbers
-            chunk_overlap=200,  # More overlap to preserve context
-            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
-        )
-        
-        docs = prepare_data_for_qa()
-        
-        if not docs:
-            print("❌ No documents to process. Exiting.")
-            return None
-            
-        texts = text_splitter.split_documents(docs)
-        print(f"✅ Created {len(texts)} text chunks for vector search")
+        print("❌ No documents to process. Exiting.")
+        return None
 
-        # Create Embeddings and Vector Store with Gemini's model
-        os.environ['GOOGLE_API_KEY'] = get_google_api_key()
-        
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        vectorstore = FAISS.from_documents(texts, embeddings)
-        
-        # Save vectorstore for future use
-        save_vectorstore(vectorstore)
+    # Search through the configured index type (flat, ivf, hnsw or ivfpq)
+    vectorstore = with_search_index(vectorstore, os.getenv("FAISS_INDEX_TYPE", "flat"), _vectorstore_path)
     
     # Set up the Language Model with better settings for financial data
     llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash", 
-        temperature=0.1,  # Lower temperature for more precise answers
+        model=LLM_MODEL,
+        temperature=LLM_TEMPERATURE,  # Lower temperature for more precise answers
         max_tokens=1024
     )
 
+    searcher = HybridSearcher(vectorstore, k=8)  # Retrieve more chunks to find specific data
+
     # Build the Retrieval Chain with improved retrieval
     qa_chain = RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
-        retriever=vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 8}  # Retrieve more chunks to find specific data
+        # Narrow by company/year/doc type from the question, then fuse BM25 and FAISS scores
+        retriever=HybridRetriever(
+            searcher=searcher,
+            k=8
         ),
         return_source_documents=True,  # Return sources for transparency
         verbose=False  # Reduce verbose output for speed
     )
     
+    # Answers are only reusable for the same index contents and LLM
+    _answer_cache = open_answer_cache(
+        version=f"{index_fingerprint(vectorstore)}:{LLM_MODEL}",
+        embed_query=embeddings.embed_query,
+        # Near-duplicates must be about the same company, year and doc type
+        question_filters=lambda question: parse_question_filters(question, searcher.company_aliases),
+    )
+
     # Cache the chain for future use
     _qa_chain_cache = qa_chain
     print("💾 Q&A chain cached for faster future queries!")
     
     return qa_chain
 
+def _serialize_sources(docs):
+    return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+def _cached_response(question):
+    """Returns a query_qa_system-style response from the answer cache, or None."""
+    if _answer_cache is None:
+        return None
+    hit = _answer_cache.get(question)
+    if hit is None:
+        return None
+    return {
+        "result": hit["answer"],
+        "source_documents": [Document(**source) for source in hit["sources"]],
+        "cached": hit["match"],
+    }
+
+def _build_prompt(qa_chain, question, docs):
+    """Formats the "stuff" prompt exactly as the RetrievalQA chain would for these documents."""
+    combine = qa_chain.combine_documents_chain
+    context = combine.document_separator.join(format_document(doc, combine.document_prompt) for doc in docs)
+    return combine.llm_chain.prompt.format_prompt(**{combine.document_variable_name: context, "question": question})
+
+def query_qa_system(question):
+    """
+    Answers a question, serving exact or near-duplicate repeats from the answer cache.
+
+    Returns:
+        dict: {'result', 'source_documents', 'cached'} where 'cached' is 'exact' or
+              'near' for cache hits and None for fresh answers, or None if the Q&A
+              chain could not be created.
+    """
+    qa_chain = create_qa_chain()
+    if not qa_chain:
+        return None
+
+    cached = _cached_response(question)
+    if cached is not None:
+        return cached
+
+    response = qa_chain.invoke({"query": question})
+    if _answer_cache is not None:
+        _answer_cache.put(question, response['result'], _serialize_sources(response.get('source_documents', [])))
+    return {**response, "cached": None}
+
+def stream_question(question):
+    """
+    Retrieves sources for a question, then streams the answer token by token.
+
+    Retrieval happens before this returns, so callers can show the sources while the
+    answer is still being generated. The full answer is stored in the answer cache
+    once the stream is exhausted; cache hits are yielded as a single chunk.
+
+    Returns:
+        tuple: (source_documents, token_iterator, cached) where cached is 'exact',
+               'near' or None, or None if the Q&A chain could not be created.
+    """
+    qa_chain = create_qa_chain()
+    if not qa_chain:
+        return None
+
+    cached = _cached_response(question)
+    if cached is not None:
+        return cached["source_documents"], iter([cached["result"]]), cached["cached"]
+
+    docs = qa_chain.retriever.invoke(question)
+    prompt = _build_prompt(qa_chain, question, docs)
+    llm = qa_chain.combine_documents_chain.llm_chain.llm
+
+    def tokens():
+        parts = []
+        for chunk in llm.stream(prompt):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+        if _answer_cache is not None:
+            _answer_cache.put(question, "".join(parts), _serialize_sources(docs))
+
+    return docs, tokens(), None
+
+async def astream_question(question):
+    """
+    Async generator that yields answer tokens as the LLM produces them.
+
+    Only tokens are yielded; use stream_question when the sources are needed
+    before generation starts.
+    """
+    qa_chain = await asyncio.to_thread(create_qa_chain)
+    if not qa_chain:
+        return
+
+    # The cache lookup can embed the question and both it and put() hit SQLite
+    cached = await asyncio.to_thread(_cached_response, question)
+    if cached is not None:
+        yield cached["result"]
+        return
+
+    docs = await qa_chain.retriever.ainvoke(question)
+    prompt = _build_prompt(qa_chain, question, docs)
+    parts = []
+    async for chunk in qa_chain.combine_documents_chain.llm_chain.llm.astream(prompt):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    if _answer_cache is not None:
+        await asyncio.to_thread(_answer_cache.put, question, "".join(parts), _serialize_sources(docs))
+
+async def aask_question(question):
+    """
+    Async counterpart of query_qa_system: answers a question without blocking the event loop.
+
+    Returns:
+        dict: {'result', 'source_documents', 'cached'}, or None if the Q&A chain could
+              not be created.
+    """
+    qa_chain = await asyncio.to_thread(create_qa_chain)
+    if not qa_chain:
+        return None
+
+    cached = await asyncio.to_thread(_cached_response, question)
+    if cached is not None:
+        return cached
+
+    response = await qa_chain.ainvoke({"query": question})
+    if _answer_cache is not None:
+        await asyncio.to_thread(
+            _answer_cache.put, question, response['result'], _serialize_sources(response.get('source_documents', []))
+        )
+    return {**response, "cached": None}
+
 def ask_question(question):
     """Ask a single question to the Q&A system and return the answer."""
     if not validate_api_key():
         return "Error: GOOGLE_API_KEY not found or invalid. Please check your .env file."
 
     try:
-        qa_chain = create_qa_chain()
-        if qa_chain:
-            response = qa_chain.invoke({"query": question})
+        response = query_qa_system(question)
+        if response:
             return response['result']
         else:
             return "Failed to create Q&A chain"
@@ -1,120 +1,269 @@
 # sentiment_analyzer.py
 
 import os
-import pandas as pd
+import time
 from transformers import pipeline
-from config import get_google_api_key, validate_api_key
+from data_loader import DataLoader
+from evidence_table import flatten_evidence
+from model_registry import get_model
+from sentiment_cache import open_sentiment_cache, text_hash
+
+# A pre-trained DistilBERT model fine-tuned for sentiment analysis
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
+# Texts per forward pass; larger batches are faster until memory runs out
+DEFAULT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", 32))
+
+# Bump this when extract_text_for_sentiment or the token limit changes, so cached
+# results computed from differently prepared text are not reused
+PREPROCESSING_VERSION = 2
+
+_sentiment_caches = {}
 
 def load_financial_data():
     """
     Load financial data from the FinanceBench dataset.
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(script_dir, "data", "financebench-main", "data", "financebench_open_source.jsonl")
-    
-    try:
-        df = pd.read_json(file_path, lines=True)
-        print(f"Successfully loaded financebench_open_source.jsonl with {len(df)} entries.")
-        return df
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        return None
+    return DataLoader().load_jsonl_file("financebench_open_source.jsonl")
 
-def extract_text_for_sentiment(df):
+def load_evidence():
+    """
+    Load the shared evidence table of the FinanceBench dataset (see DataLoader.load_evidence_table).
+    """
+    return DataLoader().load_evidence_table("financebench_open_source.jsonl")
+
+def extract_text_for_sentiment(df, evidence=None):
     """
     Extract and clean text for sentiment analysis from the evidence field.
+
+    All evidence items are joined (see evidence_table.py); rows without evidence fall
+    back to question + answer. Pass the shared evidence table (load_evidence) to reuse
+    it instead of rebuilding it from `df`.
     """
-    texts = []
-    for _, row in df.iterrows():
-        text_content = ""
-        evidence = row.get('evidence', '')
-        
-        # Handle evidence field which might be a list
-        if isinstance(evidence, list) and evidence:
-            evidence_texts = []
-            for item in evidence:
-                if isinstance(item, dict) and 'evidence_text' in item:
-                    evidence_texts.append(item['evidence_text'])
-                elif isinstance(item, str):
-                    evidence_texts.append(item)
-            text_content = ' '.join(evidence_texts)
-        elif isinstance(evidence, str):
-            text_content = evidence
-        
-        # Fallback to question + answer if no evidence
-        if not text_content and 'question' in row and 'answer' in row:
-            text_content = f"{row['question']} {row['answer']}"
-        
-        # Truncate text to fit model limits (512 tokens ≈ 300 words to be safe)
-        # More conservative truncation to avoid token length issues
-        words = text_content.split()
-        if len(words) > 300:
-            text_content = ' '.join(words[:300])
-        
-        texts.append(text_content)
+    text_content = flatten_evidence(df, evidence)['all_evidence_text']
     
-    df['cleaned_text'] = texts
+    # Fallback to question + answer if no evidence
+    if 'question' in df and 'answer' in df:
+        fallback = df['question'].astype("string").fillna("") + " " + df['answer'].astype("string").fillna("")
+        text_content = text_content.where(text_content != "", fallback)
+    
+    # Truncate text to fit model limits (512 tokens ≈ 300 words to be safe)
+    words = text_content.str.split()
+    text_content = text_content.where(words.str.len() <= 300, words.str[:300].str.join(' '))
+    
+    df['cleaned_text'] = text_content
     return df
 
-def get_sentiment_pipeline():
+# Inference backend: "torch" (transformers, fp32), "onnx" (onnxruntime, fp32) or
+# "onnx-int8" (onnxruntime, dynamically quantized)
+SENTIMENT_BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")
+
+def _load_pipeline(model_name, backend="torch"):
+    if backend == "torch":
+        return pipeline("sentiment-analysis", model=model_name, truncation=True, max_length=512)
+    if backend in ("onnx", "onnx-int8"):
+        # Imported here so the default backend does not need onnxruntime installed
+        from onnx_sentiment import load_onnx_pipeline
+        return load_onnx_pipeline(model_name, quantize=backend == "onnx-int8")
+    raise ValueError(f"Unknown sentiment backend: {backend!r} (expected one of {SENTIMENT_BACKENDS})")
+
+def _warmup_pipeline(sentiment_pipeline):
+    # The first forward pass allocates kernels and buffers; pay for it at load time
+    sentiment_pipeline("Revenue increased compared to the prior year.")
+
+def get_sentiment_pipeline(model_name=SENTIMENT_MODEL, backend=None):
     """
-    Initializes and returns a sentiment analysis pipeline using DistilBERT.
+    Returns the sentiment analysis pipeline, loading it once per process.
+
+    The pipeline is kept in model_registry, so Streamlit reruns and sessions share
+    one warmed-up copy instead of reloading the weights on every request.
+
+    Args:
+        model_name (str): A Hugging Face sentiment model.
+        backend (str): One of SENTIMENT_BACKENDS (defaults to SENTIMENT_BACKEND, else "torch").
     """
+    backend = backend or DEFAULT_BACKEND
     try:
-        # Use a pre-trained DistilBERT model fine-tuned for sentiment analysis.
-        model_name = "distilbert-base-uncased-finetuned-sst-2-english"
-        sentiment_pipeline = pipeline("sentiment-analysis", model=model_name, truncation=True, max_length=512)
-        print(f"✅ Sentiment analysis pipeline loaded with model: {model_name}")
-        return sentiment_pipeline
+        return get_model(
+            f"sentiment:{backend}:{model_name}",
+            lambda: _load_pipeline(model_name, backend),
+            warmup=_warmup_pipeline,
+        )
     except Exception as e:
         print(f"❌ Error loading sentiment analysis pipeline: {e}")
         return None
 
-def analyze_sentiment(df, pipeline):
+def get_sentiment_cache(model_name=SENTIMENT_MODEL, backend=None):
+    """
+    Returns the persistent result cache for a model and backend, opened once per process.
+
+    Returns:
+        SentimentCache: The cache, or None if it is disabled (SENTIMENT_CACHE=0).
+    """
+    model_id = f"{backend or DEFAULT_BACKEND}:{model_name}"
+    if model_id not in _sentiment_caches:
+        _sentiment_caches[model_id] = open_sentiment_cache(model_id, PREPROCESSING_VERSION)
+    return _sentiment_caches[model_id]
+
+def analyze_text(text, model_name=SENTIMENT_MODEL, backend=None):
+    """
+    Scores a single text, as in the app's sentiment mode.
+
+    A stored result is returned without loading the model; otherwise the text is scored
+    and its result stored.
+
+    Returns:
+        tuple: (label, score), or None if the model could not be loaded.
+    """
+    cache = get_sentiment_cache(model_name, backend)
+    key = text_hash(text)
+    if cache is not None:
+        found = cache.get_many([key])
+        if key in found:
+            return found[key]
+
+    sentiment_pipeline = get_sentiment_pipeline(model_name, backend)
+    if sentiment_pipeline is None:
+        return None
+    result = sentiment_pipeline(text)[0]
+    if cache is not None:
+        cache.put_many([(key, result['label'], result['score'])])
+    return result['label'], result['score']
+
+def _score_batch(pipeline, encodings):
+    """
+    Runs one forward pass over a batch of tokenized texts, padded to the batch's longest text.
+
+    Returns:
+        list: (label, score) per text.
+    """
+    import torch
+
+    batch = pipeline.tokenizer.pad({"input_ids": encodings}, padding="longest", return_tensors="pt")
+    batch = {name: tensor.to(pipeline.model.device) for name, tensor in batch.items()}
+    with torch.inference_mode():
+        logits = pipeline.model(**batch).logits
+    probabilities = torch.softmax(logits.float(), dim=-1)
+    scores, label_ids = probabilities.max(dim=-1)
+    id2label = pipeline.model.config.id2label
+    return [(id2label[int(label_id)], float(score)) for label_id, score in zip(label_ids, scores)]
+
+def score_encodings(encodings, pipeline, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Scores already tokenized texts in length-bucketed batches with dynamic padding.
+
+    Encodings are sorted by length and cut into batches of `batch_size`, so each batch
+    is padded only to its own longest text. If a batch fails, its texts are retried one
+    by one so a single bad text only affects itself; texts that still fail are NEUTRAL (0.5).
+
+    Args:
+        encodings (list[list[int]]): Token ids per text, including special tokens.
+        pipeline: A transformers text-classification pipeline.
+        batch_size (int): Texts per forward pass.
+
+    Returns:
+        tuple: (results, batches, failed) where results is a list of (label, score) in input
+               order and failed lists the positions that could not be scored.
+    """
+    results = [('NEUTRAL', 0.5)] * len(encodings)
+    batches, failed = 0, []
+    order = sorted(range(len(encodings)), key=lambda i: len(encodings[i]))
+
+    for batch_start in range(0, len(order), batch_size):
+        batch = order[batch_start:batch_start + batch_size]
+        batches += 1
+        try:
+            scored = _score_batch(pipeline, [encodings[i] for i in batch])
+        except Exception as e:
+            print(f"⚠️ Batch failed ({e}), scoring its {len(batch)} texts individually...")
+            scored = []
+            for i in batch:
+                try:
+                    scored.extend(_score_batch(pipeline, [encodings[i]]))
+                except Exception as item_error:
+                    print(f"❌ Error analyzing text {i + 1}: {item_error}")
+                    failed.append(i)
+                    scored.append(('NEUTRAL', 0.5))
+        for i, result in zip(batch, scored):
+            results[i] = result
+    return results, batches, failed
+
+def score_texts(texts, pipeline, batch_size=DEFAULT_BATCH_SIZE, max_length=512, cache=None):
+    """
+    Scores texts in length-bucketed batches with dynamic padding (see score_encodings).
+
+    Texts are tokenized once up front. Empty texts are NEUTRAL (0.5). With a cache, only
+    texts without a stored result are sent to the model, and their results are stored.
+
+    Args:
+        texts (list[str]): The texts to score.
+        pipeline: A transformers text-classification pipeline.
+        batch_size (int): Texts per forward pass.
+        max_length (int): Token limit per text (longer texts are truncated).
+        cache (SentimentCache): Optional result cache for this pipeline's model.
+
+    Returns:
+        tuple: (results, stats) where results is a list of (label, score) in input order
+               and stats holds 'texts', 'cached', 'batches', 'errors', 'seconds' and 'texts_per_sec'.
+    """
+    start = time.perf_counter()
+    results = [('NEUTRAL', 0.5)] * len(texts)
+    stats = {"texts": len(texts), "cached": 0, "batches": 0, "errors": 0}
+
+    indices = [i for i, text in enumerate(texts) if isinstance(text, str) and text.strip()]
+    if indices and cache is not None:
+        hashes = {i: text_hash(texts[i]) for i in indices}
+        found = cache.get_many(list(hashes.values()))
+        for i in indices:
+            if hashes[i] in found:
+                results[i] = found[hashes[i]]
+        misses = [i for i in indices if hashes[i] not in found]
+        stats["cached"] = len(indices) - len(misses)
+        indices = misses
+
+    if indices:
+        encodings = pipeline.tokenizer(
+            [texts[i] for i in indices], truncation=True, max_length=max_length
+        )["input_ids"]
+        scored, stats["batches"], failed = score_encodings(encodings, pipeline, batch_size)
+        stats["errors"] = len(failed)
+        for i, result in zip(indices, scored):
+            results[i] = result
+        if cache is not None:
+            # Failures are not stored, so they are retried next time
+            failed = set(failed)
+            cache.put_many(
+                (hashes[i], *result) for j, (i, result) in enumerate(zip(indices, scored)) if j not in failed
+            )
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["texts_per_sec"] = len(texts) / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    return results, stats
+
+def analyze_sentiment(df, pipeline, batch_size=DEFAULT_BATCH_SIZE, cache=None):
     """
     Analyzes the sentiment of the cleaned text in a DataFrame.
-    Processes texts individually to handle length and error issues.
+    Texts are scored in length-bucketed batches; errors are isolated per text.
+    With a cache, previously scored texts are not sent to the model again.
     """
     if df is None or pipeline is None:
         print("Data or pipeline not available.")
         return df
 
-    sentiment_labels = []
-    sentiment_scores = []
-    
     print(f"🔍 Analyzing sentiment for {len(df)} texts...")
-    
-    for i, text in enumerate(df['cleaned_text']):
-        try:
-            # Skip empty texts
-            if not text or not text.strip():
-                sentiment_labels.append('NEUTRAL')
-                sentiment_scores.append(0.5)
-                continue
-            
-            # Analyze sentiment for individual text
-            result = pipeline(text)
-            if isinstance(result, list) and len(result) > 0:
-                sentiment_labels.append(result[0]['label'])
-                sentiment_scores.append(result[0]['score'])
-            else:
-                sentiment_labels.append('NEUTRAL')
-                sentiment_scores.append(0.5)
-                
-            # Progress indicator
-            if (i + 1) % 20 == 0:
-                print(f"  Processed {i + 1}/{len(df)} texts...")
-                
-        except Exception as e:
-            print(f"❌ Error analyzing text {i+1}: {e}")
-            sentiment_labels.append('NEUTRAL')
-            sentiment_scores.append(0.5)
-    
+
+    results, stats = score_texts(df['cleaned_text'].tolist(), pipeline, batch_size=batch_size, cache=cache)
+
     # Add results to dataframe
-    df['sentiment_label'] = sentiment_labels
-    df['sentiment_score'] = sentiment_scores
+    df['sentiment_label'] = [label for label, _ in results]
+    df['sentiment_score'] = [score for _, score in results]
     
-    print("✅ Sentiment analysis completed!")
+    print(
+        f"✅ Sentiment analysis completed! {stats['texts']} texts in {stats['seconds']:.2f}s "
+        f"({stats['texts_per_sec']:.1f} texts/sec, {stats['cached']} cached, {stats['batches']} batches, "
+        f"{stats['errors']} errors)"
+    )
     return df
 
 def main():
@@ -126,14 +275,15 @@ def main():
     
     if raw_df is not None:
         # Extract and preprocess text for sentiment analysis
-        processed_df = extract_text_for_sentiment(raw_df)
+        processed_df = extract_text_for_sentiment(raw_df, load_evidence())
         
         # Get the sentiment analysis pipeline
         sentiment_pipeline = get_sentiment_pipeline()
         
         if sentiment_pipeline:
             # Analyze sentiment on the cleaned text
-            final_df = analyze_sentiment(processed_df, sentiment_pipeline)
+            cache = get_sentiment_cache()
+            final_df = analyze_sentiment(processed_df, sentiment_pipeline, cache=cache)
             
             print("\n📈 First 5 entries with sentiment analysis results:")
             print(final_df[['question', 'sentiment_label', 'sentiment_score']].head())
@@ -0,0 +1,140 @@
+# sentiment_benchmark.py
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def _positive_probabilities(results):
+    """P(positive) per (label, score) result, comparable across backends even when labels differ."""
+    return np.array([score if str(label).upper().startswith("POS") else 1 - score for label, score in results])
+
+
+def run_backend(backend, texts, latency_samples, batch_size):
+    """
+    Loads one backend and measures it. Meant to run in a fresh process so peak memory is its own.
+
+    Returns:
+        dict: Timings, memory and the predicted (label, score) of every text.
+    """
+    from model_registry import model_info
+    from sentiment_analyzer import SENTIMENT_MODEL, get_sentiment_pipeline, score_texts
+
+    start = time.perf_counter()
+    sentiment_pipeline = get_sentiment_pipeline(SENTIMENT_MODEL, backend)
+    if sentiment_pipeline is None:
+        raise RuntimeError(f"Could not load the {backend} backend")
+    load_seconds = time.perf_counter() - start
+
+    # One text per call, as in the Streamlit sentiment mode
+    latencies = []
+    for text in texts[:latency_samples]:
+        start = time.perf_counter()
+        sentiment_pipeline(text)
+        latencies.append(time.perf_counter() - start)
+
+    results, stats = score_texts(texts, sentiment_pipeline, batch_size=batch_size)
+    return {
+        "backend": backend,
+        "load_s": round(load_seconds, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+        "texts_per_sec": round(stats["texts_per_sec"], 1),
+        "model_mb": model_info(f"sentiment:{backend}:{SENTIMENT_MODEL}")["memory_mb"],
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "results": results,
+    }
+
+
+def measure_in_subprocess(backend, texts_path, latency_samples, batch_size):
+    """Runs run_backend in a fresh interpreter and returns its report, or None if it failed."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", backend, "--texts-file", texts_path,
+         "--latency-samples", str(latency_samples), "--batch-size", str(batch_size)],
+        cwd=_script_dir, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        print(f"❌ Benchmarking {backend} failed: {error}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """
+    Compares sentiment backends on FinanceBench evidence texts: load time, single-text
+    p50/p99 latency, batched throughput, memory, and label agreement with PyTorch.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the PyTorch and ONNX Runtime sentiment backends.")
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8", help="Comma-separated backends; the first is the reference.")
+    parser.add_argument("--limit", type=int, default=150, help="Number of texts to score.")
+    parser.add_argument("--latency-samples", type=int, default=50, help="Texts timed one at a time.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--texts-file", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.texts_file, "r", encoding="utf-8") as f:
+            texts = json.load(f)
+        report = run_backend(args.worker, texts, args.latency_samples, args.batch_size)
+        print(json.dumps(report))
+        return
+
+    from sentiment_analyzer import extract_text_for_sentiment, load_evidence, load_financial_data
+
+    df = load_financial_data()
+    if df is None:
+        return
+    texts = extract_text_for_sentiment(df, load_evidence())["cleaned_text"].tolist()[:args.limit]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        texts_path = os.path.join(tmp_dir, "texts.json")
+        with open(texts_path, "w", encoding="utf-8") as f:
+            json.dump(texts, f)
+
+        backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+        print(f"📏 Benchmarking {', '.join(backends)} on {len(texts)} texts...")
+        reports = []
+        for backend in backends:
+            report = measure_in_subprocess(backend, texts_path, args.latency_samples, args.batch_size)
+            if report is not None:
+                reports.append(report)
+
+    if not reports:
+        print("❌ No backend could be benchmarked.")
+        return
+
+    reference = reports[0]
+    rows = []
+    for report in reports:
+        labels = [label for label, _ in report["results"]]
+        reference_labels = [label for label, _ in reference["results"]]
+        prob_diff = np.abs(_positive_probabilities(report["results"]) - _positive_probabilities(reference["results"]))
+        row = {k: v for k, v in report.items() if k != "results"}
+        row[f"agreement_vs_{reference['backend']}"] = round(float(np.mean(np.array(labels) == np.array(reference_labels))), 4)
+        row["max_prob_diff"] = round(float(prob_diff.max()), 4)
+        rows.append(row)
+
+    print("\n📊 Sentiment backend comparison:")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# sentiment_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(_script_dir, "sentiment_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 500_000
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK_SIZE = 500
+
+
+def text_hash(text):
+    """Returns the SHA-256 hex digest of a text, used as its cache key."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """
+    A persistent store of sentiment results keyed by (model id, preprocessing version, text hash).
+
+    Results of every model and preprocessing version share one SQLite table, so
+    switching back to an earlier model still finds its results. Lookups and writes are
+    done in bulk, so a batch costs a handful of queries, and once the table holds more
+    than `max_entries` results the least recently used ones are evicted.
+    """
+    def __init__(self, model_id, preprocessing_version, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.model_id = model_id
+        self.preprocessing_version = preprocessing_version
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                model_id TEXT NOT NULL,
+                preprocessing_version INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                label TEXT NOT NULL,
+                score REAL NOT NULL,
+                last_access REAL NOT NULL,
+                UNIQUE (model_id, preprocessing_version, text_hash)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get_many(self, hashes):
+        """
+        Looks up the results of many texts at once.
+
+        Args:
+            hashes (list[str]): Text hashes (see text_hash).
+
+        Returns:
+            dict: Maps each cached hash to its (label, score); misses are absent.
+        """
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), _LOOKUP_CHUNK_SIZE):
+                chunk = hashes[start:start + _LOOKUP_CHUNK_SIZE]
+                rows = self._conn.execute(
+                    f"""SELECT text_hash, label, score FROM results
+                        WHERE model_id = ? AND preprocessing_version = ?
+                        AND text_hash IN ({",".join("?" * len(chunk))})""",
+                    (self.model_id, self.preprocessing_version, *chunk),
+                )
+                found.update((h, (label, score)) for h, label, score in rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE results SET last_access = ? WHERE model_id = ? AND preprocessing_version = ? AND text_hash = ?",
+                    [(now, self.model_id, self.preprocessing_version, h) for h in found],
+                )
+                self._conn.commit()
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(hashes) - len(found)
+        return found
+
+    def put_many(self, results):
+        """
+        Stores many results at once, then evicts the least recently used beyond `max_entries`.
+
+        Args:
+            results (iterable): (text hash, label, score) tuples.
+        """
+        now = time.time()
+        rows = [(self.model_id, self.preprocessing_version, h, label, float(score), now) for h, label, score in results]
+        if not rows:
+            return
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._count += self._conn.total_changes - before
+
+            overflow = self._count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_access LIMIT ?)",
+                    (overflow,),
+                )
+                self._count -= overflow
+                self.stats["evicted"] += overflow
+            self._conn.commit()
+
+    def clear(self):
+        """Removes every stored result of every model."""
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+            self._count = 0
+
+    def __len__(self):
+        return self._count
+
+
+def open_sentiment_cache(model_id, preprocessing_version):
+    """
+    Opens the sentiment result cache configured through environment variables.
+
+    SENTIMENT_CACHE=0 disables it; SENTIMENT_CACHE_PATH and SENTIMENT_CACHE_MAX_ENTRIES
+    override the defaults.
+
+    Returns:
+        SentimentCache: The cache, or None if it is disabled or cannot be opened.
+    """
+    if os.getenv("SENTIMENT_CACHE", "1") == "0":
+        return None
+    try:
+        return SentimentCache(
+            model_id,
+            preprocessing_version,
+            path=os.getenv("SENTIMENT_CACHE_PATH", DEFAULT_CACHE_PATH),
+            max_entries=int(os.getenv("SENTIMENT_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        )
+    except (sqlite3.Error, ValueError) as e:
+        print(f"⚠️ Sentiment cache disabled: {e}")
+        return None
@@ -0,0 +1,96 @@
+# startup_benchmark.py
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from backend_registry import BACKENDS
+
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# What app.py imports before the user picks a mode; this is the cold-start path
+APP_SHELL_MODULES = ["streamlit", "pandas", "config", "backend_registry"]
+DEFAULT_BUDGET_MS = 2000.0
+
+_TIMING_SNIPPET = (
+    "import time, importlib\n"
+    "start = time.perf_counter()\n"
+    "for name in {modules!r}:\n"
+    "    importlib.import_module(name)\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def measure_import(modules, repeats=3):
+    """
+    Measures the cold import time of a group of modules, each run in a fresh interpreter.
+
+    Returns:
+        float: The median import time in milliseconds, or None if the import failed.
+    """
+    timings = []
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-c", _TIMING_SNIPPET.format(modules=list(modules))],
+            cwd=_script_dir, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+            print(f"❌ Importing {', '.join(modules)} failed: {error}")
+            return None
+        timings.append(float(result.stdout.strip().splitlines()[-1]) * 1000)
+    return statistics.median(timings)
+
+
+def import_breakdown(module, top=10):
+    """
+    Returns the slowest imports (cumulative microseconds, name) below a module, from `python -X importtime`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=_script_dir, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    """
+    Reports the cold import time of the app shell and of each analysis backend, and
+    fails (exit code 1) when the app shell exceeds its budget.
+    """
+    parser = argparse.ArgumentParser(description="Measure FinDocGPT cold-start import times.")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("COLD_START_BUDGET_MS", DEFAULT_BUDGET_MS)),
+                        help="Maximum allowed import time of the app shell.")
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh interpreters per measurement.")
+    parser.add_argument("--detail", action="store_true", help="Show the slowest nested imports per backend.")
+    args = parser.parse_args()
+
+    shell_ms = measure_import(APP_SHELL_MODULES, args.repeats)
+    print(f"🚀 App shell ({', '.join(APP_SHELL_MODULES)}): "
+          f"{'failed' if shell_ms is None else f'{shell_ms:,.0f} ms'} (budget {args.budget_ms:,.0f} ms)")
+
+    print("\n📦 Backends (imported on first use of their mode):")
+    for name, module in BACKENDS.items():
+        backend_ms = measure_import([module], args.repeats)
+        if backend_ms is not None:
+            print(f"  {name:<12} {module:<22} {backend_ms:>10,.0f} ms")
+        if args.detail:
+            for cumulative_us, nested in import_breakdown(module):
+                print(f"      {cumulative_us / 1000:>10,.1f} ms  {nested}")
+
+    if shell_ms is None or shell_ms > args.budget_ms:
+        print("\n❌ Cold start is over budget.")
+        sys.exit(1)
+    print("\n✅ Cold start is within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# test_anomaly_detection.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_detection import calibrate_volume_anomalies, detect_volume_anomalies_panel, rolling_mean_std
+
+
+def flat_after_volatile(seed, level=5e8, volatile_bars=2000, flat_bars=60):
+    """Large, volatile volumes followed by a run of identical bars."""
+    rng = np.random.default_rng(seed)
+    volatile = np.round(rng.lognormal(17, 0.8, volatile_bars))
+    return pd.Series(np.r_[volatile, np.full(flat_bars, level)], name="Volume")
+
+
+def pandas_flags(volume, window, std_dev_factor):
+    rolling = volume.rolling(window)
+    return volume > rolling.mean() + rolling.std() * std_dev_factor
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("window", [10, 30])
+def test_panel_flags_match_pandas_on_flat_after_volatile(seed, window):
+    volume = pd.concat([flat_after_volatile(seed), flat_after_volatile(seed, level=1234567.0)], axis=1)
+    volume.columns = ["A", "B"]
+
+    flags = detect_volume_anomalies_panel(volume, window, 2.5)["volume_anomaly"]
+
+    for ticker in volume:
+        expected = pandas_flags(volume[ticker], window, 2.5)
+        assert (flags[ticker] == expected).all()
+        assert not flags[ticker].iloc[-(60 - window):].any()
+
+
+def test_calibration_counts_match_pandas_on_flat_after_volatile():
+    volume = pd.concat([flat_after_volatile(seed) for seed in range(5)], axis=1)
+    volume.columns = [f"T{seed}" for seed in range(5)]
+
+    sweep = calibrate_volume_anomalies(volume, windows=(10, 30), std_dev_factors=(2.0, 3.0), per_ticker=True)
+
+    for row in sweep.itertuples():
+        assert row.anomalies == pandas_flags(volume[row.ticker], row.window, row.std_dev_factor).sum()
+
+
+def test_flat_windows_have_exact_mean_and_zero_std():
+    volume = flat_after_volatile(0).to_numpy()[:, None]
+
+    mean, std = rolling_mean_std(volume, 30)
+
+    assert (mean[-30:, 0] == 5e8).all()
+    assert (std[-30:, 0] == 0).all()
+
+
+def test_rolling_statistics_match_pandas_with_gaps():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(10, 1, (500, 4))
+    values[rng.random(values.shape) < 0.02] = np.nan
+    frame = pd.DataFrame(values)
+
+    mean, std = rolling_mean_std(values, 20)
+
+    np.testing.assert_allclose(mean, frame.rolling(20).mean().to_numpy(), rtol=1e-10)
+    np.testing.assert_allclose(std, frame.rolling(20).std().to_numpy(), rtol=1e-8)
@@ -0,0 +1,19 @@
+# test_embedding_cache.py
+
+import numpy as np
+
+from embedding_cache import EmbeddingStore
+
+
+def test_rows_appended_after_a_torn_write_stay_aligned(tmp_path):
+    store = EmbeddingStore("model", str(tmp_path))
+    store.put_many(["a", "b"], [np.full(4, 1.0), np.full(4, 2.0)])
+    with open(store.vectors_path, "ab") as f:
+        f.write(b"\x00" * 6)  # Part of a row from an interrupted append
+
+    store = EmbeddingStore("model", str(tmp_path))
+    store.put_many(["c"], [np.full(4, 3.0)])
+
+    reopened = EmbeddingStore("model", str(tmp_path))
+    a, b, c = reopened.get_many(["a", "b", "c"])
+    assert (a == 1.0).all() and (b == 2.0).all() and (c == 3.0).all()
@@ -0,0 +1,100 @@
+# test_market_data.py
+
+import pandas as pd
+import pytest
+
+import market_data
+
+
+class FakeProvider:
+    """Serves fixed daily bars and records every requested range."""
+    name = "fake"
+
+    def __init__(self):
+        days = pd.bdate_range("2023-01-02", "2024-12-31", tz="America/New_York", name="Date")
+        self.bars = pd.DataFrame({
+            "Open": 100.0, "High": 101.0, "Low": 99.0,
+            "Close": [100.0 + i for i in range(len(days))], "Volume": 1000,
+        }, index=days)
+        self.scale = 1.0
+        self.calls = []
+
+    def history(self, ticker, start, end, interval, timeout=None):
+        self.calls.append((start, end))
+        bars = market_data._slice(self.bars, start, end).copy()
+        bars["Close"] *= self.scale
+        return bars
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    monkeypatch.setenv("MARKET_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("MARKET_DATA_PROVIDER", "fake")
+    monkeypatch.delenv("MARKET_DATA_MODE", raising=False)
+    fake = FakeProvider()
+    monkeypatch.setitem(market_data._providers, "fake", fake)
+    return fake
+
+
+def test_later_end_is_fetched_even_when_store_is_fresh(provider):
+    first = market_data.get_history("AAPL", start="2024-01-02", end="2024-02-01")
+    second = market_data.get_history("AAPL", start="2024-01-02", end="2024-03-01")
+
+    assert first.index[-1].strftime("%Y-%m-%d") == "2024-01-31"
+    assert second.index[-1].strftime("%Y-%m-%d") == "2024-02-29"
+    assert len(provider.calls) == 2
+    assert provider.calls[1][1] == pd.Timestamp("2024-03-01")
+
+
+def test_covered_range_is_served_from_the_store(provider):
+    market_data.get_history("AAPL", start="2024-01-02", end="2024-03-01")
+    bars = market_data.get_history("AAPL", start="2024-01-10", end="2024-02-01")
+
+    assert len(provider.calls) == 1
+    assert bars.index[0].strftime("%Y-%m-%d") == "2024-01-10"
+
+
+def test_readjustment_refetch_keeps_the_whole_stored_range(provider):
+    market_data.get_history("AAPL", start="2024-01-02", end="2024-03-01")
+    provider.scale = 0.5
+    market_data.get_history("AAPL", start="2024-01-02", end="2024-03-15")
+
+    stored, coverage = market_data._read_store("AAPL", "1d")
+    assert stored.index[0].strftime("%Y-%m-%d") == "2024-01-02"
+    assert stored.index[-1].strftime("%Y-%m-%d") == "2024-03-14"
+    assert pd.Timestamp(coverage["end"]) == pd.Timestamp("2024-03-15")
+    # Every stored bar is on the new adjustment basis
+    expected = provider.bars["Close"].loc[stored.index] * 0.5
+    assert (stored["Close"] == expected).all()
+
+
+def test_empty_readjustment_refetch_serves_the_stored_bars(provider, monkeypatch):
+    market_data.get_history("AAPL", start="2024-01-02", end="2024-03-01")
+    provider.scale = 0.5
+    history = provider.history
+
+    def empty_full_refetch(ticker, start, end, interval, timeout=None):
+        bars = history(ticker, start, end, interval, timeout)
+        return bars.iloc[:0] if start <= pd.Timestamp("2024-01-02") else bars
+    monkeypatch.setattr(provider, "history", empty_full_refetch)
+
+    bars = market_data.get_history("AAPL", start="2024-01-02", end="2024-03-15")
+
+    assert bars.index[0].strftime("%Y-%m-%d") == "2024-01-02"
+    assert bars.index[-1].strftime("%Y-%m-%d") == "2024-02-29"
+    assert (bars["Close"] == provider.bars["Close"].loc[bars.index]).all()
+
+
+def test_offline_falls_back_to_the_fixture_outside_the_stored_range(provider, tmp_path, monkeypatch):
+    market_data.get_history("AAPL", start="2024-01-02", end="2024-02-01")
+    fixtures = tmp_path / "fixtures"
+    fixtures.mkdir()
+    provider.bars.to_parquet(fixtures / "AAPL_1d.parquet")
+    monkeypatch.setenv("MARKET_DATA_FIXTURES", str(fixtures))
+    monkeypatch.setenv("MARKET_DATA_MODE", "offline")
+
+    stored = market_data.get_history("AAPL", start="2024-01-02", end="2024-02-01")
+    later = market_data.get_history("AAPL", start="2024-06-03", end="2024-07-01")
+
+    assert len(stored) == 22 and len(provider.calls) == 1
+    assert later.index[0].strftime("%Y-%m-%d") == "2024-06-03"
@@ -0,0 +1,357 @@
+# vectorstore_index.py
+
+import hashlib
+import json
+import math
+import os
+import time
+from collections import namedtuple
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+# Chunking parameters recorded in the manifest; changing any of them forces a rebuild
+CHUNKING = {
+    "chunk_size": 800,  # Smaller chunks for better retrieval of specific numbers
+    "chunk_overlap": 200,  # More overlap to preserve context
+    "separators": ["\n\n", "\n", ".", "!", "?", ",", " ", ""],
+}
+
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# How many chunks to embed per add() call when syncing
+ADD_BATCH_SIZE = 256
+
+# Search index types selectable through FAISS_INDEX_TYPE. The saved vectorstore always
+# keeps an exact flat index (it supports deletes, which the manifest sync needs); other
+# types are derived from it and cached next to it. {nlist} and {m} are sized per corpus.
+INDEX_FACTORIES = {
+    "flat": "Flat",
+    "ivf": "IVF{nlist},Flat",
+    "hnsw": "HNSW32",
+    "ivfpq": "IVF{nlist},PQ{m}x{nbits}",
+}
+DEFAULT_NPROBE = 16
+DEFAULT_EF_SEARCH = 64
+
+# A unit of source material tracked by the manifest (one Q&A evidence row, one filing, ...).
+# `load_documents` is only called when the unit is new or changed, so expensive sources
+# such as full filings are never read when they are already indexed.
+SourceUnit = namedtuple("SourceUnit", ["unit_id", "content_hash", "load_documents"])
+
+
+def get_text_splitter(chunking=CHUNKING):
+    """Returns the text splitter configured by the given chunking parameters."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunking["chunk_size"],
+        chunk_overlap=chunking["chunk_overlap"],
+        separators=chunking["separators"],
+    )
+
+
+def hash_documents(docs):
+    """
+    Computes a stable SHA-256 over the content and metadata of LangChain Documents.
+    """
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def chunk_ids_for(unit_id, num_chunks):
+    """Returns the deterministic vectorstore ids of a unit's chunks."""
+    return [f"{unit_id}#{i}" for i in range(num_chunks)]
+
+
+def load_manifest(path):
+    """
+    Loads the chunk manifest stored next to a saved vectorstore.
+
+    Returns:
+        dict: The manifest, or None if it is missing or unreadable.
+    """
+    manifest_path = os.path.join(path, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Failed to read vectorstore manifest: {e}")
+        return None
+
+
+def new_manifest(embedding_model, chunking=CHUNKING):
+    """Returns an empty manifest for the given embedding model and chunking parameters."""
+    return {
+        "version": MANIFEST_VERSION,
+        "embedding_model": embedding_model,
+        "chunking": chunking,
+        "documents": {},
+    }
+
+
+def save_index(vectorstore, manifest, path):
+    """
+    Saves the vectorstore and its manifest together.
+
+    The manifest is written last, so a crash in between leaves a manifest that
+    describes an older index at worst, which the next sync repairs.
+    """
+    vectorstore.save_local(path)
+    manifest_path = os.path.join(path, MANIFEST_FILENAME)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def plan_sync(manifest, units):
+    """
+    Compares the manifest against the current source units.
+
+    Returns:
+        tuple: (stale_unit_ids, new_units) where stale units are removed or changed
+               and new units are added or changed.
+    """
+    recorded = manifest["documents"]
+    current = {unit.unit_id: unit for unit in units}
+
+    stale = [
+        unit_id for unit_id, entry in recorded.items()
+        if unit_id not in current or entry["hash"] != current[unit_id].content_hash
+    ]
+    new = [
+        unit for unit in units
+        if unit.unit_id not in recorded or recorded[unit.unit_id]["hash"] != unit.content_hash
+    ]
+    return stale, new
+
+
+def sync_vectorstore(vectorstore, units, embeddings, embedding_model, path, chunking=CHUNKING):
+    """
+    Brings a FAISS vectorstore in line with the current source units.
+
+    Only chunks of new or changed units are embedded and added; chunks of removed or
+    changed units are deleted. A full rebuild happens only when there is no manifest
+    (e.g. a cache written before manifests existed) or when the chunking parameters
+    or the embedding model differ from the ones recorded.
+
+    Args:
+        vectorstore (FAISS): The loaded vectorstore, or None if there is no cache.
+        units (list[SourceUnit]): Everything that should be in the index.
+        embeddings: The LangChain embeddings used for new chunks.
+        embedding_model (str): Name of the embedding model, recorded in the manifest.
+        path (str): Directory where the vectorstore and manifest are saved.
+        chunking (dict): Chunking parameters.
+
+    Returns:
+        tuple: (vectorstore, summary) where vectorstore may be a new object (or None if
+               there was nothing to index) and summary counts added/removed units and chunks.
+    """
+    summary = {"units_added": 0, "units_removed": 0, "chunks_added": 0, "chunks_removed": 0, "rebuilt": False}
+
+    manifest = load_manifest(path) if vectorstore is not None else None
+    if manifest is not None and (
+        manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("embedding_model") != embedding_model
+        or manifest.get("chunking") != chunking
+    ):
+        print("♻️ Embedding model or chunking parameters changed, rebuilding vectorstore...")
+        manifest = None
+    elif manifest is None and vectorstore is not None:
+        print("♻️ Cached vectorstore has no chunk manifest, rebuilding it once...")
+
+    if manifest is None:
+        vectorstore = None
+        manifest = new_manifest(embedding_model, chunking)
+        summary["rebuilt"] = True
+
+    stale, new = plan_sync(manifest, units)
+    if not stale and not new:
+        print("✅ Vectorstore is up to date.")
+        return vectorstore, summary
+
+    recorded = manifest["documents"]
+
+    # Drop the chunks of removed or changed units
+    stale_chunk_ids = [chunk_id for unit_id in stale for chunk_id in recorded[unit_id]["chunk_ids"]]
+    if vectorstore is not None and stale_chunk_ids:
+        vectorstore.delete(stale_chunk_ids)
+    for unit_id in stale:
+        del recorded[unit_id]
+    summary["units_removed"] = len(stale)
+    summary["chunks_removed"] = len(stale_chunk_ids)
+
+    # Split new or changed units and embed their chunks in batches
+    text_splitter = get_text_splitter(chunking)
+    pending_chunks, pending_ids, pending_units = [], [], []
+
+    def flush():
+        nonlocal vectorstore
+        if pending_chunks:
+            if vectorstore is None:
+                vectorstore = FAISS.from_documents(pending_chunks, embeddings, ids=pending_ids)
+            else:
+                vectorstore.add_documents(pending_chunks, ids=pending_ids)
+        # Record units only once their chunks are in the index, then checkpoint
+        for unit_id, content_hash, ids in pending_units:
+            recorded[unit_id] = {"hash": content_hash, "chunk_ids": ids}
+        if vectorstore is not None:
+            save_index(vectorstore, manifest, path)
+        summary["chunks_added"] += len(pending_chunks)
+        pending_chunks.clear()
+        pending_ids.clear()
+        pending_units.clear()
+
+    print(f"📄 Indexing {len(new)} new or changed documents...")
+    for unit in new:
+        chunks = text_splitter.split_documents(unit.load_documents())
+        ids = chunk_ids_for(unit.unit_id, len(chunks))
+        pending_chunks.extend(chunks)
+        pending_ids.extend(ids)
+        pending_units.append((unit.unit_id, unit.content_hash, ids))
+        if len(pending_chunks) >= ADD_BATCH_SIZE:
+            flush()
+    flush()
+    summary["units_added"] = len(new)
+
+    print(
+        f"✅ Vectorstore updated: +{summary['chunks_added']} / -{summary['chunks_removed']} chunks "
+        f"({summary['units_added']} added, {summary['units_removed']} removed documents)."
+    )
+    return vectorstore, summary
+
+
+def _nlist_for(num_vectors):
+    """Picks the number of IVF lists: about 4*sqrt(n), with at least 39 training points per list."""
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+
+def _pq_subquantizers(dim):
+    """Picks the PQ code size: the largest divisor of dim giving sub-vectors of at least 8 dims."""
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def _pq_bits(num_vectors):
+    """
+    Picks the bits per PQ code: 8 where possible, fewer for small corpora, keeping at least
+    39 training points per codebook centroid (2**bits centroids per sub-quantizer).
+
+    Raises:
+        ValueError: If there are too few vectors even for 4-bit codes.
+    """
+    for bits in range(8, 3, -1):
+        if num_vectors >= 39 * 2 ** bits:
+            return bits
+    raise ValueError(
+        f"ivfpq needs at least {39 * 2 ** 4} vectors to train its codebooks, got {num_vectors}; "
+        "use 'flat', 'ivf' or 'hnsw' for a corpus this small"
+    )
+
+
+def index_factory_string(index_type, num_vectors, dim):
+    """Resolves an index type name to a FAISS index_factory description for this corpus size."""
+    if index_type not in INDEX_FACTORIES:
+        raise ValueError(f"Unknown FAISS index type: {index_type!r} (expected one of {sorted(INDEX_FACTORIES)})")
+    nbits = _pq_bits(num_vectors) if index_type == "ivfpq" else 8
+    return INDEX_FACTORIES[index_type].format(nlist=_nlist_for(num_vectors), m=_pq_subquantizers(dim), nbits=nbits)
+
+
+def configure_search(index, nprobe=DEFAULT_NPROBE, ef_search=DEFAULT_EF_SEARCH):
+    """Applies search-time parameters (IVF nprobe, HNSW efSearch) to an index in place."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def build_faiss_index(vectors, index_type, metric=faiss.METRIC_L2):
+    """
+    Builds and trains a FAISS index of the given type over a float32 matrix.
+
+    Rows are added in order, so index position i holds vectors[i].
+
+    Returns:
+        faiss.Index: The populated index, configured with the default search parameters.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    num_vectors, dim = vectors.shape
+    index = faiss.index_factory(dim, index_factory_string(index_type, num_vectors, dim), metric)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return configure_search(index)
+
+
+def index_fingerprint(vectorstore):
+    """Identifies the exact set and order of chunks in a vectorstore."""
+    digest = hashlib.sha256()
+    for pos in range(len(vectorstore.index_to_docstore_id)):
+        digest.update(vectorstore.index_to_docstore_id[pos].encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def load_or_build_search_index(vectorstore, index_type, path):
+    """
+    Returns a search index of the requested type holding the vectorstore's vectors.
+
+    Non-flat indexes are cached as <path>/search_<type>.faiss together with the
+    fingerprint of the chunks they were built from, and rebuilt when it changes.
+    """
+    if index_type == "flat":
+        return vectorstore.index
+
+    index_path = os.path.join(path, f"search_{index_type}.faiss")
+    meta_path = os.path.join(path, f"search_{index_type}.json")
+    fingerprint = index_fingerprint(vectorstore)
+
+    if os.path.exists(index_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                if json.load(f).get("fingerprint") == fingerprint:
+                    return configure_search(faiss.read_index(index_path))
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"⚠️ Failed to load cached {index_type} index: {e}")
+
+    print(f"🏗️ Building {index_type} search index over {vectorstore.index.ntotal} vectors...")
+    start = time.perf_counter()
+    vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    index = build_faiss_index(vectors, index_type, vectorstore.index.metric_type)
+    print(f"✅ {index_type} index built in {time.perf_counter() - start:.1f}s")
+
+    try:
+        faiss.write_index(index, index_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "factory": index_factory_string(index_type, *vectors.shape)}, f)
+    except OSError as e:
+        print(f"⚠️ Failed to cache {index_type} index: {e}")
+    return index
+
+
+def with_search_index(vectorstore, index_type, path):
+    """
+    Returns a FAISS vectorstore that shares the documents of `vectorstore` but searches
+    with an index of the requested type. The original keeps its flat index for syncing.
+    """
+    if vectorstore is None or index_type == "flat":
+        return vectorstore
+    return FAISS(
+        embedding_function=vectorstore.embedding_function,
+        index=load_or_build_search_index(vectorstore, index_type, path),
+        docstore=vectorstore.docstore,
+        index_to_docstore_id=vectorstore.index_to_docstore_id,
+        normalize_L2=vectorstore._normalize_L2,
+        distance_strategy=vectorstore.distance_strategy,
+    )